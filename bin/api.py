@@ -34,9 +34,9 @@ class Health(flask_restx.Resource):
 
     def get(self):
         """
-        Just return ok
+        Just return ok, with how busy the resources are
         """
-        return {"message": "OK"}
+        return {"message": "OK", "admission": relations_restx.Admission.report()}
 
 
 build().run(host='0.0.0.0', port=80)
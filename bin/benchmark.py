@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Benchmarks for Relations RestX hot paths
+"""
+
+import sys
+import json
+import timeit
+
+import flask
+import flask_restx
+
+import relations
+import relations.unittest
+import relations_restx
+
+
+def records(count=2000, width=50):
+    """
+    Builds a big export like payload
+    """
+
+    return {
+        "things": [
+            {
+                **{f"field_{field}": f"value {record} {field}" for field in range(width - 4)},
+                "id": record,
+                "spend": record * 1.5,
+                "flag": record % 2 == 0,
+                "people": ["tom", "dick", "harry"]
+            }
+            for record in range(count)
+        ],
+        "overflow": False,
+        "formats": {}
+    }
+
+def bench_json(number=20):
+    """
+    Compares flask-restx's JSON representation against ours
+    """
+
+    app = flask.Flask("benchmark")
+    data = records()
+
+    paths = {
+        "flask-restx": lambda: flask_restx.representations.output_json(data, 200),
+        "stdlib": lambda: relations_restx.representations.output_json(data, 200, dumps=relations_restx.representations.dumps_json)
+    }
+
+    if relations_restx.representations.orjson is not None:
+        paths["orjson"] = lambda: relations_restx.representations.output_json(data, 200, dumps=relations_restx.representations.dumps_orjson)
+
+    with app.app_context():
+        for name, path in paths.items():
+            seconds = timeit.timeit(path, number=number) / number
+            print(json.dumps({"bench": "json", "path": name, "ms": round(seconds * 1000, 2)}))
+
+def api(count=500):
+    """
+    Builds an API with a lot of resources
+    """
+
+    relations.unittest.MockSource("benchmark")
+
+    app = flask.Flask("benchmark")
+    restx = relations_restx.Api(app)
+
+    for index in range(count):
+
+        model = type(f"Thing{index}", (relations.Model,), {
+            "SOURCE": "benchmark",
+            "id": int,
+            "name": str,
+            "spend": float,
+            "flag": bool,
+            "people": set
+        })
+
+        resource = type(f"Thing{index}Resource", (relations_restx.Resource,), {"MODEL": model})
+
+        restx.add_resource(resource, *resource.thy().endpoints())
+
+    return app, restx
+
+def bench_openapi(number=3, count=500):
+    """
+    Compares flask-restx's own spec pass, which ours used to run first, against ours
+    """
+
+    app, restx = api(count)
+
+    paths = {
+        "flask-restx": lambda: flask_restx.Swagger(restx).as_dict(),
+        "relations": lambda: relations_restx.OpenApi(restx).as_dict()
+    }
+
+    with app.test_request_context():
+        for name, path in paths.items():
+            seconds = timeit.timeit(path, number=number) / number
+            print(json.dumps({"bench": "openapi", "path": name, "resources": count, "ms": round(seconds * 1000, 2)}))
+
+BENCHES = {
+    "json": bench_json,
+    "openapi": bench_openapi
+}
+
+if __name__ == "__main__":
+    for bench in sys.argv[1:] or BENCHES:
+        BENCHES[bench]()
@@ -3,11 +3,21 @@ Utilities for Relations RestX
 """
 
 import inspect
+import hashlib
 
+import flask
 import flask_restx
-
-from relations_restx.resource import ResourceError, ResourceIdentity, Resource, exceptions
-from relations_restx.api import Api, OpenApi
+import werkzeug.exceptions
+import opengui
+
+from relations_restx.resource import ResourceError, ResourceIdentity, Resource, exceptions, transactional, transaction
+from relations_restx.api import Api, OpenApi, Transaction
+from relations_restx.limits import AdmissionError, Admission, RateStore, RateFileStore, RateLimit
+from relations_restx.flight import Passenger, Flight
+from relations_restx.changes import Subscription, ChangeLog
+from relations_restx.titles import TitleStore
+from relations_restx.criteria import Criteria
+from relations_restx import representations
 
 def resources(module):
     """
@@ -45,28 +55,66 @@ def attach(restx, module, models):
         Custom class for each call
         """
 
-        MODELS = []
+        RESOURCES = []                           # Resources listed
+        CATALOG = {"models": [], "bodies": {}}   # Models and their bytes to serve, swapped whole
+        CACHE = "public, max-age=60"             # Cache-Control to serve with
 
-        def get(self):
+        @classmethod
+        def catalog(cls, identities=None):
             """
-            List all models
+            Lists all models and details each, serialized once with an etag for each
             """
-            return {"models": self.MODELS}
 
-    restx.add_resource(Model, "/model")
+            identities = identities or {}
+
+            models = []
+            bodies = {}
+
+            for resource in cls.RESOURCES:
+
+                thy = identities.get(resource) or resource.thy()
+                listing = thy.listing()
+
+                models.append(listing)
+                fields = [
+                    {key: value for key, value in field.items() if not callable(value)}
+                    for field in opengui.Fields(fields=thy._fields).to_dict()["fields"]
+                ]
+
+                bodies[thy.SINGULAR] = representations.dumps({"model": {**listing, "fields": fields}})
+
+            bodies[None] = representations.dumps({"models": models})
+
+            return {
+                "models": models,
+                "bodies": {id: (body, hashlib.sha1(body).hexdigest()) for id, body in bodies.items()}
+            }
+
+        def get(self, id=None):
+            """
+            List all models, or detail one
+            """
+
+            if id not in self.CATALOG["bodies"]:
+                raise werkzeug.exceptions.NotFound(f"cannot find model {id}")
+
+            body, etag = self.CATALOG["bodies"][id]
+
+            response = flask.Response(body, mimetype="application/json")
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = self.CACHE
+
+            return response.make_conditional(flask.request)
+
+    restx.add_resource(Model, "/model", "/model/<id>")
 
     for resource in resources(module) + ensure(module, models):
 
         thy = resource.thy()
 
-        Model.MODELS.append({
-            "id": thy._model._id,
-            "titles": thy._model._titles,
-            "title": thy._model.TITLE,
-            "singular": thy.SINGULAR,
-            "plural": thy.PLURAL,
-            "list": thy.LIST
-        })
+        Model.RESOURCES.append(resource)
 
         if resource.__name__.lower() not in restx.endpoints:
             restx.add_resource(resource, *thy.endpoints())
+
+    Model.CATALOG = Model.catalog()
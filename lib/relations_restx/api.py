@@ -2,17 +2,54 @@
 Module for overriding the base RestX API
 """
 
+import math
+import contextlib
 import collections
+import functools
+import flask
 import flask_restx
+import werkzeug.exceptions
+
+import relations
 
 from werkzeug.utils import cached_property
 
+from relations_restx import representations
+from relations_restx.limits import AdmissionError
+from relations_restx.criteria import Criteria
+from relations_restx.resource import Resource, exceptions, transactional, transaction
+
 
-class OpenApi(flask_restx.Swagger):
+class OpenApi(flask_restx.Swagger): # pylint: disable=too-many-public-methods
     """
     Overrride Flask RestX Swagger
     """
 
+    def __init__(self, api, namespaces=None, tags=None, identities=None):
+
+        super().__init__(api)
+
+        self.namespaces = namespaces
+        self.tags = tags
+        self.identities = identities
+        self.documented = {}
+
+        # Relations Resources' tags and components, gathered as the paths are
+
+        self.relations_resources = set()
+        self.relations_tags = []
+        self.relations_components = {}
+
+    def relations_identity(self, resource):
+        """
+        Gets a resource's identity, from those given if any, else the API's
+        """
+
+        if self.identities is not None and resource in self.identities:
+            return self.identities[resource]
+
+        return self.api.identity(resource)
+
     @staticmethod
     def relations_value(field): # pylint: disable=too-many-return-statements
         """
@@ -55,8 +92,8 @@ class OpenApi(flask_restx.Swagger):
 
         return example
 
-    @staticmethod
-    def relations_schemas(thy):
+    @classmethod
+    def relations_schemas(cls, thy):
         """
         Generates specs from fields
         """
@@ -115,71 +152,127 @@ class OpenApi(flask_restx.Swagger):
             },
         }
 
-        sort = {
-            "type": "object",
-            "properties": {
-                "sort": {
-                    "type": "array",
-                    "description": "sort by these fields, prefix with + for ascending (default), - for descending",
-                    "default": thy._model._order
-                }
-            }
+        return {
+            thy._model.TITLE: record,
+            thy.SINGULAR: singular,
+            thy.PLURAL: plural,
+            f"{thy.SINGULAR}_filter": filter,
+            **cls.relations_overrides(thy)
         }
 
-        limit = {
-            "type": "object",
-            "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": f"limit the number of {thy.PLURAL}"
-                },
-                "limit__start": {
-                    "type": "integer",
-                    "description": f"limit the number of {thy.PLURAL} starting here"
-                },
-                "limit__per_page": {
-                    "type": "integer",
-                    "description": f"limit the number of {thy.PLURAL} by this page size (default {thy._model.CHUNK})"
+    @classmethod
+    def relations_parameters(cls, thy):
+        """
+        Generates the query parameters filtering many, shared by update and delete
+        """
+
+        return {
+            f"{thy.SINGULAR}_params": {
+                "in": "query",
+                "schema": {
+                    "type": "object"
                 },
-                "limit__page": {
-                    "type": "integer",
-                    "description": f"limit the number of {thy.PLURAL} and retrieve this page"
+                "style": "form",
+                "explode": True,
+                "name": "params",
+                "examples": {
+                    "filter through params": {
+                        "value": {
+                            **cls.relations_example(thy)
+                        }
+                    },
+                    "filter through params limit": {
+                        "$ref": f"#/components/examples/{thy.SINGULAR}_params_limit"
+                    },
+                    "filter through params paginate": {
+                        "$ref": f"#/components/examples/{thy.SINGULAR}_params_paginate"
+                    },
+                    "filter through body": {
+                        "value": {}
+                    },
+                    "dry run": {
+                        "value": {
+                            **cls.relations_example(thy),
+                            "dry_run": True
+                        }
+                    }
                 }
             }
         }
 
-        count = {
-            "type": "object",
-            "properties": {
-                "count": {
-                    "type": "boolean",
-                    "description": f"return only the count of {thy.PLURAL} found"
-                }
-            }
-        }
+    @classmethod
+    def relations_examples(cls, thy):
+        """
+        Generates the examples more than one operation shows, to reference rather than repeat
+        """
+
+        example = cls.relations_example(thy)
+        readonly = cls.relations_example(thy, readonly=True)
 
         return {
-            thy._model.TITLE: record,
-            thy.SINGULAR: singular,
-            thy.PLURAL: plural,
-            f"{thy.SINGULAR}_filter": filter,
-            f"{thy.SINGULAR}_sort": sort,
-            f"{thy.SINGULAR}_limit": limit,
-            f"{thy.SINGULAR}_count": count
+            thy.SINGULAR: {
+                "value": {
+                    thy.SINGULAR: example
+                }
+            },
+            f"{thy.PLURAL}_read": {
+                "value": {
+                    thy.PLURAL: [readonly]
+                }
+            },
+            f"{thy.PLURAL}_list": {
+                "value": {
+                    thy.PLURAL: [readonly],
+                    "overflow": False,
+                    "formats": {}
+                }
+            },
+            f"{thy.SINGULAR}_filter_limit": {
+                "value": {
+                    "filter": example,
+                    "sort": thy._model._order,
+                    "limit": {
+                        "limit": thy._model.CHUNK,
+                        "start": 0
+                    }
+                }
+            },
+            f"{thy.SINGULAR}_filter_paginate": {
+                "value": {
+                    "filter": example,
+                    "sort": thy._model._order,
+                    "limit": {
+                        "page": 1,
+                        "per_page": thy._model.CHUNK
+                    }
+                }
+            },
+            f"{thy.SINGULAR}_params_limit": {
+                "value": {
+                    **example,
+                    "sort": ",".join(thy._model._order),
+                    "limit": thy._model.CHUNK,
+                    "limit__start": 0
+                }
+            },
+            f"{thy.SINGULAR}_params_paginate": {
+                "value": {
+                    **example,
+                    "sort": ",".join(thy._model._order),
+                    "limit__page": 1,
+                    "limit__per_page": thy._model.CHUNK
+                }
+            }
         }
 
-    @classmethod
-    def relations_create_options(cls, thy):
+    @staticmethod
+    def relations_bodies(thy):
         """
-        Generates create options operation
+        Generates the request bodies more than one operation takes
         """
 
         return {
-            "tags": [thy._model.TITLE],
-            "operationId": f"{thy.SINGULAR}_create_options",
-            "summary": f"generates and validates fields to create one {thy.SINGULAR} or many {thy.PLURAL}",
-            "description": f"To generate, send nothing. To validate, send a {thy.SINGULAR}.",
-            "requestBody": {
+            f"{thy.SINGULAR}_options": {
                 "content": {
                     "application/json": {
                         "schema": {
@@ -190,13 +283,67 @@ class OpenApi(flask_restx.Swagger):
                                 "value": {}
                             },
                             "validate": {
-                                "value": {
-                                    thy.SINGULAR: cls.relations_example(thy)
-                                }
+                                "$ref": f"#/components/examples/{thy.SINGULAR}"
                             }
                         }
                     }
                 }
+            }
+        }
+
+    @staticmethod
+    def relations_overrides(thy):
+        """
+        Generates what's particular to a model from the shared Sort and Limit, only where it differs
+        """
+
+        overrides = {}
+
+        if thy._model._order:
+            overrides[f"{thy.SINGULAR}_sort"] = {
+                "allOf": [{"$ref": "#/components/schemas/Sort"}],
+                "properties": {
+                    "sort": {
+                        "default": thy._model._order
+                    }
+                }
+            }
+
+        if thy._model.CHUNK != relations.Model.CHUNK:
+            overrides[f"{thy.SINGULAR}_limit"] = {
+                "allOf": [{"$ref": "#/components/schemas/Limit"}],
+                "properties": {
+                    "limit__per_page": {
+                        "default": thy._model.CHUNK
+                    }
+                }
+            }
+
+        return overrides
+
+    @classmethod
+    def relations_ref(cls, thy, shared):
+        """
+        References a model's override of a shared component if it has one, else the shared one
+        """
+
+        name = f"{thy.SINGULAR}_{shared.lower()}"
+
+        return f"#/components/schemas/{name if name in cls.relations_overrides(thy) else shared}"
+
+    @classmethod
+    def relations_create_options(cls, thy):
+        """
+        Generates create options operation
+        """
+
+        return {
+            "tags": [thy._model.TITLE],
+            "operationId": f"{thy.SINGULAR}_create_options",
+            "summary": f"generates and validates fields to create one {thy.SINGULAR} or many {thy.PLURAL}",
+            "description": f"To generate, send nothing. To validate, send a {thy.SINGULAR}.",
+            "requestBody": {
+                "$ref": f"#/components/requestBodies/{thy.SINGULAR}_options"
             },
             "responses": {
                 "200": {
@@ -242,13 +389,13 @@ class OpenApi(flask_restx.Swagger):
                                     ],
                                     "anyOf": [
                                         {
-                                            "$ref": f"#/components/schemas/{thy.SINGULAR}_sort"
+                                            "$ref": cls.relations_ref(thy, "Sort")
                                         },
                                         {
-                                            "$ref": f"#/components/schemas/{thy.SINGULAR}_limit"
+                                            "$ref": cls.relations_ref(thy, "Limit")
                                         },
                                         {
-                                            "$ref": f"#/components/schemas/{thy.SINGULAR}_count"
+                                            "$ref": "#/components/schemas/Count"
                                         }
                                     ]
                                 }
@@ -256,9 +403,7 @@ class OpenApi(flask_restx.Swagger):
                         },
                         "examples": {
                             "create one": {
-                                "value": {
-                                    thy.SINGULAR: cls.relations_example(thy)
-                                }
+                                "$ref": f"#/components/examples/{thy.SINGULAR}"
                             },
                             "create many": {
                                 "value": {
@@ -272,24 +417,10 @@ class OpenApi(flask_restx.Swagger):
                                 }
                             },
                             "limit retrieve": {
-                                "value": {
-                                    "filter": cls.relations_example(thy),
-                                    "sort": thy._model._order,
-                                    "limit": {
-                                        "limit": thy._model.CHUNK,
-                                        "start": 0
-                                    }
-                                }
+                                "$ref": f"#/components/examples/{thy.SINGULAR}_filter_limit"
                             },
                             "paginate retrieve": {
-                                "value": {
-                                    "filter": cls.relations_example(thy),
-                                    "sort": thy._model._order,
-                                    "limit": {
-                                        "page": 1,
-                                        "per_page": thy._model.CHUNK
-                                    }
-                                }
+                                "$ref": f"#/components/examples/{thy.SINGULAR}_filter_paginate"
                             },
                             "count retrieve": {
                                 "value": {
@@ -318,11 +449,7 @@ class OpenApi(flask_restx.Swagger):
                             },
                             "examples": {
                                 "list retrieve": {
-                                    "value": {
-                                        thy.PLURAL: [cls.relations_example(thy, readonly=True)],
-                                        "overflow": False,
-                                        "formats": {}
-                                    }
+                                    "$ref": f"#/components/examples/{thy.PLURAL}_list"
                                 },
                                 "count retrieve": {
                                     "value": {
@@ -355,9 +482,7 @@ class OpenApi(flask_restx.Swagger):
                                     }
                                 },
                                 "create many": {
-                                    "value": {
-                                        thy.PLURAL: [cls.relations_example(thy, readonly=True)]
-                                    }
+                                    "$ref": f"#/components/examples/{thy.PLURAL}_read"
                                 }
                             }
                         }
@@ -375,6 +500,8 @@ class OpenApi(flask_restx.Swagger):
         Generates reteieve many operation
         """
 
+        group = [field for field in thy._fields if field["kind"] in thy.GROUPS and not field.get("readonly")][:1]
+
         return {
             "tags": [thy._model.TITLE],
             "operationId": f"{thy.SINGULAR}_retrieve_many",
@@ -404,25 +531,46 @@ class OpenApi(flask_restx.Swagger):
                             }
                         },
                         "limit": {
+                            "$ref": f"#/components/examples/{thy.SINGULAR}_params_limit"
+                        },
+                        "paginate": {
+                            "$ref": f"#/components/examples/{thy.SINGULAR}_params_paginate"
+                        },
+                        "count": {
                             "value": {
                                 **cls.relations_example(thy),
-                                "sort": ",".join(thy._model._order),
-                                "limit": thy._model.CHUNK,
-                                "limit__start": 0
+                                "count": 1
                             }
                         },
-                        "paginate": {
+                        "compact": {
                             "value": {
                                 **cls.relations_example(thy),
-                                "sort": ",".join(thy._model._order),
-                                "limit__page": 1,
-                                "limit__per_page": thy._model.CHUNK
+                                "compact": "rows"
                             }
                         },
-                        "count": {
+                        "export": {
                             "value": {
                                 **cls.relations_example(thy),
-                                "count": 1
+                                "export": "arrow"
+                            }
+                        },
+                        "aggregate": {
+                            "value": {
+                                **cls.relations_example(thy),
+                                **{"group": field["name"] for field in group},
+                                "agg": "count"
+                            }
+                        },
+                        "distinct": {
+                            "value": {
+                                **cls.relations_example(thy),
+                                **{"distinct": field["name"] for field in group}
+                            }
+                        },
+                        "explain": {
+                            "value": {
+                                **cls.relations_example(thy),
+                                "explain": True
                             }
                         }
                     }
@@ -438,8 +586,12 @@ class OpenApi(flask_restx.Swagger):
                             },
                             "examples": {
                                 "list retrieve": {
+                                    "$ref": f"#/components/examples/{thy.PLURAL}_list"
+                                },
+                                "compact retrieve": {
                                     "value": {
-                                        thy.PLURAL: [cls.relations_example(thy, readonly=True)],
+                                        "columns": list(cls.relations_example(thy, readonly=True).keys()),
+                                        thy.PLURAL: [list(cls.relations_example(thy, readonly=True).values())],
                                         "overflow": False,
                                         "formats": {}
                                     }
@@ -448,8 +600,31 @@ class OpenApi(flask_restx.Swagger):
                                     "value": {
                                         "count": 1
                                     }
+                                },
+                                "aggregate retrieve": {
+                                    "value": {
+                                        thy.PLURAL: [{
+                                            **{field["name"]: cls.relations_value(field) for field in group},
+                                            "count": 1
+                                        }]
+                                    }
+                                },
+                                "distinct retrieve": {
+                                    "value": {
+                                        "distinct": [cls.relations_value(field) for field in group],
+                                        "overflow": False
+                                    }
+                                }
+                            }
+                        },
+                        **{
+                            mediatype: {
+                                "schema": {
+                                    "type": "string",
+                                    "format": "binary"
                                 }
                             }
+                            for mediatype in representations.EXPORTS.values()
                         }
                     }
                 }
@@ -468,39 +643,7 @@ class OpenApi(flask_restx.Swagger):
             "summary": f"updates many {thy.PLURAL}",
             "parameters": [
                 {
-                    "in": "query",
-                    "schema": {
-                        "type": "object"
-                    },
-                    "style": "form",
-                    "explode": True,
-                    "name": "params",
-                    "examples": {
-                        "filter through params": {
-                            "value": {
-                                **cls.relations_example(thy)
-                            }
-                        },
-                        "filter through params limit": {
-                            "value": {
-                                **cls.relations_example(thy),
-                                "sort": ",".join(thy._model._order),
-                                "limit": thy._model.CHUNK,
-                                "limit__start": 0
-                            }
-                        },
-                        "filter through params paginate": {
-                            "value": {
-                                **cls.relations_example(thy),
-                                "sort": ",".join(thy._model._order),
-                                "limit__page": 1,
-                                "limit__per_page": thy._model.CHUNK
-                            }
-                        },
-                        "filter through body": {
-                            "value": {}
-                        }
-                    }
+                    "$ref": f"#/components/parameters/{thy.SINGULAR}_params"
                 }
             ],
             "requestBody": {
@@ -555,7 +698,17 @@ class OpenApi(flask_restx.Swagger):
                                     "filter": {},
                                     thy.PLURAL: cls.relations_example(thy)
                                 }
-                            }
+                            },
+                            **({
+                                "update each": {
+                                    "value": {
+                                        thy.PLURAL: [{
+                                            "id": cls.relations_example(thy, readonly=True)[thy._model._id],
+                                            "changes": cls.relations_example(thy)
+                                        }]
+                                    }
+                                }
+                            } if thy._model._id is not None else {})
                         }
                     }
                 }
@@ -577,6 +730,50 @@ class OpenApi(flask_restx.Swagger):
             }
         }
 
+    @classmethod
+    def relations_upsert_many(cls, thy):
+        """
+        Generates upsert many operation
+        """
+
+        keys = thy.UPSERT or [thy._model._id]
+
+        return {
+            "tags": [thy._model.TITLE],
+            "operationId": f"{thy.SINGULAR}_upsert_many",
+            "summary": f"creates or updates many {thy.PLURAL}",
+            "description": f"Send {thy.PLURAL}, matched on {', '.join(keys)}, created if not there, else updated.",
+            "requestBody": {
+                "content": {
+                    "application/json": {
+                        "schema": {
+                            "$ref": f"#/components/schemas/{thy.PLURAL}"
+                        },
+                        "examples": {
+                            "upsert": {
+                                "$ref": f"#/components/examples/{thy.PLURAL}_read"
+                            }
+                        }
+                    }
+                }
+            },
+            "responses": {
+                "200": {
+                    "description": f"many {thy.PLURAL} created or updated",
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "$ref": "#/components/schemas/Upserted"
+                            }
+                        }
+                    }
+                },
+                "400": {
+                    "description": "unable to upsert due to bad request"
+                }
+            }
+        }
+
     @classmethod
     def relations_delete_many(cls, thy):
         """
@@ -589,39 +786,7 @@ class OpenApi(flask_restx.Swagger):
             "summary": f"deletes many {thy.PLURAL}",
             "parameters": [
                 {
-                    "in": "query",
-                    "schema": {
-                        "type": "object"
-                    },
-                    "style": "form",
-                    "explode": True,
-                    "name": "params",
-                    "examples": {
-                        "filter through params": {
-                            "value": {
-                                **cls.relations_example(thy)
-                            }
-                        },
-                        "filter through params limit": {
-                            "value": {
-                                **cls.relations_example(thy),
-                                "sort": ",".join(thy._model._order),
-                                "limit": thy._model.CHUNK,
-                                "limit__start": 0
-                            }
-                        },
-                        "filter through params paginate": {
-                            "value": {
-                                **cls.relations_example(thy),
-                                "sort": ",".join(thy._model._order),
-                                "limit__page": 1,
-                                "limit__per_page": thy._model.CHUNK
-                            }
-                        },
-                        "filter through body": {
-                            "value": {}
-                        }
-                    }
+                    "$ref": f"#/components/parameters/{thy.SINGULAR}_params"
                 }
             ],
             "requestBody": {
@@ -644,26 +809,12 @@ class OpenApi(flask_restx.Swagger):
                                 }
                             },
                             "filter through body limit": {
-                                "value": {
-                                    "filter": cls.relations_example(thy),
-                                    "sort": thy._model._order,
-                                    "limit": {
-                                        "limit": thy._model.CHUNK,
-                                        "start": 0
-                                    }
-                                }
-                            },
-                            "filter through body paginate": {
-                                "value": {
-                                    "filter": cls.relations_example(thy),
-                                    "sort": thy._model._order,
-                                    "limit": {
-                                        "page": 1,
-                                        "per_page": thy._model.CHUNK
-                                    }
-                                }
-                            },
-                            "delete all": {
+                                "$ref": f"#/components/examples/{thy.SINGULAR}_filter_limit"
+                            },
+                            "filter through body paginate": {
+                                "$ref": f"#/components/examples/{thy.SINGULAR}_filter_paginate"
+                            },
+                            "delete all": {
                                 "value": {
                                     "filter": {}
                                 }
@@ -700,23 +851,7 @@ class OpenApi(flask_restx.Swagger):
             "operationId": f"{thy.SINGULAR}_update_options",
             "summary": f"generates and validates fields to update one {thy.SINGULAR}",
             "requestBody": {
-                "content": {
-                    "application/json": {
-                        "schema": {
-                            "$ref": f"#/components/schemas/{thy.SINGULAR}"
-                        },
-                        "examples": {
-                            "generate": {
-                                "value": {}
-                            },
-                            "validate": {
-                                "value": {
-                                    thy.SINGULAR: cls.relations_example(thy)
-                                }
-                            }
-                        }
-                    }
-                }
+                "$ref": f"#/components/requestBodies/{thy.SINGULAR}_options"
             },
             "responses": {
                 "200": {
@@ -789,9 +924,7 @@ class OpenApi(flask_restx.Swagger):
                         },
                         "examples": {
                             "update": {
-                                "value": {
-                                    thy.SINGULAR: cls.relations_example(thy)
-                                }
+                                "$ref": f"#/components/examples/{thy.SINGULAR}"
                             }
                         }
                     }
@@ -844,63 +977,142 @@ class OpenApi(flask_restx.Swagger):
             }
         }
 
-    def relations_operations(self, specs, ns, urls, thy): # pylint: disable=too-many-branches
+    def relations_path(self, path, thy):
         """
-        Generates operations for all methods
+        Generates operations for all methods of a path
+        """
+
+        if "{" not in path:
+            operations = [
+                ("options", self.relations_create_options),
+                ("post", self.relations_create_filter),
+                ("get", self.relations_retrieve_many),
+                ("patch", self.relations_update_many),
+                ("delete", self.relations_delete_many)
+            ]
+
+            if thy.UPSERT or thy._model._id is not None:
+                operations.insert(4, ("put", self.relations_upsert_many))
+        else:
+            operations = [
+                ("options", self.relations_update_options),
+                ("get", self.relations_retrieve_one),
+                ("patch", self.relations_update_one),
+                ("delete", self.relations_delete_one)
+            ]
+
+        return collections.OrderedDict((method, operation(thy)) for method, operation in operations)
+
+    def relations_operations(self, specs, ns, urls, thy):
+        """
+        Generates operations for all methods of a resource's paths, over whatever's there already
         """
 
         for url in self.api.ns_urls(ns, urls):
 
             path = flask_restx.swagger.extract_path(url)
+            methods = specs["paths"].get(path, {})
 
-            methods = specs["paths"][path]
-            specs["paths"][path] = collections.OrderedDict()
-
-            for method in ["options", "post", "get", "patch", "delete"]:
-
-                if "{" not in path:
-                    if method == "options":
-                        specs["paths"][path][method] = {**methods[method], **self.relations_create_options(thy)}
-                    elif method == "post":
-                        specs["paths"][path][method] = {**methods[method], **self.relations_create_filter(thy)}
-                    elif method == "get":
-                        specs["paths"][path][method] = {**methods[method], **self.relations_retrieve_many(thy)}
-                    elif method == "patch":
-                        specs["paths"][path][method] = {**methods[method], **self.relations_update_many(thy)}
-                    elif method == "delete":
-                        specs["paths"][path][method] = {**methods[method], **self.relations_delete_many(thy)}
-                else:
-                    if method == "options":
-                        specs["paths"][path][method] = {**methods[method], **self.relations_update_options(thy)}
-                    elif method == "post":
-                        continue
-                    elif method == "get":
-                        specs["paths"][path][method] = {**methods[method], **self.relations_retrieve_one(thy)}
-                    elif method == "patch":
-                        specs["paths"][path][method] = {**methods[method], **self.relations_update_one(thy)}
-                    elif method == "delete":
-                        specs["paths"][path][method] = {**methods[method], **self.relations_delete_one(thy)}
+            specs["paths"][path] = collections.OrderedDict(
+                (method, {**methods.get(method, {}), **operation})
+                for method, operation in self.relations_path(path, thy).items()
+            )
 
     def relations_resource(self, specs, ns, resource, urls):
         """
-        Overrides OpenApi specs for a Relations Resource
+        Adds a Relations Resource's tag, components, and paths to specs already made, as serialize_resource
+        does while they're being made
         """
 
-        thy = resource.thy()
+        thy = self.relations_identity(resource)
 
-        specs["tags"].append({
-            "name": thy._model.TITLE
-        })
+        specs["tags"].append({"name": thy._model.TITLE})
 
-        specs["components"]["schemas"].update(self.relations_schemas(thy))
+        components = specs.setdefault("components", {})
+        components.setdefault("schemas", {}).update(self.relations_schemas(thy))
+        components.setdefault("parameters", {}).update(self.relations_parameters(thy))
+        components.setdefault("examples", {}).update(self.relations_examples(thy))
+        components.setdefault("requestBodies", {}).update(self.relations_bodies(thy))
 
         self.relations_operations(specs, ns, urls, thy)
 
+    def relations_documented(self, resource, route_doc):
+        """
+        Whether a resource or its methods were documented with anything flask-restx would add, worked out once
+        """
+
+        if route_doc or getattr(resource, "__apidoc__", None) is not None:
+            return True
+
+        if resource not in self.documented:
+
+            functions = [getattr(resource, method.lower(), None) for method in resource.methods or []]
+
+            self.documented[resource] = any(
+                getattr(function, "__apidoc__", None) or flask_restx.swagger.parse_docstring(function)["details"]
+                for function in functions if function is not None
+            )
+
+        return self.documented[resource]
+
+    def serialize_resource(self, ns, resource, url, route_doc=None, **kwargs):
+        """
+        Generates a Relations Resource's path directly, else leaves it to flask-restx, None if it's not
+        in the namespaces or tags asked for
+        """
+
+        if self.namespaces is not None and ns.name not in self.namespaces:
+            return None
+
+        if not hasattr(resource, "thy"):
+
+            if self.tags is not None and ns.name not in self.tags:
+                return None
+
+            return super().serialize_resource(ns, resource, url, route_doc=route_doc, **kwargs)
+
+        thy = self.relations_identity(resource)
+
+        if self.tags is not None and thy._model.TITLE not in self.tags:
+            return None
+
+        # Only what's documented needs going through flask-restx
+
+        doc = None
+
+        if self.relations_documented(resource, route_doc):
+
+            doc = self.extract_resource_doc(resource, url, route_doc=route_doc)
+
+            if doc is False:
+                return None
+
+        if resource not in self.relations_resources:
+            self.relations_resources.add(resource)
+            self.relations_tags.append({"name": thy._model.TITLE})
+            self.relations_components["schemas"].update(self.relations_schemas(thy))
+            self.relations_components["parameters"].update(self.relations_parameters(thy))
+            self.relations_components["examples"].update(self.relations_examples(thy))
+            self.relations_components["requestBodies"].update(self.relations_bodies(thy))
+
+        # Keep whatever the methods were documented with, security and such, under what's generated
+
+        return collections.OrderedDict(
+            (method, {**(self.serialize_operation(doc, method) if doc and doc.get(method) else {}), **operation})
+            for method, operation in self.relations_path(flask_restx.swagger.extract_path(url), thy).items()
+        )
+
     def as_dict(self):
         """
         Overides swagger dict to make it OpenAPI
         """
 
+        # Relations Resources are generated as flask-restx goes through the paths, not after
+
+        self.relations_resources = set()
+        self.relations_tags = []
+        self.relations_components = {"schemas": {}, "parameters": {}, "examples": {}, "requestBodies": {}}
+
         specs = super().as_dict()
 
         del specs["swagger"]
@@ -990,6 +1202,46 @@ class OpenApi(flask_restx.Swagger):
                     }
                 }
             },
+            "Sort": {
+                "type": "object",
+                "properties": {
+                    "sort": {
+                        "type": "array",
+                        "description": "sort by these fields, prefix with + for ascending (default), - for descending"
+                    }
+                }
+            },
+            "Limit": {
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "integer",
+                        "description": "limit the number retrieved"
+                    },
+                    "limit__start": {
+                        "type": "integer",
+                        "description": "limit the number retrieved starting here"
+                    },
+                    "limit__per_page": {
+                        "type": "integer",
+                        "description": "limit the number retrieved by this page size",
+                        "default": relations.Model.CHUNK
+                    },
+                    "limit__page": {
+                        "type": "integer",
+                        "description": "limit the number retrieved and retrieve this page"
+                    }
+                }
+            },
+            "Count": {
+                "type": "object",
+                "properties": {
+                    "count": {
+                        "type": "boolean",
+                        "description": "return only the count of those found"
+                    }
+                }
+            },
             "Counted": {
                 "type": "object",
                 "properties": {
@@ -1016,22 +1268,424 @@ class OpenApi(flask_restx.Swagger):
                         "description": "count of those deleted"
                     }
                 }
+            },
+            "Upserted": {
+                "type": "object",
+                "properties": {
+                    "created": {
+                        "type": "integer",
+                        "description": "count of those created"
+                    },
+                    "updated": {
+                        "type": "integer",
+                        "description": "count of those updated"
+                    },
+                    "unchanged": {
+                        "type": "integer",
+                        "description": "count of those already as sent"
+                    }
+                }
             }
         })
 
-        for ns in self.api.namespaces:
-            for resource, urls, _, _ in ns.resources:
-                if hasattr(resource, "thy"):
-                    self.relations_resource(specs, ns, resource, urls)
+        if self.namespaces is not None:
+            skip = {ns.name for ns in self.api.namespaces if ns.name not in self.namespaces}
+            specs["tags"] = [tag for tag in specs.get("tags", []) if tag["name"] not in skip]
+
+        if self.tags is not None:
+            specs["tags"] = [tag for tag in specs.get("tags", []) if tag["name"] in self.tags]
+
+        specs.setdefault("tags", []).extend(self.relations_tags)
+        specs["components"]["schemas"].update(self.relations_components["schemas"])
+        specs["components"].setdefault("parameters", {}).update(self.relations_components["parameters"])
+        specs["components"].setdefault("examples", {}).update(self.relations_components["examples"])
+        specs["components"].setdefault("requestBodies", {}).update(self.relations_components["requestBodies"])
 
         return specs
 
+    def split(self):
+        """
+        Generates a spec per namespace
+        """
+
+        return {
+            ns.name: type(self)(self.api, [ns.name]).as_dict()
+            for ns in self.api.namespaces
+            if ns.resources
+        }
+
+
+class SwaggerView(flask_restx.api.SwaggerView):
+    """
+    Serves the whole spec, or just a namespace's or tag's
+    """
+
+    def get(self, namespace=None): # pylint: disable=arguments-differ
+        """
+        Gets the spec, partial if asked for by namespace or tag
+        """
+
+        namespace = namespace or flask.request.args.get("namespace")
+        tag = flask.request.args.get("tag")
+
+        if namespace is None and tag is None:
+            return super().get()
+
+        return self.api.partial(namespace, tag), 200
+
+
+class Transaction(flask_restx.Resource):
+    """
+    Runs operations across resources in order, in one transaction where the sources have them, atomic only if
+    they all do
+    """
+
+    LIMIT = 100 # Most operations at once
+
+    ACTIONS = ["create", "update", "delete"]
+
+    METHODS = {"create": "post", "update": "patch", "delete": "delete"} # What each would be on its own
+
+    def __init__(self, api=None, *args, **kwargs): # pylint: disable=keyword-arg-before-vararg
+
+        super().__init__(api, *args, **kwargs)
+
+        self.results = {}
+
+    def resolve(self, value):
+        """
+        Replaces references, {"$ref": "<ref>.<field>"}, with what earlier operations came up with
+        """
+
+        if isinstance(value, dict):
+
+            if list(value) == ["$ref"]:
+
+                ref, _, field = str(value["$ref"]).partition(".")
+
+                if ref not in self.results or field not in self.results[ref]:
+                    raise werkzeug.exceptions.BadRequest(f"cannot find reference {value['$ref']}")
+
+                return self.results[ref][field]
+
+            return {key: self.resolve(item) for key, item in value.items()}
+
+        if isinstance(value, list):
+            return [self.resolve(item) for item in value]
+
+        return value
+
+    @staticmethod
+    def operation(operation):
+        """
+        Names what an operation is doing, for weighing its cost as the resource would
+        """
+
+        if operation["action"] == "create":
+            return "create_one"
+
+        return f"{operation['action']}_{'one' if 'id' in operation else 'many'}"
+
+    def admit(self, stack, planned):
+        """
+        Takes a slot for each resource and method involved, held till the end, always in the same order so
+        transactions never wait on each other
+        """
+
+        admissions = {}
+
+        for _, resource, operation in planned:
+
+            admission = resource.admission(self.METHODS[operation["action"]])
+
+            if admission is not None:
+                admissions[admission.name] = admission
+
+        for name in sorted(admissions):
+            admissions[name].acquire()
+            stack.callback(admissions[name].release)
+
+    @staticmethod
+    def run(resource, operation, atomic=False):
+        """
+        Runs a single operation, returning its result and what changed
+        """
+
+        thy = resource
+        action = operation["action"]
+
+        if action == "create":
+
+            record = thy.MODEL(**operation.get(thy.SINGULAR, {})).create().export()
+
+            return {thy.SINGULAR: record}, record, ("created", [record.get(thy._model._id)])
+
+        if "id" in operation:
+            models = thy.MODEL.one(**{thy._model._id: operation["id"]})
+            ids = [operation["id"]]
+        elif "filter" in operation:
+
+            if not isinstance(operation["filter"], dict):
+                raise werkzeug.exceptions.BadRequest("to confirm all, send a blank filter {}")
+
+            criteria = Criteria.ensure(thy.MODEL).validate(operation["filter"])
+            models = thy.MODEL.many(**criteria)
+            ids = thy.matched(criteria)
+
+            thy.capped(criteria, action)
+
+            # In a transaction, batches only keep statements small, as it's all committed and logged at the end
+
+            if thy.BATCH is not None:
+                result = thy.batched(criteria, action, operation.get(thy.SINGULAR, {}), commit=not atomic)
+                return result, {"id": None}, (f"{action}d", ids if atomic and result[f"{action}d"] else [])
+
+        else:
+            raise werkzeug.exceptions.BadRequest(f"{action} needs an id or filter")
+
+        if action == "update":
+            count = models.set(**operation.get(thy.SINGULAR, {})).update()
+            return {"updated": count}, {"id": operation.get("id")}, ("updated", ids if count else [])
+
+        count = models.delete()
+
+        return {"deleted": count}, {"id": operation.get("id")}, ("deleted", ids if count else [])
+
+    @exceptions
+    def post(self): # pylint: disable=too-many-locals,too-many-branches
+        """
+        Runs operations in order, all or nothing where the sources allow
+        """
+
+        body = Resource.json()
+        operations = body.get("operations") if isinstance(body, dict) else None
+
+        if not isinstance(operations, list) or not operations:
+            raise werkzeug.exceptions.BadRequest("operations required")
+
+        if len(operations) > self.LIMIT:
+            raise werkzeug.exceptions.BadRequest(f"at most {self.LIMIT} operations")
+
+        resources = self.api.singulars()
+        planned = []
+
+        for index, operation in enumerate(operations):
+
+            singular = operation.get("resource") if isinstance(operation, dict) else None
+
+            if singular not in resources:
+                raise werkzeug.exceptions.BadRequest(f"operation {index}: cannot find resource {singular}")
+
+            if operation.get("action") not in self.ACTIONS:
+                raise werkzeug.exceptions.BadRequest(f"operation {index}: action must be one of {', '.join(self.ACTIONS)}")
+
+            resource = resources[operation["resource"]](api=self.api)
+
+            # Each costs what it would on its own, taken before anything's done
+
+            rate = resource.limiter()
+
+            if rate is not None:
+
+                allowed, headers = rate.take(rate.key(flask.request), rate.cost(self.operation(operation)))
+
+                if not allowed:
+                    return {"message": f"operation {index}: too many requests, try again later"}, 429, headers
+
+            planned.append((index, resource, operation))
+
+        results = []
+        changes = []
+
+        models = {resource.MODEL.SOURCE: resource.MODEL for _, resource, _ in planned}.values()
+
+        # If any source can't roll back, what's done is kept, so log it as it's done
+
+        atomic = all(transactional(model) for model in models)
+
+        with contextlib.ExitStack() as stack:
+
+            try:
+                self.admit(stack, planned)
+            except AdmissionError as exception:
+                return {"message": str(exception)}, 503, {"Retry-After": str(math.ceil(exception.admission.wait or 1))}
+
+            for model in models:
+                stack.enter_context(transaction(model))
+
+            for index, resource, operation in planned:
+
+                try:
+                    result, reference, change = self.run(resource, self.resolve(operation), atomic)
+                except werkzeug.exceptions.HTTPException as exception:
+                    exception.description = f"operation {index}: {exception.description}"
+                    raise
+                except relations.ModelError as exception:
+                    if "none retrieved" in str(exception):
+                        raise werkzeug.exceptions.NotFound(f"operation {index}: {exception}")
+                    raise
+
+                if "ref" in operation:
+                    self.results[operation["ref"]] = reference
+
+                results.append(result)
+
+                if atomic:
+                    changes.append((resource, change))
+                else:
+                    resource.changed(*change)
+
+        # Only once it's all gone through
+
+        for resource, (action, ids) in changes:
+            resource.changed(action, ids)
+
+        return {"results": results, "atomic": atomic}, 200
+
 
 class Api(flask_restx.Api):
     """
     Overrride Flask RestX API
     """
 
+    def __init__(self, *args, rate=None, dumps=None, **kwargs): # pylint: disable=redefined-outer-name
+
+        self.rate = rate
+        self.dumps = dumps if dumps is not None else representations.dumps
+        self.identities = {}
+        self.partials = {}
+
+        super().__init__(*args, **kwargs)
+
+        self.representations["application/json"] = functools.partial(representations.output_json, dumps=self.dumps)
+
+        for mediatype, encode in representations.DUMPS.items():
+            self.representations[mediatype] = functools.partial(representations.output_binary, dumps=encode)
+
+    def identity(self, resource):
+        """
+        Gets a resource's identity, worked out once
+        """
+
+        if resource not in self.identities:
+            self.identities[resource] = resource.thy()
+
+        return self.identities[resource]
+
+    def refresh(self):
+        """
+        Works out identities, model lists, criteria and the spec again, then swaps them in together
+        """
+
+        identities = {}
+        catalogs = {}
+
+        for ns in self.namespaces:
+            for resource, _, _, _ in ns.resources:
+                if hasattr(resource, "thy"):
+                    identities[resource] = resource.thy()
+
+        for ns in self.namespaces:
+            for resource, _, _, _ in ns.resources:
+                if hasattr(resource, "catalog"):
+                    catalogs[resource] = resource.catalog(identities)
+
+        criteria = {thy.MODEL: Criteria(thy.MODEL) for thy in identities.values()}
+
+        # The spec needs a request for its base path, so make one if not in one
+
+        with self.app.test_request_context() if not flask.has_request_context() else contextlib.nullcontext():
+            schema = OpenApi(self, identities=identities).as_dict()
+
+        # Everything's built, so swap it all in
+
+        self.identities = identities
+
+        for resource, catalog in catalogs.items():
+            resource.CATALOG = catalog
+
+        with Criteria.LOCK:
+            Criteria.INSTANCES = {**Criteria.INSTANCES, **criteria}
+
+        self._schema = schema
+        self.__dict__["__schema__"] = schema
+        self.partials = {}
+
+    def singulars(self):
+        """
+        Resources by singular name
+        """
+
+        return {
+            self.identity(resource).SINGULAR: resource
+            for ns in self.namespaces
+            for resource, _, _, _ in ns.resources
+            if hasattr(resource, "thy")
+        }
+
+    def add_transaction(self, path="/transaction"):
+        """
+        Adds the endpoint for running operations across resources in one go
+        """
+
+        self.add_resource(Transaction, path)
+
+    def _register_specs(self, app_or_blueprint):
+        """
+        Registers the spec, whole and by namespace
+        """
+
+        if self._add_specs:
+            self._register_view(
+                app_or_blueprint,
+                SwaggerView,
+                self.default_namespace,
+                "/swagger.json",
+                "/swagger/<namespace>.json",
+                endpoint="specs",
+                resource_class_args=(self,),
+            )
+            self.endpoints.add("specs")
+
+    def partial(self, namespace=None, tag=None):
+        """
+        Gets the spec for just a namespace and/or tag, generated the first time it's asked for
+        """
+
+        if namespace is not None and namespace not in [ns.name for ns in self.namespaces]:
+            raise werkzeug.exceptions.NotFound(f"cannot find namespace {namespace}")
+
+        if tag is not None and tag not in self.tagged():
+            raise werkzeug.exceptions.NotFound(f"cannot find tag {tag}")
+
+        key = (namespace, tag)
+
+        if key not in self.partials:
+            self.partials[key] = OpenApi(
+                self,
+                [namespace] if namespace is not None else None,
+                [tag] if tag is not None else None
+            ).as_dict()
+
+        return self.partials[key]
+
+    def tagged(self):
+        """
+        Names of all the tags in the spec, without generating it
+        """
+
+        tags = set()
+
+        for ns in self.namespaces:
+
+            tags.add(ns.name)
+
+            for resource, _, _, _ in ns.resources:
+                if hasattr(resource, "thy"):
+                    tags.add(self.identity(resource)._model.TITLE)
+
+        return tags
+
     @cached_property
     def __schema__(self):
         """
@@ -0,0 +1,175 @@
+"""
+Changes module for letting others keep up with Relations Resources incrementally
+"""
+
+import queue
+import itertools
+import threading
+import collections
+
+
+class Subscription:
+    """
+    Changes as they're logged, buffered only so much for one listener
+    """
+
+    size = None       # Most changes to hold for the listener
+    watermark = None  # Number of the latest change taken
+    overflowed = None # Whether the listener fell behind and changes were dropped
+
+    def __init__(self, size=100, watermark=0):
+
+        self.size = size
+        self.watermark = watermark
+        self.queue = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+    def put(self, change):
+        """
+        Adds a change without waiting, dropping it and all after if there's no room
+        """
+
+        if self.overflowed:
+            return
+
+        try:
+            self.queue.put_nowait(change)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, limit, timeout=None):
+        """
+        Waits for changes, taking up to limit of them
+        """
+
+        changes = []
+
+        try:
+            changes.append(self.queue.get(timeout=timeout))
+        except queue.Empty:
+            return changes
+
+        while len(changes) < limit:
+            try:
+                changes.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+        self.watermark = changes[-1][0]
+
+        return changes
+
+    def drained(self):
+        """
+        Whether everything that made it in has been taken
+        """
+
+        return self.queue.empty()
+
+
+class ChangeLog:
+    """
+    Recent changes in memory, numbered in order, for a single worker
+    """
+
+    ACTIONS = ["created", "updated", "deleted"]
+
+    size = None          # How many changes to keep
+    changes = None       # (number, action, id) oldest first
+    number = None        # Number of the latest change
+    subscriptions = None # Who's listening for changes as they happen
+
+    def __init__(self, size=10000):
+
+        self.size = size
+        self.changes = collections.deque(maxlen=size)
+        self.number = 0
+        self.subscriptions = set()
+        self.lock = threading.Lock()
+
+    def record(self, action, ids):
+        """
+        Notes an action on ids, returning the latest number
+        """
+
+        with self.lock:
+
+            for id in ids:
+
+                self.number += 1
+                self.changes.append((self.number, action, id))
+
+                for subscription in self.subscriptions:
+                    subscription.put(self.changes[-1])
+
+            return self.number
+
+    def subscribe(self, size=100, watermark=None):
+        """
+        Starts sending changes to a new subscription, starting after a watermark if there is one
+        """
+
+        with self.lock:
+
+            subscription = Subscription(size, watermark if watermark is not None else self.number)
+
+            if watermark is not None:
+
+                if self.number - len(self.changes) > watermark:
+                    subscription.overflowed = True
+
+                start = max(0, watermark - (self.number - len(self.changes)))
+
+                for change in itertools.islice(self.changes, start, None):
+                    subscription.put(change)
+
+            self.subscriptions.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Stops sending changes to a subscription
+        """
+
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def expired(self, watermark):
+        """
+        Whether some changes after a watermark have already been dropped
+        """
+
+        with self.lock:
+            return self.number - len(self.changes) > watermark
+
+    def since(self, watermark, limit):
+        """
+        Ids by their latest action after a watermark, the new watermark, and whether there's more
+        """
+
+        with self.lock:
+            start = max(0, watermark - (self.number - len(self.changes)))
+            changes = list(itertools.islice(self.changes, start, start + limit + 1))
+
+        overflow = len(changes) > limit
+        changes = changes[:limit]
+
+        latest = {}
+
+        for _, action, id in changes:
+
+            # Something created then updated is still new to whoever's asking
+
+            if action == "updated" and latest.get(id) == "created":
+                continue
+
+            latest.pop(id, None)
+            latest[id] = action
+
+        actions = {action: [] for action in self.ACTIONS}
+
+        for id, action in latest.items():
+            actions[action].append(id)
+
+        return actions, changes[-1][0] if changes else watermark, overflow
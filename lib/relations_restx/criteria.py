@@ -0,0 +1,150 @@
+"""
+Criteria module for checking filters before they reach Relations Models
+"""
+
+import functools
+import threading
+
+import werkzeug.exceptions
+
+import relations
+
+
+class Criteria:
+    """
+    Knows what criteria a model takes, compiled once from its fields and relations
+    """
+
+    INSTANCES = {}
+    LOCK = threading.Lock()
+
+    SCALARS = [bool, int, float, str]
+    COERCE = ["eq", "gt", "gte", "lt", "lte", "in"]
+    TRUE = ["1", "true", "yes", "on"]
+    FALSE = ["0", "false", "no", "off"]
+
+    RELATIONS = {
+        "PARENTS": "Parent",
+        "CHILDREN": "Child",
+        "SISTERS": "Sister",
+        "BROTHERS": "Brother"
+    }
+
+    kinds = None     # Kind of each field, and extracted value, by name
+    relations = None # Related model by relation name
+
+    def __init__(self, model, cache=1024):
+
+        thy = model.thy()
+
+        self.kinds = {field.name: field.kind for field in thy._fields._order}
+
+        # Extracted values, like ip__value, are their own kind
+
+        for field in thy._fields._order:
+            for name, kind in (field.extract or {}).items():
+                self.kinds[f"{field.name}__{name}"] = kind
+        self.relations = {}
+
+        for attribute, side in self.RELATIONS.items():
+            for name, relation in (getattr(thy, attribute) or {}).items():
+                self.relations[name] = getattr(relation, side)
+
+        # Repeated criteria names are parsed only once
+
+        self.parse = functools.lru_cache(maxsize=cache)(self.parse)
+
+    @classmethod
+    def ensure(cls, model):
+        """
+        Gets the compiled criteria for a model, compiling if need be
+        """
+
+        with cls.LOCK:
+
+            if model not in cls.INSTANCES:
+                cls.INSTANCES[model] = cls(model)
+
+            return cls.INSTANCES[model]
+
+    def parse(self, name): # pylint: disable=method-hidden
+        """
+        Works out a criterion's kind and operator, or which relation it's for
+        """
+
+        if name == "like":
+            return None, "like", None, None
+
+        pieces = name.split("__", 1)
+
+        if len(pieces) == 2 and pieces[0] in self.relations:
+            return None, None, self.relations[pieces[0]], pieces[1]
+
+        if pieces[0] not in self.kinds:
+            raise werkzeug.exceptions.BadRequest(f"unknown criterion {name}")
+
+        kind = self.kinds[pieces[0]]
+        path = pieces[1].split("__") if len(pieces) == 2 else []
+        operator = "eq"
+
+        if path and path[-1].split("not_", 1)[-1] in relations.Field.OPERATORS:
+            operator = path.pop(-1).split("not_", 1)[-1]
+
+        if len(path) == 1 and f"{pieces[0]}__{path[0]}" in self.kinds:
+            kind = self.kinds[f"{pieces[0]}__{path.pop(0)}"]
+
+        if path and kind in self.SCALARS:
+            raise werkzeug.exceptions.BadRequest(f"unknown criterion {name}, {kind.__name__} has no {'__'.join(path)}")
+
+        return (kind if not path else None), operator, None, None
+
+    def coerce(self, name, kind, value):
+        """
+        Converts strings, as from a query string, to what the field is
+        """
+
+        if isinstance(value, (list, tuple, set)):
+            return [self.coerce(name, kind, item) for item in value]
+
+        if not isinstance(value, str) or kind is str or kind not in self.SCALARS:
+            return value
+
+        if kind is bool:
+
+            if value.lower() in self.TRUE:
+                return True
+
+            if value.lower() in self.FALSE:
+                return False
+
+        else:
+
+            try:
+                return kind(value)
+            except ValueError:
+                pass
+
+        raise werkzeug.exceptions.BadRequest(f"invalid {kind.__name__} {value} for {name}")
+
+    def validate(self, criteria):
+        """
+        Checks all criteria, returning them with values converted
+        """
+
+        validated = {}
+
+        for name, value in criteria.items():
+
+            kind, operator, relation, rest = self.parse(name)
+
+            if relation is not None:
+                try:
+                    value = self.ensure(relation).validate({rest: value})[rest]
+                except werkzeug.exceptions.BadRequest as exception:
+                    raise werkzeug.exceptions.BadRequest(f"{exception.description} through {name.split('__', 1)[0]}")
+            elif kind is not None and operator in self.COERCE:
+                value = self.coerce(name, kind, value)
+
+            validated[name] = value
+
+        return validated
@@ -0,0 +1,118 @@
+"""
+Flight module for sharing work among identical concurrent requests
+"""
+
+import time
+import threading
+
+import flask_restx
+import werkzeug.wrappers
+
+
+class Passenger: # pylint: disable=too-few-public-methods
+    """
+    Waits on the one actually doing the work
+    """
+
+    def __init__(self):
+
+        self.landed = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Flight:
+    """
+    Single flight, so identical concurrent reads share one computation
+    """
+
+    VARY = ["Authorization", "Cookie", "X-Api-Key"]
+
+    stale = None   # How many seconds a result can be served while it's being redone
+    vary = None    # Request headers that make results differ, so they aren't shared across them
+    flights = None # Computations in progress by key
+    landed = None  # Recent results and when by key
+
+    def __init__(self, stale=0, vary=None):
+
+        self.stale = stale
+        self.vary = self.VARY + [header for header in vary or [] if header not in self.VARY]
+        self.flights = {}
+        self.landed = {}
+        self.lock = threading.Lock()
+
+    def key(self, request, vary=None):
+        """
+        Normalizes a request so identical ones match, and only from the same client
+        """
+
+        return (
+            request.method,
+            request.path,
+            tuple(sorted(request.args.items(multi=True))),
+            request.get_data(),
+            request.headers.get("Accept", ""),
+            tuple(request.headers.get(header, "") for header in self.vary + [header for header in vary or [] if header not in self.vary])
+        )
+
+    @staticmethod
+    def shareable(result):
+        """
+        Whether a result can be handed to others, streams and errors can't
+        """
+
+        if isinstance(result, werkzeug.wrappers.Response):
+            return False
+
+        return flask_restx.utils.unpack(result)[1] < 400
+
+    def run(self, key, compute):
+        """
+        Computes a result, or waits on someone else already computing it
+        """
+
+        with self.lock:
+
+            landed = self.landed.get(key)
+
+            if landed is not None and time.time() - landed[1] > self.stale:
+                del self.landed[key]
+                landed = None
+
+            passenger = self.flights.get(key)
+
+            # If someone's already redoing this, hand out what they did last
+
+            if passenger is not None and landed is not None:
+                return landed[0]
+
+            pilot = passenger is None
+
+            if pilot:
+                passenger = self.flights[key] = Passenger()
+
+        if not pilot:
+
+            passenger.landed.wait()
+
+            if passenger.error is not None:
+                raise passenger.error
+
+            if isinstance(passenger.result, werkzeug.wrappers.Response):
+                return compute()
+
+            return passenger.result
+
+        try:
+            passenger.result = compute()
+        except Exception as exception:
+            passenger.error = exception
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+                if self.stale and passenger.error is None and self.shareable(passenger.result):
+                    self.landed[key] = (passenger.result, time.time())
+            passenger.landed.set()
+
+        return passenger.result
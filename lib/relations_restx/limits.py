@@ -0,0 +1,320 @@
+"""
+Limits module for keeping Relations Resources responsive under load
+"""
+
+import os
+import math
+import time
+import sqlite3
+import threading
+
+
+class AdmissionError(Exception):
+    """
+    Raised when a request can't get a slot
+    """
+
+    def __init__(self, admission, message):
+
+        self.admission = admission
+        self.message = message
+        super().__init__(self.message)
+
+    def __str__(self):
+        """
+        Mention which slots were full
+        """
+        return f"{self.admission.name}: {self.message}"
+
+
+class Admission:
+    """
+    Concurrency slots with a bounded wait queue
+    """
+
+    INSTANCES = {}
+    LOCK = threading.Lock()
+
+    name = None     # What these slots are for, resource and method
+    slots = None    # How many can run at once
+    queue = None    # How many can wait for a slot
+    wait = None     # How long to wait for a slot (None for forever)
+
+    active = None   # How many are running now
+    waiting = None  # How many are waiting now
+    peak = None     # Most that have ever waited
+    admitted = None # How many have run
+    shed = None     # How many were turned away
+
+    def __init__(self, name, slots, queue=0, wait=None):
+
+        self.name = name
+        self.slots = slots
+        self.queue = queue
+        self.wait = wait
+
+        self.active = 0
+        self.waiting = 0
+        self.peak = 0
+        self.admitted = 0
+        self.shed = 0
+
+        self.condition = threading.Condition()
+
+    @classmethod
+    def ensure(cls, name, slots, queue=0, wait=None):
+        """
+        Gets the shared slots by name, creating or resizing if need be
+        """
+
+        with cls.LOCK:
+
+            if name not in cls.INSTANCES:
+                cls.INSTANCES[name] = cls(name, slots, queue, wait)
+
+            admission = cls.INSTANCES[name]
+
+        with admission.condition:
+            if (admission.slots, admission.queue, admission.wait) != (slots, queue, wait):
+                admission.slots = slots
+                admission.queue = queue
+                admission.wait = wait
+                admission.condition.notify_all()
+
+        return admission
+
+    @classmethod
+    def report(cls):
+        """
+        Metrics for all slots by name
+        """
+
+        with cls.LOCK:
+            admissions = list(cls.INSTANCES.values())
+
+        return {admission.name: admission.metrics() for admission in admissions}
+
+    def acquire(self):
+        """
+        Takes a slot, waiting in the queue if there's room
+        """
+
+        with self.condition:
+
+            if self.active >= self.slots:
+
+                if self.waiting >= self.queue:
+                    self.shed += 1
+                    raise AdmissionError(self, "too busy, try again later")
+
+                self.waiting += 1
+                self.peak = max(self.peak, self.waiting)
+
+                try:
+                    available = self.condition.wait_for(lambda: self.active < self.slots, self.wait)
+                finally:
+                    self.waiting -= 1
+
+                if not available:
+                    self.shed += 1
+                    raise AdmissionError(self, "timed out waiting, try again later")
+
+            self.active += 1
+            self.admitted += 1
+
+    def release(self):
+        """
+        Gives back a slot, letting the next in line go
+        """
+
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+    def __enter__(self):
+
+        self.acquire()
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.release()
+
+    def metrics(self):
+        """
+        Current usage and queue depth
+        """
+
+        with self.condition:
+            return {
+                "slots": self.slots,
+                "queue": self.queue,
+                "active": self.active,
+                "waiting": self.waiting,
+                "peak": self.peak,
+                "admitted": self.admitted,
+                "shed": self.shed
+            }
+
+
+class RateStore:
+    """
+    Token buckets in memory, for a single worker
+    """
+
+    def __init__(self):
+
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def refill(tokens, stamp, rate, burst, now):
+        """
+        Tops up a bucket for the time that's passed
+        """
+
+        return min(burst, tokens + max(0, now - stamp) * rate)
+
+    def take(self, key, cost, rate, burst, now):
+        """
+        Takes tokens from a bucket if there's enough, returning whether there was and what's left
+        """
+
+        with self.lock:
+
+            tokens, stamp = self.buckets.get(key, (burst, now))
+            tokens = self.refill(tokens, stamp, rate, burst, now)
+
+            allowed = tokens >= cost
+
+            if allowed:
+                tokens -= cost
+
+            self.buckets[key] = (tokens, now)
+
+        return allowed, tokens
+
+
+class RateFileStore(RateStore):
+    """
+    Token buckets in a local SQLite file, shared by all workers on a host
+    """
+
+    def __init__(self, path):
+
+        super().__init__()
+
+        self.path = path
+        self.pid = None
+        self.connection = None
+
+    def connect(self):
+        """
+        Opens the file for this process, again after a fork, as workers can't share a connection
+        """
+
+        if self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL, stamp REAL)")
+            self.pid = os.getpid()
+
+        return self.connection
+
+    def take(self, key, cost, rate, burst, now):
+        """
+        Takes tokens from a bucket if there's enough, locking the file while doing so
+        """
+
+        with self.lock:
+
+            self.connect().execute("BEGIN IMMEDIATE")
+
+            try:
+
+                row = self.connection.execute("SELECT tokens, stamp FROM bucket WHERE key=?", (key,)).fetchone()
+
+                tokens, stamp = row if row is not None else (burst, now)
+                tokens = self.refill(tokens, stamp, rate, burst, now)
+
+                allowed = tokens >= cost
+
+                if allowed:
+                    tokens -= cost
+
+                self.connection.execute("REPLACE INTO bucket (key, tokens, stamp) VALUES (?, ?, ?)", (key, tokens, now))
+
+            finally:
+
+                self.connection.execute("COMMIT")
+
+        return allowed, tokens
+
+
+class RateLimit:
+    """
+    Token bucket rate limiting by client, weighted by operation
+    """
+
+    COSTS = {
+        "retrieve_all": 5,
+        "create_many": 5,
+        "update_many": 10,
+        "upsert_many": 10,
+        "delete_many": 10
+    }
+
+    rate = None    # Tokens added per second
+    burst = None   # Most tokens a bucket can hold
+    headers = None # Request headers to key clients on, first one found wins
+    address = None # Whether to fall back to keying on the remote address
+    costs = None   # Tokens each operation takes, 1 if not listed
+    store = None   # Where the buckets live
+
+    def __init__(self, rate, burst=None, headers=None, address=True, costs=None, store=None):
+
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.headers = headers or []
+        self.address = address
+        self.costs = {**self.COSTS, **(costs or {})}
+        self.store = store if store is not None else RateStore()
+
+    def key(self, request):
+        """
+        Determines which client a request is from
+        """
+
+        for header in self.headers:
+            if request.headers.get(header):
+                return f"{header}:{request.headers[header]}"
+
+        if self.address:
+            return f"address:{request.remote_addr}"
+
+        return "*"
+
+    def cost(self, operation):
+        """
+        How many tokens an operation takes, never more than a full bucket
+        """
+
+        return min(self.costs.get(operation, 1), self.burst)
+
+    def take(self, key, cost):
+        """
+        Takes tokens for a client, returning whether allowed and the rate limit headers
+        """
+
+        allowed, remaining = self.store.take(key, cost, self.rate, self.burst, time.time())
+
+        headers = {
+            "RateLimit-Limit": str(self.burst),
+            "RateLimit-Remaining": str(int(remaining)),
+            "RateLimit-Reset": str(math.ceil((self.burst - remaining) / self.rate))
+        }
+
+        if not allowed:
+            headers["Retry-After"] = str(math.ceil((cost - remaining) / self.rate))
+
+        return allowed, headers
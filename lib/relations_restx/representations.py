@@ -0,0 +1,330 @@
+"""
+Representations module for encoding Relations Resource responses
+"""
+
+import io
+import csv
+import json
+import datetime
+import ipaddress
+
+import flask
+
+try:
+    import orjson
+except ImportError: # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError: # pragma: no cover
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError: # pragma: no cover
+    cbor2 = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError: # pragma: no cover
+    pyarrow = None
+
+
+IPADDRESSES = (
+    ipaddress.IPv4Address,
+    ipaddress.IPv6Address,
+    ipaddress.IPv4Network,
+    ipaddress.IPv6Network,
+    ipaddress.IPv4Interface,
+    ipaddress.IPv6Interface
+)
+
+def default(value):
+    """
+    Converts what relations exports that JSON doesn't know
+    """
+
+    if isinstance(value, (set, frozenset)):
+        try:
+            return sorted(value)
+        except TypeError:
+            return list(value)
+
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+
+    if isinstance(value, IPADDRESSES):
+        return str(value)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps_json(data):
+    """
+    Encodes to JSON bytes with the standard library
+    """
+
+    return json.dumps(data, default=default).encode()
+
+def dumps_orjson(data):
+    """
+    Encodes to JSON bytes with orjson, falling back to the standard library for what it can't do
+    """
+
+    try:
+        return orjson.dumps(data, default=default, option=orjson.OPT_NON_STR_KEYS) # pylint: disable=no-member
+    except TypeError:
+        return dumps_json(data)
+
+dumps = dumps_orjson if orjson is not None else dumps_json
+
+def output_json(data, code, headers=None, dumps=dumps): # pylint: disable=redefined-outer-name
+    """
+    Makes a Flask response with a JSON encoded body
+    """
+
+    settings = flask.current_app.config.get("RESTX_JSON", {})
+
+    if flask.current_app.debug:
+        settings.setdefault("indent", 4)
+
+    # Formatting settings are only understood by the standard library
+
+    if settings:
+        dumped = json.dumps(data, default=default, **settings).encode()
+    else:
+        dumped = dumps(data)
+
+    response = flask.make_response(dumped + b"\n", code)
+    response.headers.extend(headers or {})
+
+    return response
+
+def dumps_msgpack(data):
+    """
+    Encodes to MessagePack bytes
+    """
+
+    return msgpack.packb(data, default=default)
+
+def loads_msgpack(data):
+    """
+    Decodes from MessagePack bytes
+    """
+
+    return msgpack.unpackb(data, strict_map_key=False)
+
+def dumps_cbor(data):
+    """
+    Encodes to CBOR bytes
+    """
+
+    return cbor2.dumps(data, timezone=datetime.timezone.utc, default=lambda encoder, value: encoder.encode(default(value)))
+
+def loads_cbor(data):
+    """
+    Decodes from CBOR bytes
+    """
+
+    return cbor2.loads(data)
+
+def event(data, name=None, id=None):
+    """
+    Encodes a Server-Sent Event
+    """
+
+    lines = []
+
+    if id is not None:
+        lines.append(f"id: {id}\n".encode())
+
+    if name is not None:
+        lines.append(f"event: {name}\n".encode())
+
+    lines.append(b"data: " + dumps(data) + b"\n\n")
+
+    return b"".join(lines)
+
+def output_binary(data, code, headers=None, dumps=None): # pylint: disable=redefined-outer-name
+    """
+    Makes a Flask response with a binary encoded body
+    """
+
+    response = flask.make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+
+    return response
+
+DUMPS = {}
+LOADS = {}
+
+if msgpack is not None:
+    for mediatype in ["application/msgpack", "application/x-msgpack", "application/vnd.msgpack"]:
+        DUMPS[mediatype] = dumps_msgpack
+        LOADS[mediatype] = loads_msgpack
+
+if cbor2 is not None:
+    DUMPS["application/cbor"] = dumps_cbor
+    LOADS["application/cbor"] = loads_cbor
+
+EXPORTS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "csv": "text/csv"
+}
+
+ARROW = {
+    "int": "int64",
+    "float": "float64",
+    "bool": "bool_",
+    "str": "string"
+}
+
+class Sink(io.RawIOBase):
+    """
+    Write only file that hands over what's been written so far, for streaming
+    """
+
+    def __init__(self):
+
+        super().__init__()
+
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        """
+        Can always be written to
+        """
+
+        return True
+
+    def write(self, data):
+        """
+        Holds onto data until drained
+        """
+
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+
+        return len(data)
+
+    def tell(self):
+        """
+        Where writers think they are, everything ever written
+        """
+
+        return self.position
+
+    def drain(self):
+        """
+        Takes everything written since the last drain
+        """
+
+        data = b"".join(self.chunks)
+        self.chunks = []
+
+        return data
+
+def stringify(value):
+    """
+    Converts what can't be typed from a field kind to a string, JSON for containers
+    """
+
+    if value is None or isinstance(value, str):
+        return value
+
+    if isinstance(value, (dict, list, tuple, set, frozenset)):
+        return dumps_json(value).decode()
+
+    try:
+        return str(default(value))
+    except TypeError:
+        return str(value)
+
+def arrow_schema(fields):
+    """
+    Types columns from (name, kind) field pairs, strings for anything complex
+    """
+
+    return pyarrow.schema([(name, getattr(pyarrow, ARROW.get(kind, "string"))()) for name, kind in fields])
+
+def arrow_batch(fields, schema, records):
+    """
+    Turns records into a column batch
+    """
+
+    columns = []
+
+    for (name, kind), field in zip(fields, schema):
+
+        values = [record.get(name) for record in records]
+
+        if kind not in ARROW:
+            values = [stringify(value) for value in values]
+
+        columns.append(pyarrow.array(values, type=field.type))
+
+    return pyarrow.RecordBatch.from_arrays(columns, schema=schema)
+
+def stream_arrow(fields, batches):
+    """
+    Streams batches of records as an Arrow IPC stream
+    """
+
+    schema = arrow_schema(fields)
+    sink = Sink()
+
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for records in batches:
+            writer.write_batch(arrow_batch(fields, schema, records))
+            yield sink.drain()
+
+    yield sink.drain()
+
+def stream_parquet(fields, batches):
+    """
+    Streams batches of records as a Parquet file, a row group per batch
+    """
+
+    schema = arrow_schema(fields)
+    sink = Sink()
+
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for records in batches:
+            writer.write_batch(arrow_batch(fields, schema, records))
+            yield sink.drain()
+
+    yield sink.drain()
+
+def stream_csv(fields, batches):
+    """
+    Streams batches of records as CSV rows, after a header
+    """
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def drain():
+        data = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return data.encode()
+
+    writer.writerow([name for name, _ in fields])
+
+    yield drain()
+
+    for records in batches:
+        writer.writerows([[stringify(record.get(name)) for name, _ in fields] for record in records])
+        yield drain()
+
+STREAMS = {
+    "csv": stream_csv
+}
+
+if pyarrow is not None:
+    STREAMS["arrow"] = stream_arrow
+    STREAMS["parquet"] = stream_parquet
@@ -8,13 +8,23 @@ Resource module for Relations and Flask RestX
 import flask
 import flask_restx
 
+import json
+import math
+import time
 import functools
 import traceback
+import contextlib
 import werkzeug.exceptions
+import werkzeug.wrappers
 
 import opengui
 import relations
 
+from relations_restx import representations
+from relations_restx.limits import Admission, AdmissionError
+from relations_restx.changes import ChangeLog
+from relations_restx.criteria import Criteria
+
 def exceptions(endpoint):
     """
     Decorator that adds and handles a database session
@@ -27,11 +37,11 @@ def exceptions(endpoint):
 
             response = endpoint(*args, **kwargs)
 
-        except werkzeug.exceptions.BadRequest as exception:
+        except werkzeug.exceptions.HTTPException as exception:
 
             response = {
                 "message": exception.description
-            }, 400
+            }, exception.code
 
         except relations.ModelError as exception:
 
@@ -54,6 +64,26 @@ def exceptions(endpoint):
 
     return wrap
 
+def transactional(model):
+    """
+    Whether the model's source has transactions, and so can roll back
+    """
+
+    return callable(getattr(relations.source(model.SOURCE), "transaction", None))
+
+@contextlib.contextmanager
+def transaction(model):
+    """
+    Runs in a transaction if the model's source has them, else just runs
+    """
+
+    if not transactional(model):
+        yield
+        return
+
+    with relations.source(model.SOURCE).transaction():
+        yield
+
 class ResourceError(Exception):
     """
     Generic resource Error for easier tracing
@@ -81,6 +111,34 @@ class ResourceIdentity:
     PLURAL = None
     FIELDS = None
     LIST = None
+    CONCURRENCY = None
+    QUEUE = 0
+    WAIT = None
+    RATE = None
+    FLIGHT = None
+    CHANGES = None
+    BUFFER = 100
+    HEARTBEAT = 15
+    STORE = None
+    EXPAND_DEPTH = 2
+    EXPAND_LIMIT = 100
+    DISTINCT_LIMIT = 100
+    AGGREGATE_LIMIT = 10000
+    DISTINCT_AGE = 60
+    UPSERT = None
+    SAMPLE = 10
+    BATCH = None
+    PAUSE = 0
+    MAX_ROWS = None
+
+    GROUPS = ["bool", "int", "float", "str"]
+    AGGREGATES = {
+        "count": [],
+        "sum": ["int", "float"],
+        "avg": ["int", "float"],
+        "min": ["int", "float", "str"],
+        "max": ["int", "float", "str"]
+    }
 
     _model = None
     _fields = None
@@ -152,6 +210,19 @@ class ResourceIdentity:
             if field.split("__")[0] not in self._model._fields:
                 raise ResourceError(self, f"cannot find field {field} from list")
 
+        if isinstance(self.CHANGES, str) and self.CHANGES not in self._model._fields:
+            raise ResourceError(self, f"cannot find field {self.CHANGES} from changes")
+
+        if isinstance(self.CHANGES, ChangeLog) and self._model._id is None:
+            raise ResourceError(self, "cannot log changes without an id")
+
+        for field in self.UPSERT or []:
+            if field not in self._model._fields:
+                raise ResourceError(self, f"cannot find field {field} from upsert")
+
+        if self.BATCH is not None and self._model._id is None:
+            raise ResourceError(self, "cannot batch without an id")
+
         return self
 
     def endpoints(self):
@@ -166,48 +237,212 @@ class ResourceIdentity:
 
         return endpoints
 
-class Resource(flask_restx.Resource, ResourceIdentity):
+    def listing(self):
+        """
+        What the list of models says about this resource
+        """
+
+        return {
+            "id": self._model._id,
+            "titles": self._model._titles,
+            "title": self._model.TITLE,
+            "singular": self.SINGULAR,
+            "plural": self.PLURAL,
+            "list": self.LIST
+        }
+
+class Resource(flask_restx.Resource, ResourceIdentity): # pylint: disable=too-many-public-methods
     """
     Base Model class for Relations Restful classes
     """
 
-    def __init__(self, *args, **kwargs): # pylint: disable=super-init-not-called
+    def __init__(self, *args, **kwargs):
+
+        super().__init__(*args, **kwargs)
 
         # Know thyself
 
         self.thy(self)
 
+    @classmethod
+    def admission(cls, method):
+        """
+        Gets the concurrency slots for a method, if limited
+        """
+
+        slots = cls.CONCURRENCY
+
+        if isinstance(slots, dict):
+            slots = slots.get(method)
+
+        if slots is None:
+            return None
+
+        return Admission.ensure(f"{cls.__name__}.{method}", slots, cls.QUEUE, cls.WAIT)
+
+    def limiter(self):
+        """
+        Gets the rate limit for this resource, else the API's
+        """
+
+        if self.RATE is not None:
+            return self.RATE
+
+        return getattr(self.api, "rate", None)
+
+    def operation(self, method, id=None): # pylint: disable=too-many-return-statements
+        """
+        Names what a request is doing, for weighing its cost
+        """
+
+        if method == "options":
+            return "create_options" if id is None else "update_options"
+
+        if method == "post":
+            if "filter" in self.json():
+                return "retrieve_many" if self.criteria() else "retrieve_all"
+            return "create_many" if self.PLURAL in self.json() else "create_one"
+
+        if method == "get":
+            if id is not None:
+                return "retrieve_one"
+            return "retrieve_many" if self.criteria() else "retrieve_all"
+
+        if method == "put":
+            return "upsert_many"
+
+        action = "update" if method == "patch" else method
+
+        if id is not None or self.SINGULAR in self.json():
+            return f"{action}_one"
+
+        return f"{action}_many"
+
+    @staticmethod
+    def headers(response, headers):
+        """
+        Adds headers to whatever a method returned
+        """
+
+        if not headers:
+            return response
+
+        if isinstance(response, werkzeug.wrappers.Response):
+            response.headers.extend(headers)
+            return response
+
+        data, code, extra = flask_restx.utils.unpack(response)
+
+        return data, code, {**headers, **extra}
+
+    def admit(self, method, *args, **kwargs):
+        """
+        Runs the method once there's a slot for it
+        """
+
+        admission = self.admission(method)
+
+        if admission is None:
+            return super().dispatch_request(*args, **kwargs)
+
+        try:
+            admission.acquire()
+        except AdmissionError as exception:
+            return {"message": str(exception)}, 503, {"Retry-After": str(math.ceil(self.WAIT or 1))}
+
+        streaming = False
+
+        try:
+
+            response = super().dispatch_request(*args, **kwargs)
+
+            # Streams, exports and subscriptions, hold the slot till they're done being sent
+
+            if isinstance(response, werkzeug.wrappers.Response) and response.is_streamed:
+                response.call_on_close(admission.release)
+                streaming = True
+
+            return response
+
+        finally:
+
+            if not streaming:
+                admission.release()
+
+    def dispatch_request(self, *args, **kwargs):
+        """
+        Only lets clients call so often, shares identical reads, and runs each method so many at once
+        """
+
+        method = flask.request.method.lower()
+        method = "get" if method == "head" else method
+
+        headers = {}
+
+        rate = self.limiter()
+
+        if rate is not None:
+
+            allowed, headers = rate.take(rate.key(flask.request), rate.cost(self.operation(method, kwargs.get("id"))))
+
+            if not allowed:
+                return {"message": "too many requests, try again later"}, 429, headers
+
+        if method != "get" or self.FLIGHT is None:
+            return self.headers(self.admit(method, *args, **kwargs), headers)
+
+        # Clients the rate limit tells apart are kept apart here too
+
+        key = self.FLIGHT.key(flask.request, rate.headers if rate is not None else None)
+
+        return self.headers(self.FLIGHT.run(key, lambda: self.admit(method, *args, **kwargs)), headers)
+
     @staticmethod
     def json():
         """
-        Gets the current request JSON
+        Gets the current request JSON, or MessagePack / CBOR decoded likewise
         """
 
         try:
-            return flask.request.json
+
+            loads = representations.LOADS.get(flask.request.mimetype)
+
+            if loads is None:
+                return flask.request.json
+
+            if "relations_body" not in flask.g:
+                flask.g.relations_body = loads(flask.request.get_data()) # pylint: disable=assigning-non-slot
+
+            return flask.g.relations_body
+
         except: # pylint: disable=bare-except
             return {}
 
     @classmethod
     def criteria(cls, verify=False):
         """
-        Gets criteria from the flask request
+        Gets criteria from the flask request, checked against the model if there is one
         """
 
-        if verify and not flask.request.args and "filter" not in cls.json():
-            raise werkzeug.exceptions.BadRequest("to confirm all, send a blank filter {}")
-
         criteria = {}
 
         if flask.request.args:
             criteria.update({
                 name: value
                 for name, value in flask.request.args.to_dict().items()
-                if not name.startswith("limit") and name not in ["sort", "count"]
+                if not name.startswith("limit") and name not in [
+                    "sort", "count", "compact", "export", "fields", "since", "expand", "group", "agg", "distinct", "dry_run", "explain"
+                ]
             })
 
+        if verify and not criteria and "filter" not in cls.json():
+            raise werkzeug.exceptions.BadRequest("to confirm all, send a blank filter {}")
+
         if "filter" in cls.json():
-            criteria.update(flask.request.json["filter"])
+            criteria.update(cls.json()["filter"])
+
+        if cls.MODEL is not None:
+            criteria = Criteria.ensure(cls.MODEL).validate(criteria)
 
         return criteria
 
@@ -223,7 +458,7 @@ class Resource(flask_restx.Resource, ResourceIdentity):
             sort.extend(flask.request.args['sort'].split(','))
 
         if "sort" in cls.json():
-            sort.extend(flask.request.json['sort'])
+            sort.extend(cls.json()['sort'])
 
         return sort
 
@@ -243,7 +478,7 @@ class Resource(flask_restx.Resource, ResourceIdentity):
             })
 
         if "limit" in cls.json():
-            limit.update({name: int(value) for name, value in flask.request.json["limit"].items()})
+            limit.update({name: int(value) for name, value in cls.json()["limit"].items()})
 
         return limit
 
@@ -259,158 +494,1229 @@ class Resource(flask_restx.Resource, ResourceIdentity):
             count = flask.request.args['count']
 
         if "count" in cls.json():
-            count = flask.request.json['count']
+            count = cls.json()['count']
 
         if isinstance(count, (bool, int)):
             return count
 
         return count.lower() not in ["0", "no", "false"]
 
-    def fields(self, likes, values, originals=None):
+    @classmethod
+    def compact(cls):
         """
-        Apply options and titles to fields
+        Gets compact from the flask request, rows or columns
         """
 
-        fields = opengui.Fields(values=values, originals=originals, fields=self._fields)
+        compact = None
 
-        for field in fields:
-            relation = self._model._ancestor(field.name)
-            if relation is not None:
-                like = {"like": likes[name] for name in likes if name == field.name}
-                parent = relation.Parent.many(**like).limit()
-                titles = parent.titles()
+        if flask.request.args and 'compact' in flask.request.args:
+            compact = flask.request.args['compact']
 
-                field.content["format"] = titles.format
-                field.content["overflow"] = parent.overflow
+        if "compact" in cls.json():
+            compact = cls.json()['compact']
 
-                value = field.value if field.value is not None else field.original
+        if isinstance(compact, str) and compact.lower() in ["0", "no", "false", ""]:
+            compact = None
 
-                if (not like and value is not None and value not in titles):
-                    titles = relation.Parent.one(**{relation.parent_id: value}).titles()
-                    field.content["overflow"] = True
+        if compact in [True, 1, "1", "yes", "true", "rows"]:
+            return "rows"
 
-                field.options = titles.ids
-                field.content["titles"] = titles.titles
+        if compact == "columns":
+            return "columns"
 
-                field.content.update(like)
+        if compact:
+            raise werkzeug.exceptions.BadRequest(f"compact must be rows or columns, not {compact}")
 
-        return fields
+        return None
 
-    def formats(self, model):
+    @classmethod
+    def since(cls):
         """
-        Generate all the formats including parent lookups
+        Gets since from the flask request, the watermark to get changes after
         """
 
-        formats = {}
+        since = None
 
-        fields = opengui.Fields(fields=self._fields)
+        if flask.request.args and 'since' in flask.request.args:
+            since = flask.request.args['since']
 
-        for field in model._fields._order:
-            relation = model._ancestor(field.name)
-            if relation is not None:
-                titles = relation.Parent.many(**{f"{relation.parent_id}__in": model[field.name]}).titles()
-                formats[field.name] = {
-                    "titles": titles.titles,
-                    "format": titles.format
-                }
-            elif field.format is not None or "titles" in fields[field.name].content:
-                formats[field.name] = {}
-                if field.format is not None:
-                    formats[field.name]["format"] = field.format
-                if  "titles" in fields[field.name].content:
-                    formats[field.name]["titles"] = fields[field.name].content["titles"]
+        if "since" in cls.json():
+            since = cls.json()['since']
 
-        return formats
+        return since
 
-    @exceptions
-    def options(self, id=None):
+    def synced(self, since):
         """
-        Generates form for inserts or updates of a single record
+        Ids created, updated, or deleted since a watermark, a page at a time
         """
 
-        values = self.json().get(self.SINGULAR)
-        likes = self.json().get("likes", {})
+        limit = self.limit()
+        limit = limit.get("per_page", limit.get("limit", self._model.CHUNK))
 
-        if id is None:
+        if isinstance(self.CHANGES, ChangeLog):
 
-            return self.fields(likes, values).to_dict(), 200
+            try:
+                since = int(since)
+            except (TypeError, ValueError):
+                raise werkzeug.exceptions.BadRequest(f"since must be an int, not {since}")
 
-        originals = self.MODEL.one(**{self._model._id: id}).export()
+            if self.CHANGES.expired(since):
+                raise werkzeug.exceptions.Gone(f"changes since {since} are gone, retrieve all again")
 
-        return self.fields(likes, values, originals).to_dict(), 200
+            actions, watermark, overflow = self.CHANGES.since(since, limit)
 
-    @exceptions
-    def post(self):
+            return {**actions, "watermark": watermark, "overflow": overflow}
+
+        if self.CHANGES is None:
+            raise werkzeug.exceptions.BadRequest(f"{self.SINGULAR} changes aren't tracked")
+
+        # A column can only say what's new or changed, not what's gone or which is which
+
+        column = self.CHANGES
+        criteria = self.criteria()
+        since = Criteria.ensure(self.MODEL).validate({f"{column}__gt": since})[f"{column}__gt"]
+        records = self.MODEL.many(**{**criteria, f"{column}__gt": since}).sort(column, self._model._id).limit(limit + 1).export()
+
+        overflow = len(records) > limit
+        records = records[:limit]
+
+        # Don't split a watermark between pages, else what's left would be skipped
+
+        if overflow:
+            last = records[-1][column]
+            records = [record for record in records if record[column] != last]
+            records.extend(self.MODEL.many(**{**criteria, column: last}).sort(self._model._id).export())
+
+        return {
+            "created": [],
+            "updated": [record[self._model._id] for record in records],
+            "deleted": [],
+            "watermark": records[-1][column] if records else since,
+            "overflow": overflow
+        }
+
+    @staticmethod
+    def subscribe():
         """
-        Creates one or more models or complex
+        Whether the flask request asks for changes as Server-Sent Events
         """
 
-        if "filter" in self.json():
+        return "text/event-stream" in [value for value, quality in flask.request.accept_mimetypes if quality]
 
-            return self.get()
+    def subscribed(self):
+        """
+        Streams changes matching criteria as they happen, picking up after Last-Event-ID if sent
+        """
 
-        if self.SINGULAR in self.json():
+        if not isinstance(self.CHANGES, ChangeLog):
+            raise werkzeug.exceptions.BadRequest(f"{self.SINGULAR} changes aren't logged")
 
-            return {self.SINGULAR: self.MODEL(**flask.request.json[self.SINGULAR]).create().export()}, 201
+        watermark = flask.request.headers.get("Last-Event-ID")
 
-        if self.PLURAL in self.json():
+        if watermark is not None:
+            try:
+                watermark = int(watermark)
+            except ValueError:
+                raise werkzeug.exceptions.BadRequest(f"Last-Event-ID must be an int, not {watermark}")
 
-            return {self.PLURAL: self.MODEL(flask.request.json[self.PLURAL]).create().export()}, 201
+        criteria = self.criteria()
+        subscription = self.CHANGES.subscribe(self.BUFFER, watermark)
 
-        raise werkzeug.exceptions.BadRequest(f"either {self.SINGULAR} or {self.PLURAL} required")
+        return flask.Response(self.events(subscription, criteria), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        })
 
-    @exceptions
-    def get(self, id=None):
+    def events(self, subscription, criteria):
         """
-        Retrieves one or more models
+        Sends changes as events until the listener leaves or falls too far behind
         """
 
-        if id is not None:
-            model = self.MODEL.one(**{self._model._id: id})
-            return {self.SINGULAR: model.export(), "formats": self.formats(model)}
+        try:
 
-        models = self.MODEL.many(**self.criteria()).sort(*self.sort()).limit(**self.limit())
+            yield b": subscribed\n\n"
 
-        if self.count():
-            return {self.PLURAL: models.count(), "overflow": models.overflow}, 200
+            while True:
 
-        return {self.PLURAL: models.export(), "overflow": models.overflow, "formats": self.formats(models)}, 200
+                # Fallen behind, even before subscribing, so say so now rather than after waiting on nothing
 
-    @exceptions
-    def patch(self, id=None):
+                if subscription.overflowed and subscription.drained():
+                    yield representations.event({"watermark": subscription.watermark}, "overflow")
+                    return
+
+                changes = subscription.get(self._model.CHUNK, self.HEARTBEAT)
+
+                # Deleted can't be checked against criteria, so they always go
+
+                if criteria and changes:
+                    ids = [id for _, action, id in changes if action != "deleted"]
+                    key = f"{self._model._id}__in"
+
+                    # Only those asked for if the listener filtered on ids too
+
+                    if key in criteria:
+                        ids = [id for id in ids if id in criteria[key]]
+
+                    matched = set(self.MODEL.many(**{**criteria, key: ids})[self._model._id]) if ids else set()
+                    changes = [change for change in changes if change[1] == "deleted" or change[2] in matched]
+
+                for number, action, id in changes:
+                    yield representations.event({self._model._id: id}, action, number)
+
+                if not changes:
+                    yield b": heartbeat\n\n"
+
+        finally:
+
+            self.CHANGES.unsubscribe(subscription)
+
+    def changed(self, action, ids):
         """
-        Updates one or more models models
+        Notes changes in the log, if there is one, and drops stored titles that might be stale
         """
 
-        if self.SINGULAR not in self.json() and self.PLURAL not in self.json():
-            raise werkzeug.exceptions.BadRequest(f"either {self.SINGULAR} or {self.PLURAL} required")
+        if self.STORE is not None and action != "created":
+            self.STORE.invalidate(self._model.NAME)
 
-        if id is not None:
+        if not isinstance(self.CHANGES, ChangeLog) or not ids:
+            return
 
-            model = self.MODEL.one(**{self._model._id: id}).set(**flask.request.json[self.SINGULAR])
+        # Ids from the URL are strings
 
-        elif self.SINGULAR in flask.request.json:
+        kind = self._model._fields._names[self._model._id].kind
 
-            model = self.MODEL.one(**self.criteria(True)).set(**flask.request.json[self.SINGULAR])
+        if kind in (int, float):
+            ids = [kind(id) if isinstance(id, str) else id for id in ids]
 
-        elif self.PLURAL in flask.request.json:
+        self.CHANGES.record(action, ids)
 
-            model = self.MODEL.many(**self.criteria(True)).set(**flask.request.json[self.PLURAL])
+    def matched(self, criteria):
+        """
+        Ids that match criteria, only if changes are being logged
+        """
 
-        return {"updated": model.update()}, 202
+        if not isinstance(self.CHANGES, ChangeLog):
+            return []
 
-    @exceptions
-    def delete(self, id=None):
+        return self.MODEL.many(**criteria)[self._model._id]
+
+    @classmethod
+    def export(cls):
         """
-        Deletes one or more models models
+        Gets export from the flask request, else from asking for its media type
         """
 
-        if id is not None:
+        export = None
 
-            model = self.MODEL.one(**{self._model._id: id})
+        if flask.request.args and 'export' in flask.request.args:
+            export = flask.request.args['export']
+
+        if "export" in cls.json():
+            export = cls.json()['export']
+
+        if not export:
+            accepts = [value for value, quality in flask.request.accept_mimetypes if quality]
+            for name, mediatype in representations.EXPORTS.items():
+                if mediatype in accepts:
+                    return name
+            return None
+
+        if export not in representations.EXPORTS:
+            raise werkzeug.exceptions.BadRequest(f"export must be one of {', '.join(representations.EXPORTS)}, not {export}")
+
+        return export
+
+    @classmethod
+    def projection(cls):
+        """
+        Gets fields from the flask request, to export only those
+        """
+
+        projection = []
+
+        if flask.request.args and 'fields' in flask.request.args:
+            projection.extend(flask.request.args['fields'].split(','))
+
+        if "fields" in cls.json():
+            projection.extend(cls.json()['fields'])
+
+        return projection
+
+    @staticmethod
+    def extract(record, name):
+        """
+        Gets a field's value from a record, following any path into it
+        """
+
+        path = name.split("__")
+        value = record.get(path.pop(0))
+
+        for step in path:
+            if isinstance(value, dict):
+                value = value.get(step)
+            elif isinstance(value, list) and step.lstrip("-").isdigit() and -len(value) <= int(step) < len(value):
+                value = value[int(step)]
+            else:
+                return None
+
+        return value
+
+    def titled(self, models, columns):
+        """
+        Exports records with just the columns asked for, titles in place of values that have them
+        """
+
+        formats = self.formats(models)
+        records = []
+
+        for record in models.export():
+
+            titled = {}
+
+            for column in columns:
+
+                value = self.extract(record, column)
+                titles = formats.get(column, {}).get("titles") or {}
+
+                if isinstance(value, (str, int, float)) and value in titles:
+                    value = titles[value]
+                    if isinstance(value, list):
+                        value = " - ".join(str(part) for part in value)
+
+                titled[column] = value
+
+            records.append(titled)
+
+        return records
+
+    def batches(self, criteria, sort, limit):
+        """
+        Retrieves a list a chunk at a time, so it's never all in memory
+        """
+
+        id = self._model._id
+
+        if not sort and id is not None:
+            sort = [id]
+
+        # Sorted by id, each chunk picks up past the last id, else it's OFFSET, which gets slower the further in
 
+        keyset = id is not None and list(sort) == [id] and f"{id}__gt" not in criteria
+
+        size = limit.get("per_page", limit.get("limit"))
+        start = (limit["page"] - 1) * size if "page" in limit and size is not None else limit.get("start", 0)
+
+        while size is None or size > 0:
+
+            chunk = self._model.CHUNK if size is None else min(self._model.CHUNK, size)
+            models = self.MODEL.many(**criteria).sort(*sort).limit(chunk, start)
+
+            if len(models) > 0:
+                yield models
+
+            if len(models) < chunk:
+                break
+
+            if keyset:
+                criteria = {**criteria, f"{id}__gt": models[-1][id]}
+                start = 0
+            else:
+                start += chunk
+
+            if size is not None:
+                size -= chunk
+
+    def exported(self, export):
+        """
+        Streams a list in the format asked for, batch by batch, just the fields asked for
+        """
+
+        stream = representations.STREAMS.get(export)
+
+        if stream is None:
+            raise werkzeug.exceptions.NotAcceptable(f"cannot export {export}, missing its library")
+
+        kinds = {field["name"]: field["kind"] for field in self._fields}
+        columns = self.projection()
+
+        for column in columns:
+            if column.split("__")[0] not in kinds:
+                raise werkzeug.exceptions.BadRequest(f"cannot find field {column} from fields")
+
+        batches = self.batches(self.criteria(), self.sort(), self.limit())
+
+        if export == "csv":
+            columns = columns or self.LIST or list(kinds)
+            batches = (self.titled(models, columns) for models in batches)
+        elif columns:
+            batches = ([{column: self.extract(record, column) for column in columns} for record in models.export()] for models in batches)
         else:
+            columns = list(kinds)
+            batches = (models.export() for models in batches)
 
-            model = self.MODEL.many(**self.criteria(True))
+        fields = [(column, kinds.get(column, "path")) for column in columns]
+
+        return flask.Response(flask.stream_with_context(stream(fields, batches)), mimetype=representations.EXPORTS[export])
+
+    @classmethod
+    def expand(cls):
+        """
+        Gets expand from the flask request, relations to include, dotted to go deeper
+        """
+
+        expand = []
+
+        if flask.request.args and 'expand' in flask.request.args:
+            expand.extend(flask.request.args['expand'].split(','))
+
+        if "expand" in cls.json():
+            expand.extend(cls.json()['expand'])
+
+        return expand
+
+    @staticmethod
+    def link(model, name):
+        """
+        How a model's records lead to others by relation name, the model, the keys, and whether one, many, or tied
+        """
+
+        if name in model.PARENTS:
+            relation = model.PARENTS[name]
+            return relation.Parent, relation.child_parent_ref, relation.parent_id, "one"
+
+        if name in model.CHILDREN:
+            relation = model.CHILDREN[name]
+            return relation.Child, relation.parent_id, relation.child_parent_ref, "many"
+
+        if name in model.BROTHERS:
+            relation = model.BROTHERS[name]
+            return relation.Brother, relation.sister_brother_ref, relation.brother_id, "tied"
+
+        if name in model.SISTERS:
+            relation = model.SISTERS[name]
+            return relation.Sister, relation.brother_sister_ref, relation.sister_id, "tied"
+
+        return None
+
+    def expanded(self, records, expand):
+        """
+        Adds related records to records, returning whether each relation overflowed
+        """
+
+        tree = {}
+
+        for path in expand:
+
+            names = path.split(".")
+
+            if len(names) > self.EXPAND_DEPTH:
+                raise werkzeug.exceptions.BadRequest(f"cannot expand {path}, deeper than {self.EXPAND_DEPTH}")
+
+            node = tree
+            for name in names:
+                node = node.setdefault(name, {})
+
+        expanded = {}
+
+        self.expanding(self._model, records, tree, "", expanded)
+
+        return expanded
+
+    def expanding(self, model, records, tree, prefix, expanded): # pylint: disable=too-many-locals,too-many-arguments,too-many-branches
+        """
+        Loads each relation for all records at once, one query per relation, then goes deeper
+        """
+
+        for name, subtree in tree.items():
+
+            link = self.link(model, name)
+
+            if link is None:
+                raise werkzeug.exceptions.BadRequest(f"cannot expand {prefix}{name}")
+
+            Related, key, related_key, mode = link # pylint: disable=invalid-name
+
+            values = []
+
+            for record in records:
+                value = record.get(key)
+                for item in value if mode == "tied" else [value]:
+                    if item is not None and item not in values:
+                        values.append(item)
+
+            related = []
+            overflow = False
+
+            if values:
+                models = Related.many(**{f"{related_key}__in": values}).limit(self.EXPAND_LIMIT)
+                related = models.export()
+                overflow = models.overflow
+
+            expanded[f"{prefix}{name}"] = {"overflow": overflow}
+
+            if subtree:
+                self.expanding(Related.thy(), related, subtree, f"{prefix}{name}.", expanded)
+
+            if mode == "many":
+                grouped = {}
+                for item in related:
+                    grouped.setdefault(item[related_key], []).append(item)
+                for record in records:
+                    record[name] = grouped.get(record.get(key), [])
+            else:
+                keyed = {item[related_key]: item for item in related}
+                for record in records:
+                    if mode == "tied":
+                        record[name] = [keyed[item] for item in record.get(key) or [] if item in keyed]
+                    else:
+                        record[name] = keyed.get(record.get(key))
+
+    def aggregate(self):
+        """
+        Gets group and agg from the flask request, checked against the field kinds
+        """
+
+        group = []
+        agg = []
+
+        if flask.request.args and 'group' in flask.request.args:
+            group.extend(flask.request.args['group'].split(','))
+
+        if flask.request.args and 'agg' in flask.request.args:
+            agg.extend(flask.request.args['agg'].split(','))
+
+        if "group" in self.json():
+            group.extend(self.json()['group'])
+
+        if "agg" in self.json():
+            agg.extend(self.json()['agg'])
+
+        if not group and not agg:
+            return None
+
+        kinds = {field["name"]: field["kind"] for field in self._fields}
+
+        for name in group:
+            if kinds.get(name) not in self.GROUPS:
+                raise werkzeug.exceptions.BadRequest(f"cannot group by {name}")
+
+        aggs = []
+
+        for spec in agg or ["count"]:
+
+            function, _, name = spec.partition(":")
+
+            if function not in self.AGGREGATES:
+                raise werkzeug.exceptions.BadRequest(f"unknown aggregate {function}")
+
+            if (function == "count" and name) or (function != "count" and kinds.get(name) not in self.AGGREGATES[function]):
+                raise werkzeug.exceptions.BadRequest(f"cannot {function} {name}" if name else f"{function} needs a field")
+
+            aggs.append((function, name or None))
+
+        return group, aggs
+
+    def aggregated(self, group, aggs): # pylint: disable=too-many-branches,too-many-locals
+        """
+        Groups and aggregates, by the source if it knows how, else here a batch at a time
+        """
+
+        criteria = self.criteria()
+        source = relations.source(self._model.SOURCE)
+
+        if hasattr(source, "aggregate"):
+            return source.aggregate(self.MODEL.many(**criteria), group, aggs)
+
+        # Adding up here means going through every record, so only so many
+
+        matched = self.MODEL.many(**criteria).count()
+
+        if matched > self.AGGREGATE_LIMIT:
+            raise werkzeug.exceptions.BadRequest(
+                f"cannot aggregate {matched} {self.PLURAL}, more than {self.AGGREGATE_LIMIT}, narrow the filter"
+            )
+
+        groups = {} if group else {(): {}}
+
+        for models in self.batches(criteria, [], {}):
+            for record in models.export():
+
+                totals = groups.setdefault(tuple(record.get(name) for name in group), {})
+
+                for function, name in aggs:
+
+                    key = f"{function}:{name}" if name else function
+                    value = record.get(name) if name else None
+
+                    if function == "count":
+                        totals[key] = totals.get(key, 0) + 1
+                    elif value is None:
+                        continue
+                    elif function == "sum":
+                        totals[key] = totals.get(key, 0) + value
+                    elif function == "avg":
+                        total, count = totals.get(key, (0, 0))
+                        totals[key] = (total + value, count + 1)
+                    elif key not in totals:
+                        totals[key] = value
+                    elif function == "min":
+                        totals[key] = min(totals[key], value)
+                    else:
+                        totals[key] = max(totals[key], value)
+
+        rows = []
+
+        for values in sorted(groups, key=lambda values: [(value is not None, value) for value in values]):
+
+            row = dict(zip(group, values))
+
+            for function, name in aggs:
+
+                key = f"{function}:{name}" if name else function
+                total = groups[values].get(key, 0 if function == "count" else None)
+
+                if function == "avg" and total is not None:
+                    total = total[0] / total[1]
+
+                row[key] = total
+
+            rows.append(row)
+
+        return rows
+
+    @classmethod
+    def distinct(cls):
+        """
+        Gets distinct from the flask request
+        """
+
+        distinct = None
+
+        if flask.request.args and 'distinct' in flask.request.args:
+            distinct = flask.request.args['distinct']
+
+        if "distinct" in cls.json():
+            distinct = cls.json()['distinct']
+
+        return distinct
+
+    def distinguished(self, name):
+        """
+        Distinct values of a field, the declared options if there's nothing to filter on, else by the source if
+        it knows how, else here skipping from one value to the next in order
+        """
+
+        field = {field["name"]: field for field in self._fields}.get(name)
+
+        if field is None:
+            raise werkzeug.exceptions.BadRequest(f"cannot find field {name} from distinct")
+
+        if field["kind"] not in self.GROUPS:
+            raise werkzeug.exceptions.BadRequest(f"cannot distinct {name}")
+
+        criteria = self.criteria()
+        limit = min(self.limit().get("limit", self.DISTINCT_LIMIT), self.DISTINCT_LIMIT)
+        source = relations.source(self._model.SOURCE)
+
+        if field.get("options") and not criteria:
+            values = list(field["options"][:limit + 1])
+        elif hasattr(source, "distinct"):
+            values = list(source.distinct(self.MODEL.many(**criteria), name, limit + 1))
+        else:
+
+            # Skips from one value to the next, a query per value rather than going through every record
+
+            values = [None] if self.MODEL.many(**{**criteria, f"{name}__null": True}).limit(1)[name] else []
+            after = {f"{name}__null": False}
+
+            while len(values) <= limit:
+
+                found = self.MODEL.many(**{**criteria, **after}).sort(name).limit(1)[name]
+
+                if not found:
+                    break
+
+                values.append(found[0])
+                after = {f"{name}__gt": found[0]}
+
+        return {"distinct": values[:limit], "overflow": len(values) > limit}, 200, {
+            "Cache-Control": f"private, max-age={self.DISTINCT_AGE}"
+        }
+
+    @classmethod
+    def dry_run(cls):
+        """
+        Gets dry_run from the flask request, or explain, as that's a dry run too
+        """
+
+        dry_run = False
+
+        if flask.request.args and 'dry_run' in flask.request.args:
+            dry_run = flask.request.args['dry_run']
+
+        if "dry_run" in cls.json():
+            dry_run = cls.json()['dry_run']
+
+        if isinstance(dry_run, str):
+            dry_run = dry_run.lower() not in ["0", "no", "false"]
+
+        return bool(dry_run) or cls.explain()
+
+    @classmethod
+    def explain(cls):
+        """
+        Gets explain from the flask request
+        """
+
+        explain = False
+
+        if flask.request.args and 'explain' in flask.request.args:
+            explain = flask.request.args['explain']
+
+        if "explain" in cls.json():
+            explain = cls.json()['explain']
+
+        if isinstance(explain, str):
+            return explain.lower() not in ["0", "no", "false"]
+
+        return bool(explain)
+
+    def explained(self, criteria, action, values=None):
+        """
+        What an action would match, how many and a sample of ids, without doing it, and if explaining, the
+        query it'd run
+        """
+
+        response = {"matched": self.MODEL.many(**criteria).count()}
+
+        if self._model._id is not None:
+            response["ids"] = self.MODEL.many(**criteria).sort(self._model._id).limit(self.SAMPLE)[self._model._id]
+
+        if self.explain():
+            response["plan"] = self.plan(criteria, action, values)
+
+        return response
+
+    def plan(self, criteria, action, values=None):
+        """
+        The query the source would run for an action, as SQL and args if it generates them, else as a string if it
+        has one, else None
+        """
+
+        model = self.MODEL.many(**criteria)
+
+        if values:
+            model.set(**values)
+
+        query = getattr(relations.source(self.MODEL.SOURCE), f"{action}_query")(model)
+
+        if not hasattr(query, "bind"): # Sources without queries give back None
+            return None
+
+        query.bind(model)
+
+        if callable(getattr(query, "generate", None)):
+            query.generate()
+            return {"sql": query.sql, "args": list(query.args)}
+
+        if type(query).__str__ is not object.__str__:
+            return str(query)
+
+        return None
+
+    def capped(self, criteria, action):
+        """
+        Stops a bulk action that would touch more than MAX_ROWS
+        """
+
+        if self.MAX_ROWS is None:
+            return
+
+        matched = self.MODEL.many(**criteria).count()
+
+        if matched > self.MAX_ROWS:
+            raise werkzeug.exceptions.BadRequest(
+                f"cannot {action} {matched} {self.PLURAL}, more than {self.MAX_ROWS}, narrow the filter"
+            )
+
+    def batched(self, criteria, action, values=None, commit=True):
+        """
+        Updates or deletes BATCH at a time by id range, each in its own transaction, pausing PAUSE seconds
+        between so locks aren't held for long, unless not committing as already in a transaction
+        """
+
+        key = self._model._id
+        last = None
+        count = 0
+        batches = 0
+
+        while True:
+
+            after = {f"{key}__gt": last} if last is not None else {}
+            ids = self.MODEL.many(**{**criteria, **after}).sort(key).limit(self.BATCH)[key]
+
+            if not ids:
+                break
+
+            if commit and batches and self.PAUSE:
+                time.sleep(self.PAUSE)
+
+            # Criteria again so what's stopped matching since isn't touched
+
+            with transaction(self.MODEL) if commit else contextlib.nullcontext():
+
+                models = self.MODEL.many(**{**criteria, f"{key}__gte": ids[0], f"{key}__lte": ids[-1]})
+
+                if action == "update":
+                    done = models.set(**values).update()
+                else:
+                    done = models.delete()
+
+            if done and commit:
+                self.changed(f"{action}d", ids)
+
+            count += done
+            batches += 1
+            last = ids[-1]
+
+            if len(ids) < self.BATCH:
+                break
+
+        return {f"{action}d": count, "batches": batches}
+
+    def upserted(self, records): # pylint: disable=too-many-locals,too-many-branches
+        """
+        Creates records not there yet and updates those that are, matched on the id or UPSERT fields,
+        a chunk at a time
+        """
+
+        keys = self.UPSERT or ([self._model._id] if self._model._id is not None else [])
+
+        if not keys:
+            raise werkzeug.exceptions.BadRequest(f"cannot upsert {self.PLURAL} without an id or upsert fields")
+
+        criteria = Criteria.ensure(self.MODEL)
+        counts = {"created": 0, "updated": 0, "unchanged": 0}
+
+        for start in range(0, len(records), self._model.CHUNK):
+
+            matching = {}
+            creates = {}
+
+            # Records without an id can only be new, the rest are matched on their key
+
+            for index, record in enumerate(records[start:start + self._model.CHUNK]):
+
+                if not self.UPSERT and record.get(keys[0]) is None:
+                    creates[("new", index)] = record
+                    continue
+
+                for field in keys:
+                    if record.get(field) is None:
+                        raise werkzeug.exceptions.BadRequest(f"{self.PLURAL} need {field} to upsert")
+
+                key = tuple(criteria.coerce(field, criteria.kinds[field], record[field]) for field in keys)
+                matching[key] = {**matching.get(key, {}), **record}
+
+            updated = []
+
+            if matching:
+
+                existing = self.MODEL.many(**{
+                    f"{field}__in": sorted({key[place] for key in matching}, key=str)
+                    for place, field in enumerate(keys)
+                })
+
+                for model in existing:
+
+                    key = tuple(model[field] for field in keys)
+
+                    if key not in matching:
+                        continue
+
+                    record = matching.pop(key)
+                    before = model.export()
+
+                    # Matched on the key, so it's the same, and setting the id cascades to any children
+
+                    for field, value in record.items():
+                        if field not in keys and field != self._model._id:
+                            model[field] = value
+
+                    if model.export() != before:
+                        updated.append(model[self._model._id] if self._model._id is not None else None)
+                    else:
+                        counts["unchanged"] += 1
+
+                if updated:
+                    existing.update()
+
+            creates.update(matching)
+
+            if creates:
+                created = self.MODEL(list(creates.values())).create().export()
+                self.changed("created", [record.get(self._model._id) for record in created])
+
+            if updated:
+                self.changed("updated", updated)
+
+            counts["created"] += len(creates)
+            counts["updated"] += len(updated)
+
+        return counts
+
+    def patched(self, items): # pylint: disable=too-many-locals
+        """
+        Updates each record with its own changes, those with the same changes together, a chunk at a time,
+        all in one transaction
+        """
+
+        if self._model._id is None:
+            raise werkzeug.exceptions.BadRequest(f"cannot patch {self.PLURAL} by id without an id")
+
+        criteria = Criteria.ensure(self.MODEL)
+        kind = criteria.kinds[self._model._id]
+
+        ids = []
+        groups = {}
+
+        for item in items:
+
+            if not isinstance(item, dict) or "id" not in item or not isinstance(item.get("changes"), dict):
+                raise werkzeug.exceptions.BadRequest(f"{self.PLURAL} items need an id and changes")
+
+            id = criteria.coerce(self._model._id, kind, item["id"])
+
+            if id in ids:
+                raise werkzeug.exceptions.BadRequest(f"{self.PLURAL} has {id} more than once")
+
+            ids.append(id)
+
+            group = json.dumps(item["changes"], sort_keys=True, default=str)
+            groups.setdefault(group, {"changes": item["changes"], "ids": []})["ids"].append(id)
+
+        found = set()
+
+        with transaction(self.MODEL):
+            for group in groups.values():
+                for start in range(0, len(group["ids"]), self._model.CHUNK):
+
+                    chunk = group["ids"][start:start + self._model.CHUNK]
+                    updated = self.MODEL.many(**{f"{self._model._id}__in": chunk}).set(**group["changes"]).update()
+
+                    if updated == len(chunk):
+                        found.update(chunk)
+                    else:
+                        found.update(self.MODEL.many(**{f"{self._model._id}__in": chunk})[self._model._id])
+
+        if found:
+            self.changed("updated", [id for id in ids if id in found])
+
+        return {
+            "updated": len(found),
+            self.PLURAL: [{"id": id, "updated": int(id in found)} for id in ids]
+        }
+
+    def compacted(self, records, compact):
+        """
+        Encodes records as rows or columns under a single list of field names
+        """
+
+        columns = [field.name for field in self._model._fields._order]
+
+        if compact == "columns":
+            values = [[record[column] for record in records] for column in columns]
+        else:
+            values = [[record[column] for column in columns] for record in records]
+
+        return {"columns": columns, self.PLURAL: values}
+
+    def fields(self, likes, values, originals=None):
+        """
+        Apply options and titles to fields
+        """
+
+        fields = opengui.Fields(values=values, originals=originals, fields=self._fields)
+
+        for field in fields:
+            relation = self._model._ancestor(field.name)
+            if relation is not None:
+                like = {"like": likes[name] for name in likes if name == field.name}
+                parent = relation.Parent.many(**like).limit()
+                titles = parent.titles()
+
+                field.content["format"] = titles.format
+                field.content["overflow"] = parent.overflow
+
+                value = field.value if field.value is not None else field.original
+
+                if (not like and value is not None and value not in titles):
+                    titles = relation.Parent.one(**{relation.parent_id: value}).titles()
+                    field.content["overflow"] = True
+
+                field.options = titles.ids
+                field.content["titles"] = titles.titles
+
+                field.content.update(like)
+
+        return fields
+
+    def titles(self, relation, ids):
+        """
+        Looks up titles for parent ids, from the store for what it has
+        """
+
+        if self.STORE is None:
+            titles = relation.Parent.many(**{f"{relation.parent_id}__in": ids}).titles()
+            return {"titles": titles.titles, "format": titles.format}
+
+        name = relation.Parent.thy().NAME
+        ids = [id for id in (ids if isinstance(ids, list) else [ids]) if isinstance(id, (str, int, float))]
+
+        stored = self.STORE.get(name) or {"titles": {}, "format": None}
+        missing = [id for id in ids if id not in stored["titles"]]
+
+        if not missing and stored["format"] is not None:
+            return {"titles": {id: stored["titles"][id] for id in ids}, "format": stored["format"]}
+
+        titles = relation.Parent.many(**{f"{relation.parent_id}__in": missing}).titles()
+
+        if titles.titles:
+            self.STORE.update(name, titles.titles, titles.format)
+
+        found = {**stored["titles"], **titles.titles}
+
+        return {"titles": {id: found[id] for id in ids if id in found}, "format": titles.format}
+
+    def formats(self, model):
+        """
+        Generate all the formats including parent lookups
+        """
+
+        formats = {}
+
+        fields = opengui.Fields(fields=self._fields)
+
+        for field in model._fields._order:
+            relation = model._ancestor(field.name)
+            if relation is not None:
+                formats[field.name] = self.titles(relation, model[field.name])
+            elif field.format is not None or "titles" in fields[field.name].content:
+                formats[field.name] = {}
+                if field.format is not None:
+                    formats[field.name]["format"] = field.format
+                if  "titles" in fields[field.name].content:
+                    formats[field.name]["titles"] = fields[field.name].content["titles"]
+
+        return formats
+
+    @exceptions
+    def options(self, id=None):
+        """
+        Generates form for inserts or updates of a single record
+        """
+
+        values = self.json().get(self.SINGULAR)
+        likes = self.json().get("likes", {})
+
+        if id is None:
+
+            return self.fields(likes, values).to_dict(), 200
+
+        originals = self.MODEL.one(**{self._model._id: id}).export()
+
+        return self.fields(likes, values, originals).to_dict(), 200
+
+    @exceptions
+    def post(self):
+        """
+        Creates one or more models or complex
+        """
+
+        if "filter" in self.json():
+
+            return self.get()
+
+        if self.SINGULAR in self.json():
+
+            created = self.MODEL(**self.json()[self.SINGULAR]).create().export()
+            self.changed("created", [created.get(self._model._id)])
+
+            return {self.SINGULAR: created}, 201
+
+        if self.PLURAL in self.json():
+
+            created = self.MODEL(self.json()[self.PLURAL]).create().export()
+            self.changed("created", [record.get(self._model._id) for record in created])
+
+            return {self.PLURAL: created}, 201
+
+        raise werkzeug.exceptions.BadRequest(f"either {self.SINGULAR} or {self.PLURAL} required")
+
+    @exceptions
+    def get(self, id=None): # pylint: disable=too-many-return-statements
+        """
+        Retrieves one or more models
+        """
+
+        expand = self.expand()
+
+        if id is not None:
+
+            model = self.MODEL.one(**{self._model._id: id})
+            response = {self.SINGULAR: model.export(), "formats": self.formats(model)}
+
+            if expand:
+                response["expanded"] = self.expanded([response[self.SINGULAR]], expand)
+
+            return response
+
+        if self.subscribe():
+            return self.subscribed()
+
+        since = self.since()
+
+        if since is not None:
+            return self.synced(since), 200
+
+        export = self.export()
+
+        if export:
+            return self.exported(export)
+
+        distinct = self.distinct()
+
+        if distinct is not None:
+            return self.distinguished(distinct)
+
+        aggregate = self.aggregate()
+
+        if aggregate:
+            return {self.PLURAL: self.aggregated(*aggregate)}, 200
+
+        if self.dry_run():
+            return self.explained(self.criteria(), "retrieve"), 200
+
+        models = self.MODEL.many(**self.criteria()).sort(*self.sort()).limit(**self.limit())
+
+        if self.count():
+            return {self.PLURAL: models.count(), "overflow": models.overflow}, 200
+
+        compact = self.compact()
+
+        if compact and expand: # Expanded records nest their relations, which rows and columns have no place for
+            raise werkzeug.exceptions.BadRequest("cannot compact and expand at once")
+
+        if compact:
+            return {**self.compacted(models.export(), compact), "overflow": models.overflow, "formats": self.formats(models)}, 200
+
+        response = {self.PLURAL: models.export(), "overflow": models.overflow, "formats": self.formats(models)}
+
+        if expand:
+            response["expanded"] = self.expanded(response[self.PLURAL], expand)
+
+        return response, 200
+
+    @exceptions
+    def patch(self, id=None):
+        """
+        Updates one or more models models
+        """
+
+        if self.SINGULAR not in self.json() and self.PLURAL not in self.json():
+            raise werkzeug.exceptions.BadRequest(f"either {self.SINGULAR} or {self.PLURAL} required")
+
+        if self.dry_run():
+
+            values = self.json().get(self.SINGULAR, self.json().get(self.PLURAL))
+
+            if id is not None:
+                criteria = {self._model._id: id}
+            elif isinstance(self.json().get(self.PLURAL), list):
+
+                if self._model._id is None:
+                    raise werkzeug.exceptions.BadRequest(f"cannot patch {self.PLURAL} by id without an id")
+
+                criteria = {f"{self._model._id}__in": [item.get("id") for item in self.json()[self.PLURAL] if isinstance(item, dict)]}
+                values = None # Each has its own changes, so there's no one query
+
+            else:
+                criteria = self.criteria(True)
+
+            return self.explained(criteria, "update", values), 200
+
+        if id is not None:
+
+            model = self.MODEL.one(**{self._model._id: id}).set(**self.json()[self.SINGULAR])
+            ids = [id]
+
+        elif self.SINGULAR in self.json():
+
+            model = self.MODEL.one(**self.criteria(True)).set(**self.json()[self.SINGULAR])
+            ids = self.matched(self.criteria(True))[:1]
+
+        elif isinstance(self.json()[self.PLURAL], list):
+
+            return self.patched(self.json()[self.PLURAL]), 202
+
+        elif self.PLURAL in self.json():
+
+            self.capped(self.criteria(True), "update")
+
+            if self.BATCH is not None:
+                return self.batched(self.criteria(True), "update", self.json()[self.PLURAL]), 202
+
+            model = self.MODEL.many(**self.criteria(True)).set(**self.json()[self.PLURAL])
+            ids = self.matched(self.criteria(True))
+
+        updated = model.update()
+
+        if updated:
+            self.changed("updated", ids)
+
+        return {"updated": updated}, 202
+
+    @exceptions
+    def put(self, id=None):
+        """
+        Creates or updates many models, matched on id or UPSERT fields
+        """
+
+        if id is not None:
+            raise werkzeug.exceptions.MethodNotAllowed(description=f"upsert {self.PLURAL} on the collection, not one")
+
+        if not isinstance(self.json().get(self.PLURAL), list):
+            raise werkzeug.exceptions.BadRequest(f"{self.PLURAL} required")
+
+        return self.upserted(self.json()[self.PLURAL]), 200
+
+    @exceptions
+    def delete(self, id=None):
+        """
+        Deletes one or more models models
+        """
+
+        if self.dry_run():
+            return self.explained({self._model._id: id} if id is not None else self.criteria(True), "delete"), 200
+
+        if id is not None:
+
+            model = self.MODEL.one(**{self._model._id: id})
+            ids = [id]
+
+        else:
+
+            self.capped(self.criteria(True), "delete")
+
+            if self.BATCH is not None:
+                return self.batched(self.criteria(True), "delete"), 202
+
+            model = self.MODEL.many(**self.criteria(True))
+            ids = self.matched(self.criteria(True))
+
+        deleted = model.delete()
+
+        if deleted:
+            self.changed("deleted", ids)
 
-        return {"deleted": model.delete()}, 202
+        return {"deleted": deleted}, 202
@@ -0,0 +1,182 @@
+"""
+Titles module for sharing parent titles among workers
+"""
+
+import os
+import json
+import mmap
+import fcntl
+import threading
+import contextlib
+
+from relations_restx import representations
+
+
+class TitleStore:
+    """
+    Titles by model and id in a memory mapped file, swapped whole so readers never see half a write
+
+    The file's a JSON header line, version and where each model's entry is, followed by the
+    entries, so a reader only decodes the models it's asked about.
+    """
+
+    path = None    # Where the file is
+    version = None # Version of the file as last mapped
+    stamp = None   # Inode, modified, and size of the file as last mapped
+    index = None   # Offset and length of each model's entry
+    cache = None   # Entries decoded so far from this version
+
+    def __init__(self, path):
+
+        self.path = path
+        self.version = 0
+        self.index = {}
+        self.cache = {}
+
+        self.mapped = None
+        self.body = 0
+        self.lock = threading.RLock()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Keeps other processes from writing at the same time
+        """
+
+        with open(f"{self.path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def load(self):
+        """
+        Maps the file again if it's been swapped since last time
+        """
+
+        try:
+            stat = os.stat(self.path)
+            stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+
+        with self.lock:
+
+            if stamp == self.stamp:
+                return
+
+            if self.mapped is not None:
+                self.mapped.close()
+
+            self.stamp = stamp
+            self.version = 0
+            self.index = {}
+            self.cache = {}
+            self.mapped = None
+
+            if stamp is None or not stamp[2]:
+                return
+
+            with open(self.path, "rb") as file:
+                self.mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            self.body = self.mapped.find(b"\n") + 1
+            header = json.loads(self.mapped[:self.body])
+
+            self.version = header["version"]
+            self.index = header["index"]
+
+    def get(self, name):
+        """
+        Titles and format for a model, None if not stored
+        """
+
+        self.load()
+
+        with self.lock:
+
+            if name not in self.index:
+                return None
+
+            if name not in self.cache:
+                offset, length = self.index[name]
+                entry = json.loads(self.mapped[self.body + offset:self.body + offset + length])
+                self.cache[name] = {
+                    "titles": dict(entry["titles"]),
+                    "format": entry["format"]
+                }
+
+            return self.cache[name]
+
+    def raw(self, name):
+        """
+        A model's entry as stored, so it can be copied to the next version without decoding
+        """
+
+        offset, length = self.index[name]
+        return self.mapped[self.body + offset:self.body + offset + length]
+
+    def swap(self, entries):
+        """
+        Writes entries to a new version of the file, then atomically replaces the old
+
+        Entries already encoded, as from raw(), are written as is.
+        """
+
+        index = {}
+        blobs = []
+        offset = 0
+
+        for name, entry in entries.items():
+            blob = entry if isinstance(entry, bytes) else representations.dumps_json({
+                "titles": list(entry["titles"].items()), "format": entry["format"]
+            })
+            index[name] = [offset, len(blob)]
+            blobs.append(blob)
+            offset += len(blob)
+
+        temp = f"{self.path}.{os.getpid()}.{threading.get_ident()}"
+
+        with open(temp, "wb") as file:
+            file.write(json.dumps({"version": self.version + 1, "index": index}).encode() + b"\n")
+            file.writelines(blobs)
+
+        os.replace(temp, self.path)
+
+        self.load()
+
+    def update(self, name, titles, format): # pylint: disable=redefined-builtin
+        """
+        Adds titles for a model, keeping what's already there
+        """
+
+        with self.locked(), self.lock:
+
+            self.load()
+
+            current = self.get(name) or {"titles": {}, "format": None}
+
+            # Another worker may have added the same while this one waited, so there's nothing to write
+
+            if current["format"] == format and all(id in current["titles"] for id in titles):
+                return
+
+            entries = {stored: self.raw(stored) for stored in self.index if stored != name}
+            entries[name] = {"titles": {**current["titles"], **titles}, "format": format}
+
+            self.swap(entries)
+
+    def invalidate(self, name):
+        """
+        Drops a model's titles, as they might have changed
+        """
+
+        with self.locked(), self.lock:
+
+            self.load()
+
+            if name not in self.index:
+                return
+
+            self.swap({stored: self.raw(stored) for stored in self.index if stored != name})
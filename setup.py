@@ -19,7 +19,13 @@ setup(
     py_modules = [
         'relations_restx',
         'relations_restx.resource',
-        'relations_restx.api'
+        'relations_restx.api',
+        'relations_restx.limits',
+        'relations_restx.flight',
+        'relations_restx.changes',
+        'relations_restx.titles',
+        'relations_restx.criteria',
+        'relations_restx.representations'
     ],
     install_requires=[
         'Werkzeug==2.1.2',
@@ -31,6 +37,11 @@ setup(
         'opengui==0.8.8',
         'relations-dil==0.6.15'
     ],
+    extras_require={
+        'fast': ['orjson==3.8.3'],
+        'binary': ['msgpack==1.0.4', 'cbor2==5.4.6'],
+        'arrow': ['pyarrow==17.0.0']
+    },
     url="https://github.com/relations-dil/python-relations-restx",
     author="Gaffer Fitch",
     author_email="relations@gaf3.com",
@@ -23,7 +23,7 @@ class Jelly(ResourceModel):
 
 class Time(ResourceModel):
     id = int
-    name = str
+    name = str, {"validation": lambda value: len(value) < 10, "init": lambda: "now"}
 
 class JellyResource(relations_restx.Resource):
     MODEL = Jelly
@@ -91,6 +91,63 @@ class TestRestX(relations.unittest.TestCase):
             }
         ])
 
+        etag = response.headers["ETag"]
+
+        self.assertEqual(response.headers["Cache-Control"], "public, max-age=60")
+
+        response = api.get("/model", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.get_data(), b"")
+
+        response = api.get("/model/jelly")
+
+        self.assertStatusValue(response, 200, "model", {
+            "id": None,
+            "title": "Jelly",
+            "singular": "jelly",
+            "plural": "jellies",
+            "titles": ["name"],
+            "list": ["name"],
+            "fields": [
+                {
+                    "name": "name",
+                    "kind": "str",
+                    "required": True
+                }
+            ]
+        })
+
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+        response = api.get("/model/time")
+
+        self.assertStatusValue(response, 200, "model", {
+            "id": "id",
+            "title": "Time",
+            "singular": "time",
+            "plural": "times",
+            "titles": ["name"],
+            "list": ["id", "name"],
+            "fields": [
+                {
+                    "name": "id",
+                    "kind": "int",
+                    "readonly": True
+                },
+                {
+                    "name": "name",
+                    "kind": "str",
+                    "required": True
+                }
+            ]
+        })
+
+        response = api.get("/model/nope")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(response.json["message"].startswith("cannot find model nope"))
+
         response = api.post("/peanut_butter", json={"peanut_butter": {"name": "chunky"}})
 
         self.assertStatusModel(response, 201, "peanut_butter", {
@@ -1,3 +1,5 @@
+import types
+import contextlib
 import unittest
 import unittest.mock
 import relations.unittest
@@ -5,7 +7,7 @@ import relations.unittest
 import flask
 import flask_restx
 import werkzeug.exceptions
-from test.test_relations_restx.test_resource import SimpleResource, TestRestX
+from test.test_relations_restx.test_resource import Simple, Plain, SimpleResource, PlainResource, BroResource, TestRestX
 
 import opengui
 import ipaddress
@@ -80,56 +82,123 @@ class TestOpenApi(TestRestX):
         })
 
         self.assertEqual(schemas["simple_sort"], {
-            "type": "object",
+            "allOf": [{"$ref": "#/components/schemas/Sort"}],
             "properties": {
                 "sort": {
-                    "type": "array",
-                    "description": "sort by these fields, prefix with + for ascending (default), - for descending",
                     "default": ["+name"]
                 }
             }
         })
 
         self.assertEqual(schemas["simple_limit"], {
-            "type": "object",
+            "allOf": [{"$ref": "#/components/schemas/Limit"}],
             "properties": {
-                "limit": {
-                    "type": "integer",
-                    "description": "limit the number of simples"
-                },
-                "limit__start": {
-                    "type": "integer",
-                    "description": "limit the number of simples starting here"
-                },
                 "limit__per_page": {
-                    "type": "integer",
-                    "description": "limit the number of simples by this page size (default 2)"
+                    "default": 2
+                }
+            }
+        })
+
+        self.assertNotIn("simple_count", schemas)
+
+    def test_relations_parameters(self):
+
+        self.assertEqual(relations_restx.OpenApi.relations_parameters(SimpleResource.thy()), {
+            "simple_params": {
+                "in": "query",
+                "schema": {
+                    "type": "object"
                 },
-                "limit__page": {
-                    "type": "integer",
-                    "description": "limit the number of simples and retrieve this page"
+                "style": "form",
+                "explode": True,
+                "name": "params",
+                "examples": {
+                    "filter through params": {
+                        "value": {
+                            **{"name": ""}
+                        }
+                    },
+                    "filter through params limit": {
+                        "$ref": "#/components/examples/simple_params_limit"
+                    },
+                    "filter through params paginate": {
+                        "$ref": "#/components/examples/simple_params_paginate"
+                    },
+                    "filter through body": {
+                        "value": {}
+                    },
+                    "dry run": {
+                        "value": {
+                            **{"name": ""},
+                            "dry_run": True
+                        }
+                    }
                 }
             }
         })
 
-        self.assertEqual(schemas["simple_count"], {
-            "type": "object",
-            "properties": {
-                "count": {
-                    "type": "boolean",
-                    "description": "return only the count of simples found"
+    def test_relations_examples(self):
+
+        self.assertEqual(relations_restx.OpenApi.relations_examples(SimpleResource.thy()), {
+            "simple": {
+                "value": {
+                    "simple": {"name": ""}
+                }
+            },
+            "simples_read": {
+                "value": {
+                    "simples": [{"id": 0, "name": ""}]
+                }
+            },
+            "simples_list": {
+                "value": {
+                    "simples": [{"id": 0, "name": ""}],
+                    "overflow": False,
+                    "formats": {}
+                }
+            },
+            "simple_filter_limit": {
+                "value": {
+                    "filter": {"name": ""},
+                    "sort": ["+name"],
+                    "limit": {
+                        "limit": 2,
+                        "start": 0
+                    }
+                }
+            },
+            "simple_filter_paginate": {
+                "value": {
+                    "filter": {"name": ""},
+                    "sort": ["+name"],
+                    "limit": {
+                        "page": 1,
+                        "per_page": 2
+                    }
+                }
+            },
+            "simple_params_limit": {
+                "value": {
+                    "name": "",
+                    "sort": "+name",
+                    "limit": 2,
+                    "limit__start": 0
+                }
+            },
+            "simple_params_paginate": {
+                "value": {
+                    "name": "",
+                    "sort": "+name",
+                    "limit__page": 1,
+                    "limit__per_page": 2
                 }
             }
         })
 
-    def test_relations_create_options(self):
+    def test_relations_bodies(self):
 
-        self.assertEqual(relations_restx.OpenApi.relations_create_options(SimpleResource.thy()), {
-            "tags": ["Simple"],
-            "operationId": "simple_create_options",
-            "summary": "generates and validates fields to create one simple or many simples",
-            "description": "To generate, send nothing. To validate, send a simple.",
-            "requestBody": {
+        self.assertEqual(relations_restx.OpenApi.relations_bodies(SimpleResource.thy()), {
+            "simple_options": {
                 "content": {
                     "application/json": {
                         "schema": {
@@ -140,13 +209,43 @@ class TestOpenApi(TestRestX):
                                 "value": {}
                             },
                             "validate": {
-                                "value": {
-                                    "simple": {"name": ""}
-                                }
+                                "$ref": "#/components/examples/simple"
                             }
                         }
                     }
                 }
+            }
+        })
+
+    def test_relations_overrides(self):
+
+        self.assertEqual(list(relations_restx.OpenApi.relations_overrides(SimpleResource.thy())), ["simple_sort", "simple_limit"])
+        self.assertEqual(list(relations_restx.OpenApi.relations_overrides(BroResource.thy())), ["bro_sort"])
+
+        class Bare(relations.Model):
+            SOURCE = "RestXResource"
+            id = int
+            spend = float
+
+        class BareResource(relations_restx.Resource):
+            MODEL = Bare
+
+        self.assertEqual(relations_restx.OpenApi.relations_overrides(BareResource.thy()), {})
+
+    def test_relations_ref(self):
+
+        self.assertEqual(relations_restx.OpenApi.relations_ref(SimpleResource.thy(), "Limit"), "#/components/schemas/simple_limit")
+        self.assertEqual(relations_restx.OpenApi.relations_ref(BroResource.thy(), "Limit"), "#/components/schemas/Limit")
+
+    def test_relations_create_options(self):
+
+        self.assertEqual(relations_restx.OpenApi.relations_create_options(SimpleResource.thy()), {
+            "tags": ["Simple"],
+            "operationId": "simple_create_options",
+            "summary": "generates and validates fields to create one simple or many simples",
+            "description": "To generate, send nothing. To validate, send a simple.",
+            "requestBody": {
+                "$ref": "#/components/requestBodies/simple_options"
             },
             "responses": {
                 "200": {
@@ -194,7 +293,7 @@ class TestOpenApi(TestRestX):
                                             "$ref": "#/components/schemas/simple_limit"
                                         },
                                         {
-                                            "$ref": "#/components/schemas/simple_count"
+                                            "$ref": "#/components/schemas/Count"
                                         }
                                     ]
                                 }
@@ -202,9 +301,7 @@ class TestOpenApi(TestRestX):
                         },
                         "examples": {
                             "create one": {
-                                "value": {
-                                    "simple": {"name": ""}
-                                }
+                                "$ref": "#/components/examples/simple"
                             },
                             "create many": {
                                 "value": {
@@ -218,24 +315,10 @@ class TestOpenApi(TestRestX):
                                 }
                             },
                             "limit retrieve": {
-                                "value": {
-                                    "filter": {"name": ""},
-                                    "sort": ["+name"],
-                                    "limit": {
-                                        "limit": 2,
-                                        "start": 0
-                                    }
-                                }
+                                "$ref": "#/components/examples/simple_filter_limit"
                             },
                             "paginate retrieve": {
-                                "value": {
-                                    "filter": {"name": ""},
-                                    "sort": ["+name"],
-                                    "limit": {
-                                        "page": 1,
-                                        "per_page": 2
-                                    }
-                                }
+                                "$ref": "#/components/examples/simple_filter_paginate"
                             },
                             "count retrieve": {
                                 "value": {
@@ -264,11 +347,7 @@ class TestOpenApi(TestRestX):
                             },
                             "examples": {
                                 "list retrieve": {
-                                    "value": {
-                                        "simples": [{"id": 0, "name": ""}],
-                                        "overflow": False,
-                                        "formats": {}
-                                    }
+                                    "$ref": "#/components/examples/simples_list"
                                 },
                                 "count retrieve": {
                                     "value": {
@@ -301,9 +380,7 @@ class TestOpenApi(TestRestX):
                                     }
                                 },
                                 "create many": {
-                                    "value": {
-                                        "simples": [{"id": 0, "name": ""}]
-                                    }
+                                    "$ref": "#/components/examples/simples_read"
                                 }
                             }
                         }
@@ -346,25 +423,46 @@ class TestOpenApi(TestRestX):
                             }
                         },
                         "limit": {
+                            "$ref": "#/components/examples/simple_params_limit"
+                        },
+                        "paginate": {
+                            "$ref": "#/components/examples/simple_params_paginate"
+                        },
+                        "count": {
                             "value": {
                                 **{"name": ""},
-                                "sort": ",".join(["+name"]),
-                                "limit": 2,
-                                "limit__start": 0
+                                "count": 1
                             }
                         },
-                        "paginate": {
+                        "compact": {
                             "value": {
                                 **{"name": ""},
-                                "sort": ",".join(["+name"]),
-                                "limit__page": 1,
-                                "limit__per_page": 2
+                                "compact": "rows"
                             }
                         },
-                        "count": {
+                        "export": {
                             "value": {
                                 **{"name": ""},
-                                "count": 1
+                                "export": "arrow"
+                            }
+                        },
+                        "aggregate": {
+                            "value": {
+                                **{"name": ""},
+                                "group": "name",
+                                "agg": "count"
+                            }
+                        },
+                        "distinct": {
+                            "value": {
+                                **{"name": ""},
+                                "distinct": "name"
+                            }
+                        },
+                        "explain": {
+                            "value": {
+                                **{"name": ""},
+                                "explain": True
                             }
                         }
                     }
@@ -380,8 +478,12 @@ class TestOpenApi(TestRestX):
                             },
                             "examples": {
                                 "list retrieve": {
+                                    "$ref": "#/components/examples/simples_list"
+                                },
+                                "compact retrieve": {
                                     "value": {
-                                        "simples": [{"id": 0, "name": ""}],
+                                        "columns": ["id", "name"],
+                                        "simples": [[0, ""]],
                                         "overflow": False,
                                         "formats": {}
                                     }
@@ -390,8 +492,37 @@ class TestOpenApi(TestRestX):
                                     "value": {
                                         "count": 1
                                     }
+                                },
+                                "aggregate retrieve": {
+                                    "value": {
+                                        "simples": [{"name": "", "count": 1}]
+                                    }
+                                },
+                                "distinct retrieve": {
+                                    "value": {
+                                        "distinct": [""],
+                                        "overflow": False
+                                    }
                                 }
                             }
+                        },
+                        "application/vnd.apache.arrow.stream": {
+                            "schema": {
+                                "type": "string",
+                                "format": "binary"
+                            }
+                        },
+                        "application/vnd.apache.parquet": {
+                            "schema": {
+                                "type": "string",
+                                "format": "binary"
+                            }
+                        },
+                        "text/csv": {
+                            "schema": {
+                                "type": "string",
+                                "format": "binary"
+                            }
                         }
                     }
                 }
@@ -406,39 +537,7 @@ class TestOpenApi(TestRestX):
             "summary": "updates many simples",
             "parameters": [
                 {
-                    "in": "query",
-                    "schema": {
-                        "type": "object"
-                    },
-                    "style": "form",
-                    "explode": True,
-                    "name": "params",
-                    "examples": {
-                        "filter through params": {
-                            "value": {
-                                **{"name": ""}
-                            }
-                        },
-                        "filter through params limit": {
-                            "value": {
-                                **{"name": ""},
-                                "sort": ",".join(["+name"]),
-                                "limit": 2,
-                                "limit__start": 0
-                            }
-                        },
-                        "filter through params paginate": {
-                            "value": {
-                                **{"name": ""},
-                                "sort": ",".join(["+name"]),
-                                "limit__page": 1,
-                                "limit__per_page": 2
-                            }
-                        },
-                        "filter through body": {
-                            "value": {}
-                        }
-                    }
+                    "$ref": "#/components/parameters/simple_params"
                 }
             ],
             "requestBody": {
@@ -493,6 +592,11 @@ class TestOpenApi(TestRestX):
                                     "filter": {},
                                     "simples": {"name": ""}
                                 }
+                            },
+                            "update each": {
+                                "value": {
+                                    "simples": [{"id": 0, "changes": {"name": ""}}]
+                                }
                             }
                         }
                     }
@@ -515,6 +619,55 @@ class TestOpenApi(TestRestX):
             }
         })
 
+        self.assertNotIn("update each", relations_restx.OpenApi.relations_update_many(PlainResource.thy())["requestBody"]["content"]["application/json"]["examples"])
+
+    def test_relations_upsert_many(self):
+
+        self.assertEqual(relations_restx.OpenApi.relations_upsert_many(SimpleResource.thy()), {
+            "tags": ["Simple"],
+            "operationId": "simple_upsert_many",
+            "summary": "creates or updates many simples",
+            "description": "Send simples, matched on id, created if not there, else updated.",
+            "requestBody": {
+                "content": {
+                    "application/json": {
+                        "schema": {
+                            "$ref": "#/components/schemas/simples"
+                        },
+                        "examples": {
+                            "upsert": {
+                                "$ref": "#/components/examples/simples_read"
+                            }
+                        }
+                    }
+                }
+            },
+            "responses": {
+                "200": {
+                    "description": "many simples created or updated",
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "$ref": "#/components/schemas/Upserted"
+                            }
+                        }
+                    }
+                },
+                "400": {
+                    "description": "unable to upsert due to bad request"
+                }
+            }
+        })
+
+        class NameResource(relations_restx.Resource):
+            MODEL = Simple
+            UPSERT = ["name"]
+
+        self.assertEqual(
+            relations_restx.OpenApi.relations_upsert_many(NameResource.thy())["description"],
+            "Send simples, matched on name, created if not there, else updated."
+        )
+
     def test_relations_delete_many(self):
 
         self.assertEqual(relations_restx.OpenApi.relations_delete_many(SimpleResource.thy()), {
@@ -523,39 +676,7 @@ class TestOpenApi(TestRestX):
             "summary": "deletes many simples",
             "parameters": [
                 {
-                    "in": "query",
-                    "schema": {
-                        "type": "object"
-                    },
-                    "style": "form",
-                    "explode": True,
-                    "name": "params",
-                    "examples": {
-                        "filter through params": {
-                            "value": {
-                                **{"name": ""}
-                            }
-                        },
-                        "filter through params limit": {
-                            "value": {
-                                **{"name": ""},
-                                "sort": ",".join(["+name"]),
-                                "limit": 2,
-                                "limit__start": 0
-                            }
-                        },
-                        "filter through params paginate": {
-                            "value": {
-                                **{"name": ""},
-                                "sort": ",".join(["+name"]),
-                                "limit__page": 1,
-                                "limit__per_page": 2
-                            }
-                        },
-                        "filter through body": {
-                            "value": {}
-                        }
-                    }
+                    "$ref": "#/components/parameters/simple_params"
                 }
             ],
             "requestBody": {
@@ -578,24 +699,10 @@ class TestOpenApi(TestRestX):
                                 }
                             },
                             "filter through body limit": {
-                                "value": {
-                                    "filter": {"name": ""},
-                                    "sort": ["+name"],
-                                    "limit": {
-                                        "limit": 2,
-                                        "start": 0
-                                    }
-                                }
+                                "$ref": "#/components/examples/simple_filter_limit"
                             },
                             "filter through body paginate": {
-                                "value": {
-                                    "filter": {"name": ""},
-                                    "sort": ["+name"],
-                                    "limit": {
-                                        "page": 1,
-                                        "per_page": 2
-                                    }
-                                }
+                                "$ref": "#/components/examples/simple_filter_paginate"
                             },
                             "delete all": {
                                 "value": {
@@ -630,23 +737,7 @@ class TestOpenApi(TestRestX):
             "operationId": "simple_update_options",
             "summary": "generates and validates fields to update one simple",
             "requestBody": {
-                "content": {
-                    "application/json": {
-                        "schema": {
-                            "$ref": "#/components/schemas/simple"
-                        },
-                        "examples": {
-                            "generate": {
-                                "value": {}
-                            },
-                            "validate": {
-                                "value": {
-                                    "simple": {"name": ""}
-                                }
-                            }
-                        }
-                    }
-                }
+                "$ref": "#/components/requestBodies/simple_options"
             },
             "responses": {
                 "200": {
@@ -711,9 +802,7 @@ class TestOpenApi(TestRestX):
                         },
                         "examples": {
                             "update": {
-                                "value": {
-                                    "simple": {"name": ""}
-                                }
+                                "$ref": "#/components/examples/simple"
                             }
                         }
                     }
@@ -762,6 +851,24 @@ class TestOpenApi(TestRestX):
             }
         })
 
+    def test_relations_path(self):
+
+        openapi = relations_restx.OpenApi(self.restx)
+
+        path = openapi.relations_path("/simple", SimpleResource.thy())
+
+        self.assertEqual(list(path), ["options", "post", "get", "patch", "put", "delete"])
+        self.assertEqual(path["post"]["operationId"], "simple_create_search")
+
+        path = openapi.relations_path("/plain", PlainResource.thy())
+
+        self.assertEqual(list(path), ["options", "post", "get", "patch", "delete"])
+
+        path = openapi.relations_path("/simple/{id}", SimpleResource.thy())
+
+        self.assertEqual(list(path), ["options", "get", "patch", "delete"])
+        self.assertEqual(path["get"]["operationId"], "simple_retrieve_one")
+
     def test_relations_operations(self):
 
         specs = {
@@ -865,9 +972,106 @@ class TestOpenApi(TestRestX):
             "required": ["name"]
         })
 
+        self.assertEqual(list(specs["components"]["parameters"]), ["simple_params"])
+        self.assertIn("simple", specs["components"]["examples"])
+        self.assertIn("simple_options", specs["components"]["requestBodies"])
+
         self.assertEqual(specs["paths"]["/simple"]["options"]["operationId"], "simple_create_options")
         self.assertEqual(specs["paths"]["/simple"]["options"]["no"], "touch")
 
+    def test_serialize_resource(self):
+
+        class Plain(flask_restx.Resource):
+            def get(self):
+                return {}
+
+        openapi = relations_restx.OpenApi(self.restx)
+        openapi.relations_resources = set()
+        openapi.relations_tags = []
+        openapi.relations_components = {"schemas": {}, "parameters": {}, "examples": {}, "requestBodies": {}}
+
+        with self.app.test_request_context():
+
+            path = openapi.serialize_resource(self.restx.namespaces[0], SimpleResource, "/simple/<id>")
+            openapi.serialize_resource(self.restx.namespaces[0], SimpleResource, "/simple")
+
+            self.assertEqual(path["patch"]["operationId"], "simple_update_one")
+            self.assertEqual(openapi.relations_resources, {SimpleResource})
+            self.assertEqual(openapi.relations_tags, [{"name": "Simple"}])
+            self.assertIn("Simple", openapi.relations_components["schemas"])
+            self.assertIn("simple_params", openapi.relations_components["parameters"])
+            self.assertIn("simples_list", openapi.relations_components["examples"])
+            self.assertIn("simple_options", openapi.relations_components["requestBodies"])
+
+            self.assertEqual(openapi.serialize_resource(self.restx.namespaces[0], Plain, "/plain")["get"]["operationId"], "get_plain")
+
+            # Whatever methods are documented with is kept under what's generated
+
+            ns = self.restx.namespaces[0]
+
+            @ns.doc(security="apikey")
+            class Secure(relations_restx.Resource):
+
+                MODEL = Simple
+
+                def get(self, id=None):
+                    pass
+
+                @ns.doc(deprecated=True, description="Don't")
+                def delete(self, id=None):
+                    pass
+
+            path = openapi.serialize_resource(self.restx.namespaces[0], Secure, "/simple")
+
+            self.assertEqual(path["get"]["security"], [{"apikey": []}])
+            self.assertEqual(path["get"]["operationId"], "simple_retrieve_many")
+            self.assertNotIn("deprecated", path["get"])
+            self.assertTrue(path["delete"]["deprecated"])
+            self.assertEqual(path["delete"]["description"], "Don't")
+            self.assertEqual(path["delete"]["security"], [{"apikey": []}])
+
+            @ns.doc(False)
+            class Hidden(relations_restx.Resource):
+                MODEL = Simple
+
+            self.assertIsNone(openapi.serialize_resource(self.restx.namespaces[0], Hidden, "/simple"))
+
+    def test_relations_documented(self):
+
+        class Detailed(relations_restx.Resource):
+
+            MODEL = Simple
+
+            def get(self, id=None):
+                """
+                Gets simples. Only the ones you can see.
+                """
+
+        ns = self.restx.namespaces[0]
+
+        @ns.doc(security="apikey")
+        class Secure(relations_restx.Resource):
+            MODEL = Simple
+
+        openapi = relations_restx.OpenApi(self.restx)
+
+        self.assertFalse(openapi.relations_documented(SimpleResource, {}))
+        self.assertEqual(openapi.documented, {SimpleResource: False})
+
+        self.assertTrue(openapi.relations_documented(SimpleResource, {"description": "route"}))
+        self.assertTrue(openapi.relations_documented(Secure, None))
+        self.assertTrue(openapi.relations_documented(Detailed, None))
+
+        openapi.relations_resources = set()
+        openapi.relations_tags = []
+        openapi.relations_components = {"schemas": {}, "parameters": {}, "examples": {}, "requestBodies": {}}
+
+        with self.app.test_request_context():
+            path = openapi.serialize_resource(self.restx.namespaces[0], Detailed, "/simple")
+
+        self.assertEqual(path["get"]["description"], "Only the ones you can see.")
+        self.assertEqual(path["get"]["summary"], "retrieves many simples")
+
     def test_as_dict(self):
 
         specs = self.api.get("/swagger.json").json
@@ -988,6 +1192,44 @@ class TestOpenApi(TestRestX):
                 }
         })
 
+        self.assertEqual(specs["components"]["schemas"]["Count"], {
+            "type": "object",
+            "properties": {
+                "count": {
+                    "type": "boolean",
+                    "description": "return only the count of those found"
+                }
+            }
+        })
+
+        self.assertEqual(specs["components"]["schemas"]["Limit"]["properties"]["limit__per_page"]["default"], 100)
+        self.assertNotIn("default", specs["components"]["schemas"]["Sort"]["properties"]["sort"])
+
+        self.assertEqual(list(specs["components"]["schemas"]["Upserted"]["properties"]), ["created", "updated", "unchanged"])
+
+        self.assertIn("simple_params", specs["components"]["parameters"])
+
+        # Every shared example and body referenced is there
+
+        def refs(node):
+            if isinstance(node, dict):
+                if isinstance(node.get("$ref"), str) and node["$ref"].split("/")[2] in ["examples", "requestBodies"]:
+                    yield node["$ref"]
+                for value in node.values():
+                    yield from refs(value)
+            elif isinstance(node, list):
+                for value in node:
+                    yield from refs(value)
+
+        found = set(refs(specs))
+
+        self.assertIn("#/components/examples/simples_list", found)
+        self.assertIn("#/components/requestBodies/simple_options", found)
+
+        for ref in found:
+            _, _, kind, name = ref.split("/")
+            self.assertIn(name, specs["components"][kind])
+
         self.assertIn({"name": "Simple"}, specs["tags"])
 
         self.assertEqual(specs["components"]["schemas"]["Simple"], {
@@ -1005,3 +1247,480 @@ class TestOpenApi(TestRestX):
         })
 
         self.assertEqual(specs["paths"]["/simple"]["options"]["operationId"], "simple_create_options")
+
+
+    def test_split(self):
+
+        app = flask.Flask("split-api")
+        restx = relations_restx.Api(app)
+
+        restx.add_resource(SimpleResource, *SimpleResource.thy().endpoints())
+        restx.namespace("family").add_resource(BroResource, *BroResource.thy().endpoints())
+        restx.namespace("empty")
+
+        with app.test_request_context():
+
+            specs = relations_restx.OpenApi(restx, ["family"]).as_dict()
+
+            self.assertEqual(list(specs["paths"]), ["/family/bro", "/family/bro/{id}"])
+            self.assertEqual(specs["tags"], [{"name": "family"}, {"name": "Bro"}])
+            self.assertIn("Bro", specs["components"]["schemas"])
+            self.assertNotIn("Simple", specs["components"]["schemas"])
+            self.assertIn("Sort", specs["components"]["schemas"])
+            self.assertEqual(list(specs["components"]["parameters"]), ["bro_params"])
+
+            specs = relations_restx.OpenApi(restx).split()
+
+            self.assertEqual(list(specs), ["default", "family"])
+            self.assertEqual(list(specs["default"]["paths"]), ["/simple", "/simple/{id}"])
+            self.assertEqual(specs["default"]["tags"], [{"name": "default", "description": "Default namespace"}, {"name": "Simple"}])
+
+
+    def test_tags(self):
+
+        class Plain(flask_restx.Resource):
+            def get(self):
+                return {}
+
+        self.restx.add_resource(Plain, "/plain_old")
+
+        with self.app.test_request_context():
+
+            specs = relations_restx.OpenApi(self.restx, tags=["Bro"]).as_dict()
+
+            self.assertEqual(list(specs["paths"]), ["/bro", "/bro/{id}"])
+            self.assertEqual(specs["tags"], [{"name": "Bro"}])
+            self.assertEqual(list(specs["components"]["parameters"]), ["bro_params"])
+            self.assertEqual(list(specs["components"]["requestBodies"]), ["bro_options"])
+
+            specs = relations_restx.OpenApi(self.restx, tags=["default"]).as_dict()
+
+            self.assertEqual(list(specs["paths"]), ["/plain_old"])
+            self.assertEqual(specs["tags"], [{"name": "default", "description": "Default namespace"}])
+
+
+class TestSwaggerView(TestRestX):
+
+    def test_get(self):
+
+        response = self.api.get("/swagger.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("/simple", response.json["paths"])
+
+        response = self.api.get("/swagger.json?tag=Simple")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json["paths"]), ["/simple", "/simple/{id}"])
+
+        response = self.api.get("/swagger.json?namespace=default&tag=Bro")
+        self.assertEqual(list(response.json["paths"]), ["/bro", "/bro/{id}"])
+
+        response = self.api.get("/swagger/default.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("/simple", response.json["paths"])
+
+        self.app.config["RESTX_ERROR_404_HELP"] = False
+
+        response = self.api.get("/swagger/nope.json")
+        self.assertStatusValue(response, 404, "message", "cannot find namespace nope")
+
+        response = self.api.get("/swagger.json?tag=Nope")
+        self.assertStatusValue(response, 404, "message", "cannot find tag Nope")
+
+
+class TestTransaction(TestRestX):
+
+    def setUp(self):
+
+        super().setUp()
+
+        self.restx.add_transaction()
+
+    def test_resolve(self):
+
+        transaction = relations_restx.Transaction(api=self.restx)
+        transaction.results = {"ya": {"id": 1, "name": "ya"}}
+
+        self.assertEqual(transaction.resolve({
+            "simple_id": {"$ref": "ya.id"},
+            "names": [{"$ref": "ya.name"}, "sure"],
+            "other": {"$ref": "ya.id", "not": "a ref"}
+        }), {
+            "simple_id": 1,
+            "names": ["ya", "sure"],
+            "other": {"$ref": "ya.id", "not": "a ref"}
+        })
+
+        self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot find reference nope.id", transaction.resolve, {"$ref": "nope.id"})
+        self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot find reference ya.nope", transaction.resolve, {"$ref": "ya.nope"})
+
+    def test_operation(self):
+
+        self.assertEqual(relations_restx.Transaction.operation({"action": "create"}), "create_one")
+        self.assertEqual(relations_restx.Transaction.operation({"action": "update", "id": 1}), "update_one")
+        self.assertEqual(relations_restx.Transaction.operation({"action": "delete", "filter": {}}), "delete_many")
+
+    def test_admit(self):
+
+        relations_restx.Admission.INSTANCES = {}
+
+        transaction = relations_restx.Transaction(api=self.restx)
+
+        with self.app.test_request_context(), \
+             unittest.mock.patch.object(SimpleResource, "CONCURRENCY", {"patch": 1}), \
+             unittest.mock.patch.object(PlainResource, "CONCURRENCY", 1):
+
+            planned = [
+                (0, SimpleResource(api=self.restx), {"action": "update"}),
+                (1, SimpleResource(api=self.restx), {"action": "update"}),
+                (2, SimpleResource(api=self.restx), {"action": "create"}),
+                (3, PlainResource(api=self.restx), {"action": "delete"})
+            ]
+
+            with contextlib.ExitStack() as stack:
+
+                transaction.admit(stack, planned)
+
+                self.assertEqual(relations_restx.Admission.INSTANCES["SimpleResource.patch"].active, 1)
+                self.assertEqual(relations_restx.Admission.INSTANCES["PlainResource.delete"].active, 1)
+                self.assertNotIn("SimpleResource.post", relations_restx.Admission.INSTANCES)
+
+            self.assertEqual(relations_restx.Admission.INSTANCES["SimpleResource.patch"].active, 0)
+            self.assertEqual(relations_restx.Admission.INSTANCES["PlainResource.delete"].active, 0)
+
+    def test_run(self):
+
+        with self.app.test_request_context():
+
+            resource = SimpleResource(api=self.restx)
+
+            self.assertEqual(
+                relations_restx.Transaction.run(resource, {"action": "create", "simple": {"name": "ya"}}),
+                ({"simple": {"id": 1, "name": "ya"}}, {"id": 1, "name": "ya"}, ("created", [1]))
+            )
+
+            self.assertEqual(
+                relations_restx.Transaction.run(resource, {"action": "update", "id": 1, "simple": {"name": "sure"}}),
+                ({"updated": 1}, {"id": 1}, ("updated", [1]))
+            )
+
+            self.assertEqual(
+                relations_restx.Transaction.run(resource, {"action": "delete", "filter": {"name": "sure"}}),
+                ({"deleted": 1}, {"id": None}, ("deleted", []))
+            )
+
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "update needs an id or filter",
+                relations_restx.Transaction.run, resource, {"action": "update", "simple": {}})
+
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "to confirm all, send a blank filter",
+                relations_restx.Transaction.run, resource, {"action": "delete", "filter": None})
+
+            # Filters are capped and batched like on their own
+
+            Simple("a").create()
+            Simple("b").create()
+
+            with unittest.mock.patch.object(SimpleResource, "MAX_ROWS", 1):
+                self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot delete 2 simples, more than 1, narrow the filter",
+                    relations_restx.Transaction.run, resource, {"action": "delete", "filter": {}})
+
+            with unittest.mock.patch.object(SimpleResource, "BATCH", 1), \
+                 unittest.mock.patch.object(SimpleResource, "matched", return_value=[2, 3]), \
+                 unittest.mock.patch.object(SimpleResource, "batched", wraps=resource.batched) as batched:
+
+                self.assertEqual(
+                    relations_restx.Transaction.run(resource, {"action": "delete", "filter": {"name": "a"}}),
+                    ({"deleted": 1, "batches": 1}, {"id": None}, ("deleted", []))
+                )
+
+                batched.assert_called_once_with({"name": "a"}, "delete", {}, commit=True)
+
+                self.assertEqual(
+                    relations_restx.Transaction.run(resource, {"action": "delete", "filter": {}}, True),
+                    ({"deleted": 1, "batches": 1}, {"id": None}, ("deleted", [2, 3]))
+                )
+
+                batched.assert_called_with({}, "delete", {}, commit=False)
+
+    def test_post(self):
+
+        response = self.api.post("/transaction", json={"operations": [
+            {"resource": "simple", "action": "create", "simple": {"name": "ya"}, "ref": "ya"},
+            {"resource": "plain", "action": "create", "plain": {"simple_id": {"$ref": "ya.id"}, "name": "sure"}},
+            {"resource": "simple", "action": "update", "id": {"$ref": "ya.id"}, "simple": {"name": "yep"}},
+            {"resource": "plain", "action": "delete", "filter": {"name": "nope"}}
+        ]})
+
+        self.assertStatusValue(response, 200, "results", [
+            {"simple": {"id": 1, "name": "ya"}},
+            {"plain": {"simple_id": 1, "name": "sure"}},
+            {"updated": 1},
+            {"deleted": 0}
+        ])
+
+        self.assertFalse(response.json["atomic"])
+        self.assertEqual(Simple.one().name, "yep")
+        self.assertEqual(Plain.one().simple_id, 1)
+
+        self.assertStatusValue(self.api.post("/transaction", json={}), 400, "message", "operations required")
+
+        with unittest.mock.patch.object(relations_restx.Transaction, "LIMIT", 1):
+            response = self.api.post("/transaction", json={"operations": [{}, {}]})
+            self.assertStatusValue(response, 400, "message", "at most 1 operations")
+
+        response = self.api.post("/transaction", json={"operations": [{"resource": "nope"}]})
+        self.assertStatusValue(response, 400, "message", "operation 0: cannot find resource nope")
+
+        response = self.api.post("/transaction", json={"operations": [{"resource": "simple", "action": "nope"}]})
+        self.assertStatusValue(response, 400, "message", "operation 0: action must be one of create, update, delete")
+
+        response = self.api.post("/transaction", json={"operations": [
+            {"resource": "simple", "action": "create", "simple": {"name": "sure"}},
+            {"resource": "plain", "action": "create", "plain": {"simple_id": {"$ref": "nope.id"}}}
+        ]})
+        self.assertStatusValue(response, 400, "message", "operation 1: cannot find reference nope.id")
+
+        response = self.api.post("/transaction", json={"operations": [
+            {"resource": "simple", "action": "delete", "id": 9}
+        ]})
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(response.json["message"].startswith("operation 0: "))
+
+        # Decoded like any other body
+
+        msgpack = relations_restx.representations.msgpack
+
+        if msgpack is not None:
+
+            response = self.api.post(
+                "/transaction",
+                data=msgpack.packb({"operations": [{"resource": "simple", "action": "create", "simple": {"name": "packed"}}]}),
+                headers={"Content-Type": "application/msgpack"}
+            )
+
+            self.assertStatusValue(response, 200, "results", [{"simple": {"id": 3, "name": "packed"}}])
+
+        # Each operation's rate limited before anything's done
+
+        with unittest.mock.patch.object(SimpleResource, "RATE", relations_restx.RateLimit(1, 1)):
+
+            response = self.api.post("/transaction", json={"operations": [
+                {"resource": "simple", "action": "create", "simple": {"name": "first"}},
+                {"resource": "simple", "action": "create", "simple": {"name": "second"}}
+            ]})
+
+            self.assertStatusValue(response, 429, "message", "operation 1: too many requests, try again later")
+            self.assertIn("Retry-After", response.headers)
+            self.assertEqual(Simple.many(name="first").count(), 0)
+
+        # And waits its turn like it would on its own
+
+        with unittest.mock.patch.object(SimpleResource, "CONCURRENCY", {"post": 1}):
+
+            busy = relations_restx.Admission.ensure("SimpleResource.post", 1)
+            busy.acquire()
+
+            response = self.api.post("/transaction", json={"operations": [
+                {"resource": "simple", "action": "create", "simple": {"name": "busy"}}
+            ]})
+
+            busy.release()
+
+            self.assertStatusValue(response, 503, "message", "SimpleResource.post: too busy, try again later")
+            self.assertEqual(response.headers["Retry-After"], "1")
+            self.assertEqual(Simple.many(name="busy").count(), 0)
+
+        # All in one transaction, and changes only logged once it's gone through
+
+        entered = []
+
+        @contextlib.contextmanager
+        def transaction(model):
+            entered.append(model.SOURCE)
+            yield
+
+        with unittest.mock.patch("relations_restx.api.transaction", transaction), \
+             unittest.mock.patch("relations_restx.api.transactional", return_value=True), \
+             unittest.mock.patch.object(SimpleResource, "changed") as changed:
+
+            response = self.api.post("/transaction", json={"operations": [
+                {"resource": "simple", "action": "update", "id": 1, "simple": {"name": "yes"}},
+                {"resource": "plain", "action": "delete", "filter": {"simple_id": 1}},
+                {"resource": "simple", "action": "update", "id": 9, "simple": {"name": "no"}}
+            ]})
+
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(entered, ["RestXResource"])
+            changed.assert_not_called()
+
+        # Where it can't roll back, what's done is logged as it's done
+
+        with unittest.mock.patch.object(SimpleResource, "changed") as changed:
+
+            response = self.api.post("/transaction", json={"operations": [
+                {"resource": "simple", "action": "update", "id": 1, "simple": {"name": "yes"}},
+                {"resource": "simple", "action": "update", "id": 9, "simple": {"name": "no"}}
+            ]})
+
+            self.assertEqual(response.status_code, 404)
+            changed.assert_called_once_with("updated", [1])
+            self.assertEqual(Simple.one(id=1).name, "yes")
+
+
+class TestApi(TestRestX):
+
+    def test___init__(self):
+
+        rate = relations_restx.RateLimit(1)
+
+        self.assertIsNone(relations_restx.Api(flask.Flask("rate-api")).rate)
+        self.assertIs(relations_restx.Api(flask.Flask("rate-api"), rate=rate).rate, rate)
+
+        self.assertIs(relations_restx.Api(flask.Flask("dumps-api")).dumps, relations_restx.representations.dumps)
+
+        app = flask.Flask("dumps-api")
+        restx = relations_restx.Api(app, dumps=lambda data: b'{"custom": true}')
+        restx.add_resource(SimpleResource, *SimpleResource.thy().endpoints())
+
+        self.assertStatusValue(app.test_client().get("/simple"), 200, "custom", True)
+
+    def test_identity(self):
+
+        thy = self.restx.identity(SimpleResource)
+
+        self.assertEqual(thy.SINGULAR, "simple")
+        self.assertIs(self.restx.identity(SimpleResource), thy)
+        self.assertEqual(self.restx.identities[SimpleResource], thy)
+
+    def test_refresh(self):
+
+        relations_restx.attach(self.restx, types.SimpleNamespace(SimpleResource=SimpleResource), [])
+
+        specs = self.api.get("/swagger.json").json
+        self.assertNotIn("readOnly", specs["components"]["schemas"]["Simple"]["properties"]["name"])
+
+        with self.app.test_request_context():
+            self.restx.partial(tag="Simple")
+
+        identity = self.restx.identity(SimpleResource)
+        relations_restx.Criteria.INSTANCES = {}
+
+        with unittest.mock.patch.object(SimpleResource, "FIELDS", [{"name": "name", "readonly": True}]), \
+             unittest.mock.patch.object(SimpleResource, "LIST", ["name"]):
+
+            self.restx.refresh()
+
+            self.assertIsNot(self.restx.identity(SimpleResource), identity)
+            self.assertEqual(self.restx.identity(SimpleResource).LIST, ["name"])
+            self.assertEqual(self.restx.partials, {})
+            self.assertIn(Simple, relations_restx.Criteria.INSTANCES)
+
+            self.assertStatusValue(self.api.get("/model"), 200, "models", [{
+                "id": "id",
+                "titles": ["name"],
+                "title": "Simple",
+                "singular": "simple",
+                "plural": "simples",
+                "list": ["name"]
+            }])
+
+            self.assertTrue(self.api.get("/model/simple").json["model"]["fields"][1]["readonly"])
+
+            specs = self.api.get("/swagger.json").json
+            self.assertTrue(specs["components"]["schemas"]["Simple"]["properties"]["name"]["readOnly"])
+
+            # Works within a request too
+
+            with self.app.test_request_context():
+                self.restx.refresh()
+
+    def test_partial(self):
+
+        with self.app.test_request_context():
+
+            specs = self.restx.partial(tag="Simple")
+
+            self.assertEqual(list(specs["paths"]), ["/simple", "/simple/{id}"])
+            self.assertIs(self.restx.partial(tag="Simple"), specs)
+            self.assertEqual(list(self.restx.partials), [(None, "Simple")])
+
+            self.assertIn("/bro", self.restx.partial("default")["paths"])
+
+            self.assertRaisesRegex(werkzeug.exceptions.NotFound, "cannot find namespace nope", self.restx.partial, "nope")
+            self.assertRaisesRegex(werkzeug.exceptions.NotFound, "cannot find tag Nope", self.restx.partial, tag="Nope")
+
+    def test_singulars(self):
+
+        singulars = self.restx.singulars()
+
+        self.assertEqual(list(singulars), ["simple", "plain", "meta", "net", "sis", "bro"])
+        self.assertIs(singulars["simple"], SimpleResource)
+        self.assertIs(singulars["bro"], BroResource)
+
+    def test_add_transaction(self):
+
+        self.restx.add_transaction("/batch")
+
+        response = self.api.post("/batch", json={"operations": [
+            {"resource": "simple", "action": "create", "simple": {"name": "ya"}}
+        ]})
+
+        self.assertStatusValue(response, 200, "results", [{"simple": {"id": 1, "name": "ya"}}])
+
+    def test_tagged(self):
+
+        self.assertEqual(self.restx.tagged(), {"default", "Simple", "Plain", "Meta", "Net", "Sis", "Bro"})
+
+    @unittest.skipIf(relations_restx.representations.msgpack is None, "msgpack not installed")
+    def test_msgpack(self):
+
+        msgpack = relations_restx.representations.msgpack
+
+        response = self.api.post(
+            "/simple",
+            data=msgpack.packb({"simple": {"name": "ya"}}),
+            headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.headers["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.get_data())["simple"]["name"], "ya")
+
+        id = msgpack.unpackb(response.get_data())["simple"]["id"]
+
+        response = self.api.post(
+            "/plain",
+            data=msgpack.packb({"plain": {"simple_id": id, "name": "whatevs"}}),
+            headers={"Content-Type": "application/x-msgpack"}
+        )
+        self.assertStatusModel(response, 201, "plain", {"simple_id": id, "name": "whatevs"})
+
+        response = self.api.get("/plain", headers={"Accept": "application/msgpack"})
+        self.assertEqual(msgpack.unpackb(response.get_data(), strict_map_key=False), {
+            "plains": [{"simple_id": id, "name": "whatevs"}],
+            "overflow": False,
+            "formats": {
+                "simple_id": {
+                    "titles": {id: ["ya"]},
+                    "format": [None]
+                }
+            }
+        })
+
+        response = self.api.get("/simple/0", headers={"Accept": "application/msgpack"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(msgpack.unpackb(response.get_data()), {"message": "simple: none retrieved"})
+
+        self.assertStatusValue(self.api.get("/simple"), 200, "simples", [{"id": id, "name": "ya"}])
+
+    @unittest.skipIf(relations_restx.representations.cbor2 is None, "cbor2 not installed")
+    def test_cbor(self):
+
+        cbor2 = relations_restx.representations.cbor2
+
+        response = self.api.post(
+            "/simple",
+            data=cbor2.dumps({"simple": {"name": "ya"}}),
+            headers={"Content-Type": "application/cbor", "Accept": "application/cbor"}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.headers["Content-Type"], "application/cbor")
+        self.assertEqual(cbor2.loads(response.get_data())["simple"]["name"], "ya")
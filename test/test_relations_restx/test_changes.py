@@ -0,0 +1,162 @@
+import unittest
+
+import relations_restx
+
+
+class TestSubscription(unittest.TestCase):
+
+    def test___init__(self):
+
+        subscription = relations_restx.Subscription(2, 3)
+
+        self.assertEqual(subscription.size, 2)
+        self.assertEqual(subscription.watermark, 3)
+        self.assertEqual(subscription.queue.maxsize, 2)
+        self.assertFalse(subscription.overflowed)
+
+    def test_put(self):
+
+        subscription = relations_restx.Subscription(2)
+
+        subscription.put((1, "created", 1))
+        subscription.put((2, "created", 2))
+        self.assertFalse(subscription.overflowed)
+
+        subscription.put((3, "created", 3))
+        self.assertTrue(subscription.overflowed)
+
+        subscription.get(1)
+        subscription.put((4, "created", 4))
+
+        self.assertEqual(subscription.get(5), [(2, "created", 2)])
+
+    def test_get(self):
+
+        subscription = relations_restx.Subscription()
+
+        self.assertEqual(subscription.get(2, 0.01), [])
+        self.assertEqual(subscription.watermark, 0)
+
+        for change in [(1, "created", 1), (2, "updated", 1), (3, "deleted", 1)]:
+            subscription.put(change)
+
+        self.assertEqual(subscription.get(2), [(1, "created", 1), (2, "updated", 1)])
+        self.assertEqual(subscription.watermark, 2)
+
+        self.assertEqual(subscription.get(2), [(3, "deleted", 1)])
+        self.assertEqual(subscription.watermark, 3)
+
+    def test_drained(self):
+
+        subscription = relations_restx.Subscription()
+
+        self.assertTrue(subscription.drained())
+
+        subscription.put((1, "created", 1))
+        self.assertFalse(subscription.drained())
+
+        subscription.get(1)
+        self.assertTrue(subscription.drained())
+
+
+class TestChangeLog(unittest.TestCase):
+
+    def test___init__(self):
+
+        log = relations_restx.ChangeLog(5)
+
+        self.assertEqual(log.size, 5)
+        self.assertEqual(list(log.changes), [])
+        self.assertEqual(log.changes.maxlen, 5)
+        self.assertEqual(log.number, 0)
+        self.assertEqual(log.subscriptions, set())
+
+    def test_record(self):
+
+        log = relations_restx.ChangeLog()
+
+        self.assertEqual(log.record("created", [1, 2]), 2)
+        self.assertEqual(log.record("deleted", [1]), 3)
+        self.assertEqual(log.record("updated", []), 3)
+
+        self.assertEqual(list(log.changes), [
+            (1, "created", 1),
+            (2, "created", 2),
+            (3, "deleted", 1)
+        ])
+
+        subscription = log.subscribe()
+        log.record("updated", [2])
+
+        self.assertEqual(subscription.get(5), [(4, "updated", 2)])
+
+    def test_subscribe(self):
+
+        log = relations_restx.ChangeLog(3)
+        log.record("created", [1, 2])
+
+        subscription = log.subscribe(5)
+
+        self.assertIn(subscription, log.subscriptions)
+        self.assertEqual(subscription.size, 5)
+        self.assertEqual(subscription.watermark, 2)
+        self.assertTrue(subscription.drained())
+
+        subscription = log.subscribe(5, 1)
+
+        self.assertEqual(subscription.watermark, 1)
+        self.assertEqual(subscription.get(5), [(2, "created", 2)])
+
+        log.record("created", [3, 4])
+
+        subscription = log.subscribe(5, 0)
+
+        self.assertTrue(subscription.overflowed)
+        self.assertTrue(subscription.drained())
+
+    def test_unsubscribe(self):
+
+        log = relations_restx.ChangeLog()
+
+        subscription = log.subscribe()
+        log.unsubscribe(subscription)
+        log.unsubscribe(subscription)
+
+        log.record("created", [1])
+
+        self.assertEqual(log.subscriptions, set())
+        self.assertTrue(subscription.drained())
+
+    def test_expired(self):
+
+        log = relations_restx.ChangeLog(2)
+
+        self.assertFalse(log.expired(0))
+
+        log.record("created", [1, 2, 3])
+
+        self.assertTrue(log.expired(0))
+        self.assertFalse(log.expired(1))
+        self.assertFalse(log.expired(3))
+
+    def test_since(self):
+
+        log = relations_restx.ChangeLog()
+
+        self.assertEqual(log.since(0, 10), ({"created": [], "updated": [], "deleted": []}, 0, False))
+
+        log.record("created", [1, 2])
+        log.record("updated", [1, 3])
+        log.record("deleted", [2])
+        log.record("updated", [2])
+
+        self.assertEqual(log.since(0, 10), ({"created": [1], "updated": [3, 2], "deleted": []}, 6, False))
+        self.assertEqual(log.since(0, 3), ({"created": [1, 2], "updated": [], "deleted": []}, 3, True))
+        self.assertEqual(log.since(3, 2), ({"created": [], "updated": [3], "deleted": [2]}, 5, True))
+        self.assertEqual(log.since(5, 2), ({"created": [], "updated": [2], "deleted": []}, 6, False))
+        self.assertEqual(log.since(6, 2), ({"created": [], "updated": [], "deleted": []}, 6, False))
+
+        log = relations_restx.ChangeLog(3)
+        log.record("created", [1, 2, 3, 4, 5])
+
+        self.assertEqual(log.since(3, 10), ({"created": [4, 5], "updated": [], "deleted": []}, 5, False))
@@ -0,0 +1,132 @@
+import unittest
+
+import werkzeug.exceptions
+from test.test_relations_restx.test_resource import Simple, Plain, Meta, Net, Sis, Bro, TestRestX
+
+import relations_restx
+
+
+class TestCriteria(TestRestX):
+
+    maxDiff = None
+
+    def test___init__(self):
+
+        criteria = relations_restx.Criteria(Simple)
+
+        self.assertEqual(criteria.kinds, {"id": int, "name": str})
+        self.assertEqual(criteria.relations, {"plain": Plain})
+
+        self.assertEqual(relations_restx.Criteria(Net).kinds["ip__value"], int)
+
+        self.assertEqual(relations_restx.Criteria(Plain).relations, {"simple": Simple})
+        self.assertEqual(relations_restx.Criteria(Sis).relations, {"bro": Bro})
+        self.assertEqual(relations_restx.Criteria(Bro).relations, {"sis": Sis})
+
+    def test_ensure(self):
+
+        relations_restx.Criteria.INSTANCES = {}
+
+        criteria = relations_restx.Criteria.ensure(Simple)
+
+        self.assertIs(relations_restx.Criteria.ensure(Simple), criteria)
+        self.assertEqual(list(relations_restx.Criteria.INSTANCES), [Simple])
+
+    def test_parse(self):
+
+        criteria = relations_restx.Criteria(Meta)
+
+        self.assertEqual(criteria.parse("like"), (None, "like", None, None))
+        self.assertEqual(criteria.parse("id"), (int, "eq", None, None))
+        self.assertEqual(criteria.parse("id__gte"), (int, "gte", None, None))
+        self.assertEqual(criteria.parse("name__not_in"), (str, "in", None, None))
+        self.assertEqual(criteria.parse("things__a__b"), (None, "eq", None, None))
+        self.assertEqual(criteria.parse("things__a__b__like"), (None, "like", None, None))
+        self.assertEqual(criteria.parse("people__has"), (set, "has", None, None))
+
+        self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "unknown criterion nope", criteria.parse, "nope")
+        self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "unknown criterion name__lik, str has no lik", criteria.parse, "name__lik")
+
+        self.assertEqual(relations_restx.Criteria(Plain).parse("simple__name__like"), (None, None, Simple, "name__like"))
+        self.assertEqual(relations_restx.Criteria(Net).parse("ip__value__gt"), (int, "gt", None, None))
+        self.assertEqual(relations_restx.Criteria(Net).parse("ip__address"), (str, "eq", None, None))
+        self.assertEqual(relations_restx.Criteria(Net).parse("ip__nope"), (None, "eq", None, None))
+
+        criteria.parse("id__lt")
+        criteria.parse("id__lt")
+
+        self.assertEqual(criteria.parse.cache_info().hits, 1)
+
+    def test_coerce(self):
+
+        criteria = relations_restx.Criteria(Meta)
+
+        self.assertEqual(criteria.coerce("id", int, "1"), 1)
+        self.assertEqual(criteria.coerce("id__in", int, ["1", 2]), [1, 2])
+        self.assertEqual(criteria.coerce("spend", float, "1.5"), 1.5)
+        self.assertEqual(criteria.coerce("flag", bool, "Yes"), True)
+        self.assertEqual(criteria.coerce("flag", bool, "0"), False)
+        self.assertEqual(criteria.coerce("name", str, "1"), "1")
+        self.assertEqual(criteria.coerce("people", set, "a"), "a")
+        self.assertEqual(criteria.coerce("id", int, None), None)
+
+        self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "invalid int one for id", criteria.coerce, "id", int, "one")
+        self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "invalid bool maybe for flag", criteria.coerce, "flag", bool, "maybe")
+
+    def test_validate(self):
+
+        criteria = relations_restx.Criteria(Meta)
+
+        self.assertEqual(criteria.validate({
+            "like": "y",
+            "id__gt": "1",
+            "flag": "true",
+            "spend__like": "1.",
+            "name__in": ["a"],
+            "things__a": "1"
+        }), {
+            "like": "y",
+            "id__gt": 1,
+            "flag": True,
+            "spend__like": "1.",
+            "name__in": ["a"],
+            "things__a": "1"
+        })
+
+        criteria = relations_restx.Criteria(Plain)
+
+        self.assertEqual(criteria.validate({"simple__id__in": ["1", "2"]}), {"simple__id__in": [1, 2]})
+
+        self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "unknown criterion nope through simple", criteria.validate, {"simple__nope": 1})
+        self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "unknown criterion plain", criteria.validate, {"plain": 1})
+
+    def test_resource(self):
+
+        Simple("ya").create()
+
+        response = self.api.get("/simple?id=1")
+        self.assertStatusModel(response, 200, "simples", [{"id": 1, "name": "ya"}])
+
+        response = self.api.get("/simple?nmae=ya")
+        self.assertStatusValue(response, 400, "message", "unknown criterion nmae")
+
+        Net(ip="1.2.3.4", subnet="1.2.3.0/24").create()
+
+        response = self.api.get("/net?ip__value__gt=5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([net["id"] for net in response.json["nets"]], [1])
+
+        response = self.api.get("/net?ip__value__gt=16909060")
+        self.assertStatusValue(response, 200, "nets", [])
+
+        response = self.api.get("/net?ip__value__gt=big")
+        self.assertStatusValue(response, 400, "message", "invalid int big for ip__value__gt")
+
+        response = self.api.get("/simple?id__gt=one")
+        self.assertStatusValue(response, 400, "message", "invalid int one for id__gt")
+
+        response = self.api.patch("/simple", json={"filter": {"name__lik": "y"}, "simples": {"name": "sure"}})
+        self.assertStatusValue(response, 400, "message", "unknown criterion name__lik, str has no lik")
+
+        response = self.api.delete("/plain", json={"filter": {"simple__nope": "y"}})
+        self.assertStatusValue(response, 400, "message", "unknown criterion nope through simple")
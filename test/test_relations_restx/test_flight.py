@@ -0,0 +1,181 @@
+import unittest
+import unittest.mock
+
+import time
+import threading
+
+import flask
+
+import relations_restx
+
+
+class TestPassenger(unittest.TestCase):
+
+    def test___init__(self):
+
+        passenger = relations_restx.Passenger()
+
+        self.assertFalse(passenger.landed.is_set())
+        self.assertIsNone(passenger.result)
+        self.assertIsNone(passenger.error)
+
+
+class TestFlight(unittest.TestCase):
+
+    maxDiff = None
+
+    def test___init__(self):
+
+        flight = relations_restx.Flight(2)
+
+        self.assertEqual(flight.stale, 2)
+        self.assertEqual(flight.vary, ["Authorization", "Cookie", "X-Api-Key"])
+        self.assertEqual(flight.flights, {})
+        self.assertEqual(flight.landed, {})
+
+    def test_key(self):
+
+        app = flask.Flask("flight")
+        flight = relations_restx.Flight(vary=["X-Tenant", "Cookie"])
+
+        self.assertEqual(flight.vary, ["Authorization", "Cookie", "X-Api-Key", "X-Tenant"])
+
+        with app.test_request_context("/person?b=2&a=1", headers={"Accept": "text/csv"}):
+            one = flight.key(flask.request)
+
+        with app.test_request_context("/person?a=1&b=2", headers={"Accept": "text/csv"}):
+            self.assertEqual(flight.key(flask.request), one)
+
+        with app.test_request_context("/person?a=1&b=2"):
+            self.assertNotEqual(flight.key(flask.request), one)
+
+        with app.test_request_context("/person?a=1&b=2", headers={"Accept": "text/csv"}, json={"filter": {}}):
+            self.assertNotEqual(flight.key(flask.request), one)
+
+        self.assertEqual(one, ("GET", "/person", (("a", "1"), ("b", "2")), b"", "text/csv", ("", "", "", "")))
+
+        # Different clients don't share
+
+        with app.test_request_context("/person", headers={"Authorization": "Bearer a"}):
+            a = flight.key(flask.request)
+
+        with app.test_request_context("/person", headers={"Authorization": "Bearer b"}):
+            self.assertNotEqual(flight.key(flask.request), a)
+
+        with app.test_request_context("/person", headers={"X-Tenant": "a"}):
+            self.assertNotEqual(flight.key(flask.request), a)
+
+        with app.test_request_context("/person", headers={"X-Client": "a"}):
+            self.assertEqual(flight.key(flask.request, ["X-Client"])[-1], ("", "", "", "", "a"))
+
+    def test_shareable(self):
+
+        self.assertTrue(relations_restx.Flight.shareable(({"people": []}, 200)))
+        self.assertTrue(relations_restx.Flight.shareable({"people": []}))
+        self.assertFalse(relations_restx.Flight.shareable(({"message": "nope"}, 500)))
+        self.assertFalse(relations_restx.Flight.shareable(flask.Response("yep")))
+
+    def test_run(self):
+
+        flight = relations_restx.Flight()
+
+        self.assertEqual(flight.run("people", lambda: ({"people": [1]}, 200)), ({"people": [1]}, 200))
+        self.assertEqual(flight.flights, {})
+        self.assertEqual(flight.landed, {})
+
+        # Those in the air at the same time share
+
+        started = threading.Event()
+        release = threading.Event()
+        computed = []
+        results = []
+
+        def slow():
+            computed.append(True)
+            started.set()
+            release.wait()
+            return {"people": [2]}, 200
+
+        pilot = threading.Thread(target=lambda: results.append(flight.run("people", slow)))
+        pilot.start()
+        started.wait()
+
+        waiting = threading.Semaphore(0)
+        landed = flight.flights["people"].landed
+
+        def wait():
+            waiting.release()
+            return threading.Event.wait(landed)
+
+        landed.wait = wait
+
+        followers = [threading.Thread(target=lambda: results.append(flight.run("people", slow))) for _ in range(3)]
+
+        for follower in followers:
+            follower.start()
+
+        for _ in followers:
+            waiting.acquire()
+
+        release.set()
+
+        for thread in [pilot] + followers:
+            thread.join()
+
+        self.assertEqual(len(computed), 1)
+        self.assertEqual(results, [({"people": [2]}, 200)] * 4)
+
+        # Errors go to everyone waiting
+
+        def bad():
+            raise Exception("whoops")
+
+        self.assertRaisesRegex(Exception, "whoops", flight.run, "people", bad)
+
+        passenger = relations_restx.Passenger()
+        passenger.error = Exception("adaid")
+        passenger.landed.set()
+        flight.flights["people"] = passenger
+
+        self.assertRaisesRegex(Exception, "adaid", flight.run, "people", bad)
+
+        # Streams can't be shared, so followers do their own
+
+        passenger = relations_restx.Passenger()
+        passenger.result = flask.Response("theirs")
+        passenger.landed.set()
+        flight.flights["people"] = passenger
+
+        self.assertEqual(flight.run("people", lambda: "mine"), "mine")
+
+    def test_run_stale(self):
+
+        flight = relations_restx.Flight(stale=60)
+
+        self.assertEqual(flight.run("people", lambda: ({"people": [1]}, 200)), ({"people": [1]}, 200))
+        self.assertEqual(flight.landed["people"][0], ({"people": [1]}, 200))
+
+        # While someone's redoing it, hand out the last one
+
+        flight.flights["people"] = relations_restx.Passenger()
+        self.assertEqual(flight.run("people", lambda: ({"people": [2]}, 200)), ({"people": [1]}, 200))
+        del flight.flights["people"]
+
+        # Otherwise redo it
+
+        self.assertEqual(flight.run("people", lambda: ({"people": [2]}, 200)), ({"people": [2]}, 200))
+
+        # Errors aren't kept
+
+        flight.run("people", lambda: ({"message": "nope"}, 500))
+        self.assertEqual(flight.landed["people"][0], ({"people": [2]}, 200))
+
+        # Too old are dropped
+
+        flight.landed["people"] = (({"people": [1]}, 200), time.time() - 61)
+        flight.flights["people"] = relations_restx.Passenger()
+        flight.flights["people"].landed.set()
+        flight.flights["people"].result = ({"people": [3]}, 200)
+
+        self.assertEqual(flight.run("people", lambda: ({"people": [4]}, 200)), ({"people": [3]}, 200))
+        self.assertNotIn("people", flight.landed)
@@ -0,0 +1,280 @@
+import unittest
+import unittest.mock
+
+import os
+import tempfile
+import threading
+
+import relations_restx
+
+
+class TestAdmissionError(unittest.TestCase):
+
+    maxDiff = None
+
+    def test___init__(self):
+
+        admission = relations_restx.Admission("people.get", 1)
+        error = relations_restx.AdmissionError(admission, "adaid")
+
+        self.assertEqual(error.admission, admission)
+        self.assertEqual(error.message, "adaid")
+
+    def test___str__(self):
+
+        admission = relations_restx.Admission("people.get", 1)
+        error = relations_restx.AdmissionError(admission, "adaid")
+
+        self.assertEqual(str(error), "people.get: adaid")
+
+
+class TestAdmission(unittest.TestCase):
+
+    maxDiff = None
+
+    def setUp(self):
+
+        relations_restx.Admission.INSTANCES = {}
+
+    def test___init__(self):
+
+        admission = relations_restx.Admission("people.get", 2, 3, 4)
+
+        self.assertEqual(admission.name, "people.get")
+        self.assertEqual(admission.slots, 2)
+        self.assertEqual(admission.queue, 3)
+        self.assertEqual(admission.wait, 4)
+        self.assertEqual(admission.active, 0)
+        self.assertEqual(admission.waiting, 0)
+
+    def test_ensure(self):
+
+        admission = relations_restx.Admission.ensure("people.get", 2)
+        self.assertEqual(admission.slots, 2)
+        self.assertEqual(admission.queue, 0)
+        self.assertIsNone(admission.wait)
+
+        self.assertIs(relations_restx.Admission.ensure("people.get", 2), admission)
+
+        self.assertIs(relations_restx.Admission.ensure("people.get", 3, 1, 5), admission)
+        self.assertEqual(admission.slots, 3)
+        self.assertEqual(admission.queue, 1)
+        self.assertEqual(admission.wait, 5)
+
+    def test_report(self):
+
+        relations_restx.Admission.ensure("people.get", 2).acquire()
+        relations_restx.Admission.ensure("people.delete", 1)
+
+        self.assertEqual(relations_restx.Admission.report(), {
+            "people.get": {
+                "slots": 2,
+                "queue": 0,
+                "active": 1,
+                "waiting": 0,
+                "peak": 0,
+                "admitted": 1,
+                "shed": 0
+            },
+            "people.delete": {
+                "slots": 1,
+                "queue": 0,
+                "active": 0,
+                "waiting": 0,
+                "peak": 0,
+                "admitted": 0,
+                "shed": 0
+            }
+        })
+
+    def test_acquire(self):
+
+        admission = relations_restx.Admission("people.get", 1)
+
+        admission.acquire()
+        self.assertEqual(admission.active, 1)
+
+        self.assertRaisesRegex(relations_restx.AdmissionError, "people.get: too busy, try again later", admission.acquire)
+        self.assertEqual(admission.shed, 1)
+
+        admission.queue = 1
+        admission.wait = 0.01
+
+        self.assertRaisesRegex(relations_restx.AdmissionError, "people.get: timed out waiting, try again later", admission.acquire)
+        self.assertEqual(admission.shed, 2)
+        self.assertEqual(admission.peak, 1)
+        self.assertEqual(admission.waiting, 0)
+
+        admission.wait = None
+
+        waiter = threading.Thread(target=admission.acquire)
+        waiter.start()
+
+        while admission.waiting < 1:
+            pass
+
+        admission.release()
+        waiter.join()
+
+        self.assertEqual(admission.active, 1)
+        self.assertEqual(admission.admitted, 2)
+
+    def test_release(self):
+
+        admission = relations_restx.Admission("people.get", 1)
+
+        admission.acquire()
+        admission.release()
+
+        self.assertEqual(admission.active, 0)
+
+    def test_context(self):
+
+        admission = relations_restx.Admission("people.get", 1)
+
+        with admission:
+            self.assertEqual(admission.active, 1)
+
+        self.assertEqual(admission.active, 0)
+
+    def test_metrics(self):
+
+        admission = relations_restx.Admission("people.get", 1, 2)
+
+        self.assertEqual(admission.metrics(), {
+            "slots": 1,
+            "queue": 2,
+            "active": 0,
+            "waiting": 0,
+            "peak": 0,
+            "admitted": 0,
+            "shed": 0
+        })
+
+
+class TestRateStore(unittest.TestCase):
+
+    def test_refill(self):
+
+        self.assertEqual(relations_restx.RateStore.refill(1, 10, 2, 5, 11), 3)
+        self.assertEqual(relations_restx.RateStore.refill(1, 10, 2, 5, 20), 5)
+        self.assertEqual(relations_restx.RateStore.refill(1, 10, 2, 5, 9), 1)
+
+    def test_take(self):
+
+        store = relations_restx.RateStore()
+
+        self.assertEqual(store.take("me", 3, 1, 5, 10), (True, 2))
+        self.assertEqual(store.take("me", 3, 1, 5, 10), (False, 2))
+        self.assertEqual(store.take("me", 3, 1, 5, 11), (True, 0))
+        self.assertEqual(store.take("you", 1, 1, 5, 11), (True, 4))
+
+
+class TestRateFileStore(unittest.TestCase):
+
+    def test___init__(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            store = relations_restx.RateFileStore(os.path.join(directory, "rate.db"))
+
+            self.assertIsNone(store.connection)
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_connect(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            store = relations_restx.RateFileStore(os.path.join(directory, "rate.db"))
+
+            connection = store.connect()
+
+            self.assertEqual(store.pid, os.getpid())
+            self.assertIs(store.connect(), connection)
+
+            # A forked worker gets its own
+
+            with unittest.mock.patch("os.getpid", return_value=store.pid + 1):
+                self.assertIsNot(store.connect(), connection)
+
+            connection.close()
+            store.connection.close()
+
+    def test_take(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+
+            path = os.path.join(directory, "rate.db")
+
+            one = relations_restx.RateFileStore(path)
+            two = relations_restx.RateFileStore(path)
+
+            self.assertEqual(one.take("me", 3, 1, 5, 10), (True, 2))
+            self.assertEqual(two.take("me", 3, 1, 5, 10), (False, 2))
+            self.assertEqual(two.take("me", 3, 1, 5, 11), (True, 0))
+            self.assertEqual(one.take("you", 1, 1, 5, 11), (True, 4))
+
+            one.connection.close()
+            two.connection.close()
+
+
+class TestRateLimit(unittest.TestCase):
+
+    maxDiff = None
+
+    def test___init__(self):
+
+        rate = relations_restx.RateLimit(2)
+
+        self.assertEqual(rate.rate, 2)
+        self.assertEqual(rate.burst, 2)
+        self.assertEqual(rate.headers, [])
+        self.assertTrue(rate.address)
+        self.assertEqual(rate.costs["delete_many"], 10)
+        self.assertIsInstance(rate.store, relations_restx.RateStore)
+
+        store = relations_restx.RateStore()
+        rate = relations_restx.RateLimit(2, 10, ["X-Api-Key"], False, {"delete_many": 3}, store)
+
+        self.assertEqual(rate.burst, 10)
+        self.assertEqual(rate.headers, ["X-Api-Key"])
+        self.assertFalse(rate.address)
+        self.assertEqual(rate.costs["delete_many"], 3)
+        self.assertEqual(rate.costs["update_many"], 10)
+        self.assertIs(rate.store, store)
+
+    def test_key(self):
+
+        request = unittest.mock.MagicMock(headers={"X-Api-Key": "sure"}, remote_addr="1.2.3.4")
+
+        self.assertEqual(relations_restx.RateLimit(1, headers=["X-Api-Key"]).key(request), "X-Api-Key:sure")
+        self.assertEqual(relations_restx.RateLimit(1, headers=["X-Nope"]).key(request), "address:1.2.3.4")
+        self.assertEqual(relations_restx.RateLimit(1, address=False).key(request), "*")
+
+    def test_cost(self):
+
+        rate = relations_restx.RateLimit(1, 8)
+
+        self.assertEqual(rate.cost("retrieve_one"), 1)
+        self.assertEqual(rate.cost("retrieve_all"), 5)
+        self.assertEqual(rate.cost("delete_many"), 8)
+
+    @unittest.mock.patch("time.time")
+    def test_take(self, mock_time):
+
+        mock_time.return_value = 10
+
+        rate = relations_restx.RateLimit(1, 5)
+
+        self.assertEqual(rate.take("me", 3), (True, {
+            "RateLimit-Limit": "5",
+            "RateLimit-Remaining": "2",
+            "RateLimit-Reset": "3"
+        }))
+
+        self.assertEqual(rate.take("me", 4), (False, {
+            "RateLimit-Limit": "5",
+            "RateLimit-Remaining": "2",
+            "RateLimit-Reset": "3",
+            "Retry-After": "2"
+        }))
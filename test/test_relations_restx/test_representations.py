@@ -0,0 +1,225 @@
+import unittest
+import unittest.mock
+
+import io
+import json
+import datetime
+import ipaddress
+
+import flask
+
+import relations_restx
+from relations_restx import representations
+
+
+class TestRepresentations(unittest.TestCase):
+
+    maxDiff = None
+
+    def setUp(self):
+
+        self.app = flask.Flask("representations")
+
+    def test_default(self):
+
+        self.assertEqual(representations.default({3, 1, 2}), [1, 2, 3])
+        self.assertEqual(sorted(representations.default({1, "a"}), key=str), [1, "a"])
+        self.assertEqual(representations.default(datetime.datetime(2020, 1, 2, 3, 4, 5)), "2020-01-02T03:04:05")
+        self.assertEqual(representations.default(datetime.date(2020, 1, 2)), "2020-01-02")
+        self.assertEqual(representations.default(ipaddress.IPv4Address("1.2.3.4")), "1.2.3.4")
+        self.assertEqual(representations.default(ipaddress.IPv4Network("1.2.3.0/24")), "1.2.3.0/24")
+        self.assertRaisesRegex(TypeError, "Object of type object is not JSON serializable", representations.default, object())
+
+    def test_dumps_json(self):
+
+        self.assertEqual(
+            json.loads(representations.dumps_json({"ip": ipaddress.IPv4Address("1.2.3.4"), "people": {"tom"}, 1: True})),
+            {"ip": "1.2.3.4", "people": ["tom"], "1": True}
+        )
+
+    @unittest.skipIf(representations.orjson is None, "orjson not installed")
+    def test_dumps_orjson(self):
+
+        self.assertEqual(
+            json.loads(representations.dumps_orjson({"ip": ipaddress.IPv4Address("1.2.3.4"), "people": {"tom"}, 1: True})),
+            {"ip": "1.2.3.4", "people": ["tom"], "1": True}
+        )
+
+        self.assertEqual(json.loads(representations.dumps_orjson({"big": 2**70})), {"big": 2**70})
+
+    def test_output_json(self):
+
+        with self.app.app_context():
+
+            response = representations.output_json({"people": {"tom"}}, 201, {"X-Yep": "sure"})
+
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.headers["X-Yep"], "sure")
+            self.assertEqual(json.loads(response.get_data()), {"people": ["tom"]})
+            self.assertTrue(response.get_data().endswith(b"\n"))
+
+            response = representations.output_json({"a": 1}, 200, dumps=lambda data: b"custom")
+            self.assertEqual(response.get_data(), b"custom\n")
+
+            self.app.config["RESTX_JSON"] = {"indent": 2}
+
+            response = representations.output_json({"a": 1}, 200, dumps=lambda data: b"custom")
+            self.assertEqual(response.get_data(), b'{\n  "a": 1\n}\n')
+
+    @unittest.skipIf(representations.msgpack is None, "msgpack not installed")
+    def test_dumps_msgpack(self):
+
+        self.assertEqual(
+            representations.msgpack.unpackb(representations.dumps_msgpack({"ip": ipaddress.IPv4Address("1.2.3.4"), "people": {"tom"}})),
+            {"ip": "1.2.3.4", "people": ["tom"]}
+        )
+
+    @unittest.skipIf(representations.msgpack is None, "msgpack not installed")
+    def test_loads_msgpack(self):
+
+        self.assertEqual(representations.loads_msgpack(representations.msgpack.packb({1: ["ya"]})), {1: ["ya"]})
+
+    @unittest.skipIf(representations.cbor2 is None, "cbor2 not installed")
+    def test_dumps_cbor(self):
+
+        self.assertEqual(
+            representations.cbor2.loads(representations.dumps_cbor({"ip": ipaddress.IPv4Address("1.2.3.4"), "people": ["tom"]})),
+            {"ip": ipaddress.IPv4Address("1.2.3.4"), "people": ["tom"]}
+        )
+
+        self.assertEqual(
+            representations.cbor2.loads(representations.dumps_cbor({"when": datetime.datetime(2020, 1, 2)})),
+            {"when": datetime.datetime(2020, 1, 2, tzinfo=datetime.timezone.utc)}
+        )
+
+    @unittest.skipIf(representations.cbor2 is None, "cbor2 not installed")
+    def test_loads_cbor(self):
+
+        self.assertEqual(representations.loads_cbor(representations.cbor2.dumps({"a": [1]})), {"a": [1]})
+
+    def test_stringify(self):
+
+        self.assertIsNone(representations.stringify(None))
+        self.assertEqual(representations.stringify("ya"), "ya")
+        self.assertEqual(representations.stringify({"a": 1}), '{"a": 1}')
+        self.assertEqual(representations.stringify({"b", "a"}), '["a", "b"]')
+        self.assertEqual(representations.stringify(datetime.date(2020, 1, 2)), "2020-01-02")
+        self.assertEqual(representations.stringify(ipaddress.IPv4Address("1.2.3.4")), "1.2.3.4")
+        self.assertEqual(representations.stringify(3), "3")
+
+    def test_event(self):
+
+        lines = representations.event({"id": 1}).split(b"\n")
+
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0][len(b"data: "):]), {"id": 1})
+        self.assertEqual(lines[1:], [b"", b""])
+
+        lines = representations.event({"id": 1}, "created", 3).split(b"\n")
+
+        self.assertEqual(lines[:2], [b"id: 3", b"event: created"])
+        self.assertEqual(json.loads(lines[2][len(b"data: "):]), {"id": 1})
+
+    def test_output_binary(self):
+
+        with self.app.app_context():
+
+            response = representations.output_binary({"a": 1}, 201, {"X-Yep": "sure"}, dumps=lambda data: b"binary")
+
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.headers["X-Yep"], "sure")
+            self.assertEqual(response.get_data(), b"binary")
+
+    def test_stream_csv(self):
+
+        chunks = list(representations.stream_csv(
+            [("id", "int"), ("name", "str"), ("stuff", "list")],
+            [[{"id": 1, "name": "ya, sure", "stuff": [1]}], [{"id": 2, "name": None, "stuff": None}]]
+        ))
+
+        self.assertEqual(chunks, [
+            b"id,name,stuff\r\n",
+            b'1,"ya, sure",[1]\r\n',
+            b"2,,\r\n"
+        ])
+
+
+class TestSink(unittest.TestCase):
+
+    def test_sink(self):
+
+        sink = representations.Sink()
+
+        self.assertTrue(sink.writable())
+        self.assertEqual(sink.write(b"ab"), 2)
+        self.assertEqual(sink.write(memoryview(b"cd")), 2)
+        self.assertEqual(sink.tell(), 4)
+        self.assertEqual(sink.drain(), b"abcd")
+        self.assertEqual(sink.drain(), b"")
+
+        sink.write(b"e")
+        self.assertEqual(sink.tell(), 5)
+        self.assertEqual(sink.drain(), b"e")
+
+
+@unittest.skipIf(representations.pyarrow is None, "pyarrow not installed")
+class TestArrow(unittest.TestCase):
+
+    maxDiff = None
+
+    FIELDS = [("id", "int"), ("name", "str"), ("flag", "bool"), ("spend", "float"), ("stuff", "list"), ("ip", "IPv4Address")]
+
+    RECORDS = [
+        {"id": 1, "name": "ya", "flag": True, "spend": 1.5, "stuff": [1, "a"], "ip": ipaddress.IPv4Address("1.2.3.4")},
+        {"id": 2, "name": None, "flag": None, "spend": None, "stuff": None, "ip": None}
+    ]
+
+    EXPECTED = {
+        "id": [1, 2],
+        "name": ["ya", None],
+        "flag": [True, None],
+        "spend": [1.5, None],
+        "stuff": ['[1, "a"]', None],
+        "ip": ["1.2.3.4", None]
+    }
+
+    def test_arrow_schema(self):
+
+        schema = representations.arrow_schema(self.FIELDS)
+
+        self.assertEqual(schema.names, ["id", "name", "flag", "spend", "stuff", "ip"])
+        self.assertEqual([str(field.type) for field in schema], ["int64", "string", "bool", "double", "string", "string"])
+
+    def test_arrow_batch(self):
+
+        schema = representations.arrow_schema(self.FIELDS)
+        batch = representations.arrow_batch(self.FIELDS, schema, self.RECORDS)
+
+        self.assertEqual(batch.num_rows, 2)
+        self.assertEqual(batch.to_pydict(), self.EXPECTED)
+
+    def test_stream_arrow(self):
+
+        chunks = list(representations.stream_arrow(self.FIELDS, [self.RECORDS[:1], self.RECORDS[1:]]))
+
+        self.assertEqual(len(chunks), 3)
+
+        table = representations.pyarrow.ipc.open_stream(b"".join(chunks)).read_all()
+
+        self.assertEqual(table.to_pydict(), self.EXPECTED)
+
+        table = representations.pyarrow.ipc.open_stream(b"".join(representations.stream_arrow(self.FIELDS, []))).read_all()
+
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(table.schema.names, ["id", "name", "flag", "spend", "stuff", "ip"])
+
+    def test_stream_parquet(self):
+
+        chunks = list(representations.stream_parquet(self.FIELDS, [self.RECORDS[:1], self.RECORDS[1:]]))
+
+        self.assertEqual(len(chunks), 3)
+
+        parquet = representations.pyarrow.parquet.ParquetFile(io.BytesIO(b"".join(chunks)))
+
+        self.assertEqual(parquet.num_row_groups, 2)
+        self.assertEqual(parquet.read().to_pydict(), self.EXPECTED)
@@ -1,3 +1,9 @@
+import io
+import os
+import json
+import contextlib
+import shutil
+import tempfile
 import unittest
 import unittest.mock
 import relations.unittest
@@ -141,6 +147,14 @@ class TestExceptions(TestRestX):
 
         self.assertStatusValue(self.api.get("/bad"), 400, "message", "nope")
 
+        @relations_restx.exceptions
+        def picky():
+            raise werkzeug.exceptions.NotAcceptable("nah")
+
+        self.app.add_url_rule('/picky', 'picky', picky)
+
+        self.assertStatusValue(self.api.get("/picky"), 406, "message", "nah")
+
         @relations_restx.exceptions
         def ugly():
             raise Exception("whoops")
@@ -178,6 +192,43 @@ class Whoops(relations.Model):
 class WhoopsResource(relations_restx.Resource):
     MODEL = Whoops
 
+class TestTransaction(TestRestX):
+
+    def test_transactional(self):
+
+        self.assertFalse(relations_restx.transactional(Simple))
+
+        class Source:
+
+            def transaction(self):
+                pass
+
+        with unittest.mock.patch("relations.source", return_value=Source()):
+            self.assertTrue(relations_restx.transactional(Simple))
+
+    def test_transaction(self):
+
+        with relations_restx.transaction(Simple):
+            Simple("ya").create()
+
+        self.assertEqual(Simple.many().name, ["ya"])
+
+        events = []
+
+        class Source:
+
+            @contextlib.contextmanager
+            def transaction(self):
+                events.append("begin")
+                yield
+                events.append("commit")
+
+        with unittest.mock.patch("relations.source", return_value=Source()):
+            with relations_restx.transaction(Simple):
+                events.append("run")
+
+        self.assertEqual(events, ["begin", "run", "commit"])
+
 class TestResourceError(unittest.TestCase):
 
     maxDiff = None
@@ -346,169 +397,1375 @@ class TestResourceIdentity(TestRestX):
             }
         ])
 
-        InitResource.SINGULAR = "initee"
-        resource = InitResource.thy()
-        self.assertEqual(resource.SINGULAR, "initee")
-        self.assertEqual(resource.PLURAL, "inities")
+        InitResource.SINGULAR = "initee"
+        resource = InitResource.thy()
+        self.assertEqual(resource.SINGULAR, "initee")
+        self.assertEqual(resource.PLURAL, "inities")
+
+        InitResource.PLURAL = "initiease"
+        resource = InitResource.thy()
+        self.assertEqual(resource.SINGULAR, "initee")
+        self.assertEqual(resource.PLURAL, "initiease")
+
+        InitResource.LIST = ["name"]
+        resource = InitResource.thy()
+        self.assertEqual(resource.SINGULAR, "initee")
+        self.assertEqual(resource.PLURAL, "initiease")
+        self.assertEqual(resource.LIST, ['name'])
+
+        InitResource.LIST = ["nope"]
+        self.assertRaisesRegex(relations_restx.ResourceError, "cannot find field nope from list", InitResource.thy)
+
+        InitResource.LIST = ["name"]
+        InitResource.CHANGES = "nope"
+        self.assertRaisesRegex(relations_restx.ResourceError, "cannot find field nope from changes", InitResource.thy)
+
+        class IdlessResource(relations_restx.Resource):
+            MODEL = Plain
+            CHANGES = relations_restx.ChangeLog()
+
+        self.assertRaisesRegex(relations_restx.ResourceError, "cannot log changes without an id", IdlessResource.thy)
+
+        class UpsertResource(relations_restx.Resource):
+            MODEL = Simple
+            UPSERT = ["nope"]
+
+        self.assertRaisesRegex(relations_restx.ResourceError, "cannot find field nope from upsert", UpsertResource.thy)
+
+        class BatchResource(relations_restx.Resource):
+            MODEL = Plain
+            BATCH = 2
+
+        self.assertRaisesRegex(relations_restx.ResourceError, "cannot batch without an id", BatchResource.thy)
+
+    def test_endpoints(self):
+
+        self.assertEqual(SimpleResource.thy().endpoints(), ["/simple", "/simple/<id>"])
+        self.assertEqual(PlainResource.thy().endpoints(), ["/plain"])
+
+    def test_listing(self):
+
+        self.assertEqual(SimpleResource.thy().listing(), {
+            "id": "id",
+            "titles": ["name"],
+            "title": "Simple",
+            "singular": "simple",
+            "plural": "simples",
+            "list": ["id", "name"]
+        })
+
+class TestResource(TestRestX):
+
+    def test___init__(self):
+
+        class Init(ResourceModel):
+            id = int
+            name = str
+            status = str,"good"
+            meta = dict
+
+        class InitResource(relations_restx.Resource):
+            MODEL = Init
+
+        resource = InitResource()
+        self.assertEqual(resource.SINGULAR, "init")
+        self.assertEqual(resource.PLURAL, "inits")
+        self.assertEqual(resource.FIELDS, [])
+        self.assertEqual(resource._fields, [
+            {
+                "name": "id",
+                "kind": "int",
+                "readonly": True,
+            },
+            {
+                "name": "name",
+                "kind": "str",
+                "required": True
+            },
+            {
+                "name": "status",
+                "kind": "str",
+                "default": "good"
+            },
+            {
+                "name": "meta",
+                "kind": "dict",
+                "default": {}
+            }
+        ])
+
+    def test_admission(self):
+
+        relations_restx.Admission.INSTANCES = {}
+
+        class Busy(relations_restx.Resource):
+            MODEL = Simple
+
+        self.assertIsNone(Busy.admission("get"))
+
+        Busy.CONCURRENCY = {"delete": 1}
+
+        self.assertIsNone(Busy.admission("get"))
+
+        admission = Busy.admission("delete")
+        self.assertEqual(admission.name, "Busy.delete")
+        self.assertEqual(admission.slots, 1)
+        self.assertEqual(admission.queue, 0)
+        self.assertIsNone(admission.wait)
+
+        Busy.CONCURRENCY = 2
+        Busy.QUEUE = 3
+        Busy.WAIT = 4
+
+        admission = Busy.admission("get")
+        self.assertEqual(admission.name, "Busy.get")
+        self.assertEqual(admission.slots, 2)
+        self.assertEqual(admission.queue, 3)
+        self.assertEqual(admission.wait, 4)
+
+    def test_limiter(self):
+
+        rate = relations_restx.RateLimit(1)
+
+        class Limited(relations_restx.Resource):
+            MODEL = Simple
+
+        self.assertIsNone(Limited().limiter())
+        self.assertIs(Limited(unittest.mock.MagicMock(rate=rate)).limiter(), rate)
+
+        Limited.RATE = relations_restx.RateLimit(2)
+        self.assertIs(Limited(unittest.mock.MagicMock(rate=rate)).limiter(), Limited.RATE)
+
+    def test_operation(self):
+
+        @relations_restx.exceptions
+        def operation(method, id=None):
+            return {"operation": SimpleResource().operation(method, id)}
+
+        self.app.add_url_rule('/operation/<method>', 'operation', operation)
+        self.app.add_url_rule('/operation/<method>/<id>', 'operation_id', operation)
+
+        def check(method, id=None, query="", json=None):
+            url = f"/operation/{method}" + (f"/{id}" if id is not None else "") + query
+            return self.api.get(url, json=json).json["operation"]
+
+        self.assertEqual(check("options"), "create_options")
+        self.assertEqual(check("options", 1), "update_options")
+        self.assertEqual(check("post", json={"filter": {}}), "retrieve_all")
+        self.assertEqual(check("post", json={"filter": {"name": "ya"}}), "retrieve_many")
+        self.assertEqual(check("post", json={"simple": {}}), "create_one")
+        self.assertEqual(check("post", json={"simples": []}), "create_many")
+        self.assertEqual(check("get", 1), "retrieve_one")
+        self.assertEqual(check("get"), "retrieve_all")
+        self.assertEqual(check("get", query="?name=ya"), "retrieve_many")
+        self.assertEqual(check("patch", 1), "update_one")
+        self.assertEqual(check("patch", json={"filter": {}, "simple": {}}), "update_one")
+        self.assertEqual(check("patch", json={"filter": {}, "simples": {}}), "update_many")
+        self.assertEqual(check("delete", 1), "delete_one")
+        self.assertEqual(check("put"), "upsert_many")
+        self.assertEqual(check("delete", json={"filter": {}}), "delete_many")
+
+    def test_headers(self):
+
+        self.assertEqual(relations_restx.Resource.headers(({"a": 1}, 201), {}), ({"a": 1}, 201))
+        self.assertEqual(relations_restx.Resource.headers(({"a": 1}, 201), {"b": "2"}), ({"a": 1}, 201, {"b": "2"}))
+        self.assertEqual(relations_restx.Resource.headers({"a": 1}, {"b": "2"}), ({"a": 1}, 200, {"b": "2"}))
+        self.assertEqual(
+            relations_restx.Resource.headers(({"a": 1}, 201, {"c": "3"}), {"b": "2"}),
+            ({"a": 1}, 201, {"b": "2", "c": "3"})
+        )
+
+        response = flask.Response("yep")
+        self.assertIs(relations_restx.Resource.headers(response, {"b": "2"}), response)
+        self.assertEqual(response.headers["b"], "2")
+
+    def test_admit(self):
+
+        relations_restx.Admission.INSTANCES = {}
+
+        class Busy(relations_restx.Resource):
+            MODEL = Simple
+            CONCURRENCY = {"get": 1}
+            WAIT = 3
+
+        with self.app.test_request_context("/busy"):
+
+            self.assertEqual(Busy().admit("get"), ({"simples": [], "overflow": False, "formats": {}}, 200))
+            self.assertEqual(Busy.admission("get").metrics()["active"], 0)
+
+            Busy.admission("get").acquire()
+
+            self.assertEqual(Busy().admit("get"), ({"message": "Busy.get: too busy, try again later"}, 503, {"Retry-After": "3"}))
+
+            Busy.WAIT = 0.01
+
+            self.assertEqual(Busy().admit("get"), ({"message": "Busy.get: too busy, try again later"}, 503, {"Retry-After": "1"}))
+
+    def test_dispatch_request(self):
+
+        relations_restx.Admission.INSTANCES = {}
+
+        class Busy(relations_restx.Resource):
+            MODEL = Simple
+            CONCURRENCY = {"get": 1}
+
+        self.restx.add_resource(Busy, "/busy")
+
+        response = self.api.get("/busy")
+        self.assertStatusValue(response, 200, "simples", [])
+        self.assertEqual(Busy.admission("get").metrics()["admitted"], 1)
+        self.assertEqual(Busy.admission("get").metrics()["active"], 0)
+
+        Busy.admission("get").acquire()
+
+        response = self.api.get("/busy")
+        self.assertStatusValue(response, 503, "message", "Busy.get: too busy, try again later")
+        self.assertEqual(response.headers["Retry-After"], "1")
+
+        response = self.api.head("/busy")
+        self.assertEqual(response.status_code, 503)
+
+        response = self.api.post("/busy", json={"simple": {"name": "ya"}})
+        self.assertStatusModel(response, 201, "simple", {"name": "ya"})
+
+        self.assertEqual(Busy.admission("get").metrics()["shed"], 2)
+
+        Busy.admission("get").release()
+
+        # Streams keep their slot till they're done being sent
+
+        response = self.api.get("/busy?export=csv", buffered=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Busy.admission("get").metrics()["active"], 1)
+
+        self.assertEqual(self.api.get("/busy").status_code, 503)
+
+        self.assertEqual(response.get_data(), b"id,name\r\n1,ya\r\n")
+        response.close()
+
+        self.assertEqual(Busy.admission("get").metrics()["active"], 0)
+        self.assertEqual(self.api.get("/busy").status_code, 200)
+
+        class Limited(relations_restx.Resource):
+            MODEL = Simple
+            RATE = relations_restx.RateLimit(1, 5)
+
+        self.restx.add_resource(Limited, "/limited")
+
+        response = self.api.get("/limited?name=no")
+        self.assertStatusValue(response, 200, "simples", [])
+        self.assertEqual(response.headers["RateLimit-Limit"], "5")
+        self.assertEqual(response.headers["RateLimit-Remaining"], "4")
+
+        response = self.api.get("/limited")
+        self.assertStatusValue(response, 429, "message", "too many requests, try again later")
+        self.assertIn("Retry-After", response.headers)
+
+        class Shared(relations_restx.Resource):
+            MODEL = Simple
+            FLIGHT = relations_restx.Flight()
+
+        self.restx.add_resource(Shared, "/shared")
+
+        with unittest.mock.patch.object(Shared.FLIGHT, "run", wraps=Shared.FLIGHT.run) as mock_run:
+
+            response = self.api.get("/shared?name=ya")
+            self.assertStatusModel(response, 200, "simples", [{"name": "ya"}])
+            self.assertEqual(mock_run.call_args.args[0][1], "/shared")
+
+            response = self.api.post("/shared", json={"simple": {"name": "sure"}})
+            self.assertStatusModel(response, 201, "simple", {"name": "sure"})
+
+            self.assertEqual(mock_run.call_count, 1)
+
+    def test_json(self):
+
+        @relations_restx.exceptions
+        def json():
+            return {"json": relations_restx.Resource.json()}
+
+        self.app.add_url_rule('/json', 'json', json)
+
+        response = self.api.get("/json")
+        self.assertStatusValue(response, 200, "json", {})
+
+        response = self.api.get("/json", headers={"Content-Type": "application/json"})
+        self.assertStatusValue(response, 200, "json", {})
+
+        response = self.api.get("/json", json={"a": 1})
+        self.assertStatusValue(response, 200, "json", {"a": 1})
+
+        if relations_restx.representations.msgpack is not None:
+
+            data = relations_restx.representations.dumps_msgpack({"a": 2})
+
+            response = self.api.get("/json", data=data, headers={"Content-Type": "application/msgpack"})
+            self.assertStatusValue(response, 200, "json", {"a": 2})
+
+            response = self.api.get("/json", data=b"nope", headers={"Content-Type": "application/msgpack"})
+            self.assertStatusValue(response, 200, "json", {})
+
+    def test_criteria(self):
+
+        verify = True
+
+        @relations_restx.exceptions
+        def criteria(method=None):
+            return {"criteria": relations_restx.Resource.criteria(verify)}
+
+        self.app.add_url_rule('/criteria', 'criteria', criteria)
+
+        response = self.api.get("/criteria")
+        self.assertStatusValue(response, 400, "message", "to confirm all, send a blank filter {}")
+
+        verify = False
+        response = self.api.get("/criteria")
+        self.assertStatusValue(response, 200, "criteria", {})
+
+        response = self.api.get("/criteria?a=1&sort=a&limit=2")
+        self.assertStatusValue(response, 200, "criteria", {"a": "1"})
+
+        verify = True
+        response = self.api.get("/criteria?sort=a&dry_run=true")
+        self.assertStatusValue(response, 400, "message", "to confirm all, send a blank filter {}")
+        verify = False
+
+        response = self.api.get("/criteria?a=1", json={"filter": {"a": 2}})
+        self.assertStatusValue(response, 200, "criteria", {"a": 2})
+
+    def test_sort(self):
+
+        @relations_restx.exceptions
+        def sort():
+            return {"sort": relations_restx.Resource.sort()}
+
+        self.app.add_url_rule('/sort', 'sort', sort)
+
+        response = self.api.get("/sort")
+        self.assertStatusValue(response, 200, "sort", [])
+
+        response = self.api.get("/sort?sort=a,-b")
+        self.assertStatusValue(response, 200, "sort", ["a", "-b"])
+
+        response = self.api.get("/sort?sort=-a", json={"sort": ["b", "+c"]})
+        self.assertStatusValue(response, 200, "sort", ["-a", "b", "+c"])
+
+    def test_limit(self):
+
+        @relations_restx.exceptions
+        def limit():
+            return {"limit": relations_restx.Resource.limit()}
+
+        self.app.add_url_rule('/limit', 'limit', limit)
+
+        response = self.api.get("/limit")
+        self.assertStatusValue(response, 200, "limit", {})
+
+        response = self.api.get("/limit?limit__per_page=1&limit__page=2")
+        self.assertStatusValue(response, 200, "limit", {"per_page": 1, "page": 2})
+
+        response = self.api.get("/limit?limit=1", json={"limit": {"per_page": "2", "page": 3}})
+        self.assertStatusValue(response, 200, "limit", {"limit": 1, "per_page": 2, "page": 3})
+
+    def test_count(self):
+
+        @relations_restx.exceptions
+        def count():
+            return {"count": relations_restx.Resource.count()}
+
+        self.app.add_url_rule('/count', 'count', count)
+
+        response = self.api.get("/count")
+        self.assertStatusValue(response, 200, "count", False)
+
+        response = self.api.get("/count?count=yes")
+        self.assertStatusValue(response, 200, "count", True)
+
+        response = self.api.get("/count", json={"count": False})
+        self.assertStatusValue(response, 200, "count", False)
+
+        response = self.api.get("/count", json={"count": "FALSE"})
+        self.assertStatusValue(response, 200, "count", False)
+
+        response = self.api.get("/count", json={"count": "0"})
+        self.assertStatusValue(response, 200, "count", False)
+
+        response = self.api.get("/count", json={"count": "no"})
+        self.assertStatusValue(response, 200, "count", False)
+
+    def test_compact(self):
+
+        @relations_restx.exceptions
+        def compact():
+            return {"compact": relations_restx.Resource.compact()}
+
+        self.app.add_url_rule('/compact', 'compact', compact)
+
+        response = self.api.get("/compact")
+        self.assertStatusValue(response, 200, "compact", None)
+
+        response = self.api.get("/compact?compact=yes")
+        self.assertStatusValue(response, 200, "compact", "rows")
+
+        response = self.api.get("/compact?compact=columns")
+        self.assertStatusValue(response, 200, "compact", "columns")
+
+        response = self.api.get("/compact?compact=rows", json={"compact": False})
+        self.assertStatusValue(response, 200, "compact", None)
+
+        response = self.api.get("/compact", json={"compact": "false"})
+        self.assertStatusValue(response, 200, "compact", None)
+
+        response = self.api.get("/compact", json={"compact": True})
+        self.assertStatusValue(response, 200, "compact", "rows")
+
+        response = self.api.get("/compact?compact=diagonal")
+        self.assertStatusValue(response, 400, "message", "compact must be rows or columns, not diagonal")
+
+    def test_since(self):
+
+        @relations_restx.exceptions
+        def since():
+            return {"since": relations_restx.Resource.since()}
+
+        self.app.add_url_rule('/since', 'since', since)
+
+        response = self.api.get("/since")
+        self.assertStatusValue(response, 200, "since", None)
+
+        response = self.api.get("/since?since=3")
+        self.assertStatusValue(response, 200, "since", "3")
+
+        response = self.api.get("/since?since=3", json={"since": 4})
+        self.assertStatusValue(response, 200, "since", 4)
+
+    def test_synced(self):
+
+        class Logged(relations_restx.Resource):
+            MODEL = Simple
+            CHANGES = relations_restx.ChangeLog(7)
+
+        self.restx.add_resource(Logged, "/logged", "/logged/<id>")
+
+        response = self.api.get("/logged?since=0")
+        self.assertStatusValue(response, 200, "created", [])
+        self.assertStatusValue(response, 200, "watermark", 0)
+
+        self.api.post("/logged", json={"simples": [{"name": "ya"}, {"name": "sure"}, {"name": "fine"}]})
+        self.api.patch("/logged/1", json={"simple": {"name": "yep"}})
+        self.api.patch("/logged", json={"filter": {"name": "sure"}, "simples": {"name": "surely"}})
+        self.api.delete("/logged", json={"filter": {"name": "fine"}})
+
+        response = self.api.get("/logged?since=0&limit=4")
+        self.assertStatusValue(response, 200, "created", [1, 2, 3])
+        self.assertStatusValue(response, 200, "updated", [])
+        self.assertStatusValue(response, 200, "deleted", [])
+        self.assertStatusValue(response, 200, "watermark", 4)
+        self.assertStatusValue(response, 200, "overflow", True)
+
+        response = self.api.get("/logged?since=4")
+        self.assertStatusValue(response, 200, "updated", [2])
+        self.assertStatusValue(response, 200, "deleted", [3])
+        self.assertStatusValue(response, 200, "watermark", 6)
+        self.assertStatusValue(response, 200, "overflow", False)
+
+        self.api.post("/logged", json={"simple": {"name": "again"}})
+        self.api.delete("/logged/4")
+        self.api.delete("/logged/4")
+
+        response = self.api.get("/logged", json={"since": 6})
+        self.assertStatusValue(response, 200, "deleted", [4])
+        self.assertStatusValue(response, 200, "watermark", 8)
+
+        response = self.api.get("/logged?since=0")
+        self.assertStatusValue(response, 410, "message", "changes since 0 are gone, retrieve all again")
+
+        response = self.api.get("/logged?since=nope")
+        self.assertStatusValue(response, 400, "message", "since must be an int, not nope")
+
+        response = self.api.get("/simple?since=0")
+        self.assertStatusValue(response, 400, "message", "simple changes aren't tracked")
+
+        class Versioned(ResourceModel):
+            id = int
+            name = str
+            version = int
+
+        class VersionedResource(relations_restx.Resource):
+            MODEL = Versioned
+            CHANGES = "version"
+
+        self.restx.add_resource(VersionedResource, "/versioned")
+
+        Versioned.bulk().add("a", 1).add("b", 2).add("c", 2).add("d", 2).add("e", 3).create()
+
+        response = self.api.get("/versioned?since=0&limit=2")
+        self.assertStatusValue(response, 200, "updated", [1, 2, 3, 4])
+        self.assertStatusValue(response, 200, "watermark", 2)
+        self.assertStatusValue(response, 200, "overflow", True)
+
+        response = self.api.get("/versioned?since=2&limit=2")
+        self.assertStatusValue(response, 200, "updated", [5])
+        self.assertStatusValue(response, 200, "watermark", 3)
+        self.assertStatusValue(response, 200, "overflow", False)
+
+        response = self.api.get("/versioned?since=1&name=a")
+        self.assertStatusValue(response, 200, "updated", [])
+        self.assertStatusValue(response, 200, "watermark", 1)
+
+        response = self.api.get("/versioned?since=nope")
+        self.assertStatusValue(response, 400, "message", "invalid int nope for version__gt")
+
+        # The watermark wins over filtering on the column too
+
+        response = self.api.get("/versioned?since=2&version__gt=1")
+        self.assertStatusValue(response, 200, "updated", [5])
+        self.assertStatusValue(response, 200, "watermark", 3)
+
+    def test_subscribe(self):
+
+        @relations_restx.exceptions
+        def subscribe():
+            return {"subscribe": relations_restx.Resource.subscribe()}
+
+        self.app.add_url_rule('/subscribe', 'subscribe', subscribe)
+
+        response = self.api.get("/subscribe")
+        self.assertStatusValue(response, 200, "subscribe", False)
+
+        response = self.api.get("/subscribe", headers={"Accept": "text/event-stream"})
+        self.assertStatusValue(response, 200, "subscribe", True)
+
+    def test_subscribed(self):
+
+        class Logged(relations_restx.Resource):
+            MODEL = Simple
+            CHANGES = relations_restx.ChangeLog()
+
+        with self.app.test_request_context(headers={"Last-Event-ID": "0"}):
+
+            response = Logged().subscribed()
+
+            self.assertEqual(response.mimetype, "text/event-stream")
+            self.assertEqual(response.headers["Cache-Control"], "no-cache")
+            self.assertEqual(len(Logged.CHANGES.subscriptions), 1)
+
+            response.close()
+
+        with self.app.test_request_context(headers={"Last-Event-ID": "nope"}):
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "Last-Event-ID must be an int, not nope", Logged().subscribed)
+
+        with self.app.test_request_context():
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "simple changes aren't logged", SimpleResource().subscribed)
+
+        # Subscriptions hold their concurrency slot till they're closed
+
+        relations_restx.Admission.INSTANCES = {}
+
+        class Watched(relations_restx.Resource):
+            MODEL = Simple
+            CHANGES = relations_restx.ChangeLog()
+            CONCURRENCY = 1
+
+        self.restx.add_resource(Watched, "/watched")
+
+        response = self.api.get("/watched", headers={"Accept": "text/event-stream"}, buffered=False)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertEqual(Watched.admission("get").metrics()["active"], 1)
+
+        response.close()
+        self.assertEqual(Watched.admission("get").metrics()["active"], 0)
+
+    def test_events(self):
+
+        class Logged(relations_restx.Resource):
+            MODEL = Simple
+            CHANGES = relations_restx.ChangeLog()
+            BUFFER = 2
+            HEARTBEAT = 0.01
+
+        self.restx.add_resource(Logged, "/logged", "/logged/<id>")
+
+        response = self.api.get("/logged?like=y", headers={"Accept": "text/event-stream"})
+        events = iter(response.response)
+
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.assertEqual(next(events), b": subscribed\n\n")
+        self.assertEqual(next(events), b": heartbeat\n\n")
+
+        self.api.post("/logged", json={"simples": [{"name": "ya"}, {"name": "sure"}]})
+        self.assertEqual(next(events).split(b"\n")[:2], [b"id: 1", b"event: created"])
+
+        self.api.delete("/logged/2")
+        self.assertEqual(next(events).split(b"\n")[:2], [b"id: 3", b"event: deleted"])
+
+        self.api.post("/logged", json={"simples": [{"name": "yes"}, {"name": "yep"}, {"name": "yeah"}]})
+        self.assertEqual(next(events).split(b"\n")[:2], [b"id: 4", b"event: created"])
+        self.assertEqual(next(events).split(b"\n")[:2], [b"id: 5", b"event: created"])
+
+        lines = next(events).split(b"\n")
+        self.assertEqual(lines[0], b"event: overflow")
+        self.assertEqual(json.loads(lines[1][len(b"data: "):]), {"watermark": 5})
+
+        self.assertRaises(StopIteration, next, events)
+
+        response.close()
+
+        self.assertEqual(Logged.CHANGES.subscriptions, set())
+
+        # Filtering on ids as well still only sends those
+
+        response = self.api.get("/logged", headers={"Accept": "text/event-stream"}, json={"filter": {"id__in": [1, 5]}})
+        events = iter(response.response)
+
+        self.assertEqual(next(events), b": subscribed\n\n")
+
+        self.api.patch("/logged/4", json={"simple": {"name": "yo"}})
+        self.api.patch("/logged/1", json={"simple": {"name": "yup"}})
+        self.assertEqual(next(events).split(b"\n")[1:3], [b"event: updated", b'data: {"id":1}'])
+
+        response.close()
+
+        # Already overflowed says so without waiting on a heartbeat first
+
+        with self.app.test_request_context():
+
+            subscription = Logged.CHANGES.subscribe()
+            subscription.overflowed = True
+
+            with unittest.mock.patch.object(subscription, "get") as get:
+
+                events = Logged().events(subscription, {})
+
+                self.assertEqual(next(events), b": subscribed\n\n")
+                self.assertEqual(next(events).split(b"\n")[0], b"event: overflow")
+                self.assertRaises(StopIteration, next, events)
+
+                get.assert_not_called()
+
+    def test_changed(self):
+
+        class Logged(relations_restx.Resource):
+            MODEL = Simple
+            CHANGES = relations_restx.ChangeLog()
+
+        with self.app.test_request_context():
+
+            Logged().changed("updated", ["1", 2])
+            Logged().changed("updated", [])
+            SimpleResource().changed("updated", [3])
+
+        self.assertEqual(list(Logged.CHANGES.changes), [(1, "updated", 1), (2, "updated", 2)])
+
+    def test_matched(self):
+
+        Simple("ya").create()
+        Simple("sure").create()
+
+        class Logged(relations_restx.Resource):
+            MODEL = Simple
+            CHANGES = relations_restx.ChangeLog()
+
+        with self.app.test_request_context():
+
+            self.assertEqual(Logged().matched({"name": "sure"}), [2])
+            self.assertEqual(SimpleResource().matched({"name": "sure"}), [])
+
+    def test_export(self):
+
+        @relations_restx.exceptions
+        def export():
+            return {"export": relations_restx.Resource.export()}
+
+        self.app.add_url_rule('/export', 'export', export)
+
+        response = self.api.get("/export")
+        self.assertStatusValue(response, 200, "export", None)
+
+        response = self.api.get("/export?export=arrow")
+        self.assertStatusValue(response, 200, "export", "arrow")
+
+        response = self.api.get("/export?export=arrow", json={"export": "parquet"})
+        self.assertStatusValue(response, 200, "export", "parquet")
+
+        response = self.api.get("/export", headers={"Accept": "application/vnd.apache.arrow.stream"})
+        self.assertStatusValue(response, 200, "export", "arrow")
+
+        response = self.api.get("/export", headers={"Accept": "*/*"})
+        self.assertStatusValue(response, 200, "export", None)
+
+        response = self.api.get("/export?export=excel")
+        self.assertStatusValue(response, 400, "message", "export must be one of arrow, parquet, csv, not excel")
+
+    def test_projection(self):
+
+        @relations_restx.exceptions
+        def projection():
+            return {"projection": relations_restx.Resource.projection()}
+
+        self.app.add_url_rule('/projection', 'projection', projection)
+
+        response = self.api.get("/projection")
+        self.assertStatusValue(response, 200, "projection", [])
+
+        response = self.api.get("/projection?fields=id,name", json={"fields": ["things__a"]})
+        self.assertStatusValue(response, 200, "projection", ["id", "name", "things__a"])
+
+    def test_extract(self):
+
+        record = {"id": 1, "things": {"a": [1, {"b": 2}]}}
+
+        self.assertEqual(relations_restx.Resource.extract(record, "id"), 1)
+        self.assertEqual(relations_restx.Resource.extract(record, "things__a__1__b"), 2)
+        self.assertEqual(relations_restx.Resource.extract(record, "things__a__-2"), 1)
+        self.assertIsNone(relations_restx.Resource.extract(record, "things__a__2"))
+        self.assertIsNone(relations_restx.Resource.extract(record, "things__a__b"))
+        self.assertIsNone(relations_restx.Resource.extract(record, "id__a"))
+        self.assertIsNone(relations_restx.Resource.extract(record, "nope"))
+
+    def test_titled(self):
+
+        simple = Simple("ya").create()
+        simple.plain.add("whatevs").create()
+        Plain(simple_id=99, name="orphan").create()
+
+        with self.app.test_request_context():
+
+            self.assertEqual(PlainResource().titled(Plain.many(), ["simple_id", "name"]), [
+                {"simple_id": "ya", "name": "whatevs"},
+                {"simple_id": 99, "name": "orphan"}
+            ])
+
+            self.assertEqual(SimpleResource().titled(Simple.many(), ["name", "name__a"]), [
+                {"name": "ya", "name__a": None}
+            ])
+
+    def test_batches(self):
+
+        simples = Simple.bulk()
+
+        for name in ["a", "b", "c", "d", "e"]:
+            simples.add(name)
+
+        simples.create()
+
+        with self.app.test_request_context():
+
+            resource = SimpleResource()
+
+            self.assertEqual(
+                [models.name for models in resource.batches({}, [], {})],
+                [["a", "b"], ["c", "d"], ["e"]]
+            )
+
+            self.assertEqual(
+                [models.name for models in resource.batches({"name__in": ["a", "c", "e"]}, ["-name"], {})],
+                [["e", "c"], ["a"]]
+            )
+
+            self.assertEqual(
+                [models.name for models in resource.batches({}, [], {"limit": 3, "start": 1})],
+                [["b", "c"], ["d"]]
+            )
+
+            self.assertEqual(
+                [models.name for models in resource.batches({}, [], {"per_page": 2, "page": 2})],
+                [["c", "d"]]
+            )
+
+            self.assertEqual(list(resource.batches({"name": "z"}, [], {})), [])
+
+            # Paged by id, so removing what's been seen doesn't skip what hasn't
+
+            names = []
+
+            for models in resource.batches({}, [], {}):
+                names.extend(models.name)
+                models.delete()
+
+            self.assertEqual(names, ["a", "b", "c", "d", "e"])
+
+    def test_exported(self):
+
+        simple = Simple("ya").create()
+        Simple("sure").create()
+        Simple("fine").create()
+
+        simple.plain.add("whatevs").create()
+
+        with self.app.test_request_context("/simple?like=e"):
+
+            response = SimpleResource().exported("csv")
+
+            self.assertEqual(response.mimetype, "text/csv")
+            self.assertEqual(response.get_data(), b"id,name\r\n2,sure\r\n3,fine\r\n")
+
+        with self.app.test_request_context("/plain?fields=name,simple_id"):
+            self.assertEqual(PlainResource().exported("csv").get_data(), b"name,simple_id\r\nwhatevs,ya\r\n")
+
+        with self.app.test_request_context("/plain?fields=nope"):
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot find field nope from fields", PlainResource().exported, "csv")
+
+        if relations_restx.representations.pyarrow is not None:
+
+            with self.app.test_request_context("/simple?like=e"):
+
+                response = SimpleResource().exported("arrow")
+
+                self.assertEqual(response.mimetype, "application/vnd.apache.arrow.stream")
+
+                table = relations_restx.representations.pyarrow.ipc.open_stream(response.get_data()).read_all()
+
+                self.assertEqual(table.to_pydict(), {"id": [2, 3], "name": ["sure", "fine"]})
+
+            with self.app.test_request_context("/plain?fields=simple_id"):
+
+                table = relations_restx.representations.pyarrow.ipc.open_stream(PlainResource().exported("arrow").get_data()).read_all()
+
+                self.assertEqual(table.to_pydict(), {"simple_id": [simple.id]})
+
+        with unittest.mock.patch.dict(relations_restx.representations.STREAMS, clear=True):
+            with self.app.test_request_context("/simple"):
+                self.assertRaisesRegex(werkzeug.exceptions.NotAcceptable, "cannot export arrow, missing its library", SimpleResource().exported, "arrow")
+
+    def test_expand(self):
+
+        @relations_restx.exceptions
+        def expand():
+            return {"expand": relations_restx.Resource.expand()}
+
+        self.app.add_url_rule('/expand', 'expand', expand)
+
+        response = self.api.get("/expand")
+        self.assertStatusValue(response, 200, "expand", [])
+
+        response = self.api.get("/expand?expand=plain,plain.simple", json={"expand": ["bro"]})
+        self.assertStatusValue(response, 200, "expand", ["plain", "plain.simple", "bro"])
+
+    def test_link(self):
+
+        self.assertEqual(relations_restx.Resource.link(Plain.thy(), "simple"), (Simple, "simple_id", "id", "one"))
+        self.assertEqual(relations_restx.Resource.link(Simple.thy(), "plain"), (Plain, "id", "simple_id", "many"))
+        self.assertEqual(relations_restx.Resource.link(Sis.thy(), "bro"), (Bro, "bro_id", "id", "tied"))
+        self.assertEqual(relations_restx.Resource.link(Bro.thy(), "sis"), (Sis, "sis_id", "id", "tied"))
+        self.assertIsNone(relations_restx.Resource.link(Simple.thy(), "nope"))
+
+    def test_expanded(self):
+
+        ya = Simple("ya").create()
+        sure = Simple("sure").create()
+        Simple("fine").create()
+
+        ya.plain.add("whatevs").create()
+        ya.plain.add("whatever").create()
+        sure.plain.add("sures").create()
+
+        tom = Bro("Tom").create()
+        dick = Bro("Dick").create()
+        Sis("Mary", bro_id=[tom.id, dick.id]).create()
+        Sis("Sue", bro_id=[]).create()
+
+        with self.app.test_request_context():
+
+            records = Simple.many().sort("id").export()
+
+            self.assertEqual(SimpleResource().expanded(records, ["plain"]), {"plain": {"overflow": False}})
+            self.assertEqual([[plain["name"] for plain in record["plain"]] for record in records], [["whatevs", "whatever"], ["sures"], []])
+
+            records = Plain.many().export()
+
+            self.assertEqual(PlainResource().expanded(records, ["simple", "simple.plain"]), {
+                "simple": {"overflow": False},
+                "simple.plain": {"overflow": False}
+            })
+            self.assertEqual([record["simple"]["name"] for record in records], ["ya", "ya", "sure"])
+            self.assertEqual(len(records[0]["simple"]["plain"]), 2)
+
+            records = Sis.many().export()
+
+            self.assertEqual(SisResource().expanded(records, ["bro"]), {"bro": {"overflow": False}})
+            self.assertEqual([[bro["name"] for bro in record["bro"]] for record in records], [["Tom", "Dick"], []])
+
+            records = Simple.many().export()
+
+            resource = SimpleResource()
+            resource.EXPAND_LIMIT = 2
+
+            self.assertEqual(resource.expanded(records, ["plain"]), {"plain": {"overflow": True}})
+
+            records = Simple.many(name="nope").export()
+
+            self.assertEqual(SimpleResource().expanded(records, ["plain"]), {"plain": {"overflow": False}})
+
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot expand plain.nope", SimpleResource().expanded, [], ["plain.nope"])
+            self.assertRaisesRegex(
+                werkzeug.exceptions.BadRequest, "cannot expand plain.simple.plain, deeper than 2",
+                SimpleResource().expanded, [], ["plain.simple.plain"]
+            )
+
+    def test_aggregate(self):
+
+        with self.app.test_request_context("/meta?group=flag,name&agg=count,sum:spend,max:name"):
+            self.assertEqual(MetaResource().aggregate(), (["flag", "name"], [("count", None), ("sum", "spend"), ("max", "name")]))
+
+        with self.app.test_request_context("/meta", json={"group": ["flag"], "agg": ["avg:spend"]}):
+            self.assertEqual(MetaResource().aggregate(), (["flag"], [("avg", "spend")]))
+
+        with self.app.test_request_context("/meta?group=flag"):
+            self.assertEqual(MetaResource().aggregate(), (["flag"], [("count", None)]))
+
+        with self.app.test_request_context("/meta"):
+            self.assertIsNone(MetaResource().aggregate())
+
+        with self.app.test_request_context("/meta?group=stuff"):
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot group by stuff", MetaResource().aggregate)
+
+        with self.app.test_request_context("/meta?agg=median:spend"):
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "unknown aggregate median", MetaResource().aggregate)
+
+        with self.app.test_request_context("/meta?agg=sum:name"):
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot sum name", MetaResource().aggregate)
+
+        with self.app.test_request_context("/meta?agg=sum"):
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "sum needs a field", MetaResource().aggregate)
+
+        with self.app.test_request_context("/meta?agg=count:id"):
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot count id", MetaResource().aggregate)
+
+    def test_aggregated(self):
+
+        class Spend(ResourceModel):
+            id = int
+            status = str, {"none": True}
+            spend = float
+            UNIQUE = False
+            CHUNK = 2
+
+        class SpendResource(relations_restx.Resource):
+            MODEL = Spend
+
+        spends = Spend.bulk()
+
+        for status, spend in [("open", 1.0), ("done", 2.5), ("open", None), ("open", 3.0), (None, 4.0)]:
+            spends.add(status=status, spend=spend)
+
+        spends.create()
+
+        aggs = [("count", None), ("sum", "spend"), ("avg", "spend"), ("min", "spend"), ("max", "spend")]
+
+        with self.app.test_request_context("/spend"):
+
+            self.assertEqual(SpendResource().aggregated(["status"], aggs), [
+                {"status": None, "count": 1, "sum:spend": 4.0, "avg:spend": 4.0, "min:spend": 4.0, "max:spend": 4.0},
+                {"status": "done", "count": 1, "sum:spend": 2.5, "avg:spend": 2.5, "min:spend": 2.5, "max:spend": 2.5},
+                {"status": "open", "count": 3, "sum:spend": 4.0, "avg:spend": 2.0, "min:spend": 1.0, "max:spend": 3.0}
+            ])
+
+            self.assertEqual(SpendResource().aggregated([], [("count", None)]), [{"count": 5}])
+
+        with self.app.test_request_context("/spend?status=nope"):
+
+            self.assertEqual(SpendResource().aggregated([], [("count", None), ("sum", "spend")]), [{"count": 0, "sum:spend": None}])
+            self.assertEqual(SpendResource().aggregated(["status"], [("count", None)]), [])
+
+        SpendResource.AGGREGATE_LIMIT = 4
+
+        with self.app.test_request_context("/spend"):
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot aggregate 5 spends, more than 4, narrow the filter",
+                SpendResource().aggregated, [], [("count", None)])
+
+        with self.app.test_request_context("/spend?status=open"):
+            self.assertEqual(SpendResource().aggregated([], [("count", None)]), [{"count": 3}])
+
+        # Sources that can aggregate themselves get it pushed down
+
+        self.source.aggregate = unittest.mock.MagicMock(return_value=[{"count": 7}])
+
+        with self.app.test_request_context("/spend?status=open"):
+
+            self.assertEqual(SpendResource().aggregated([], [("count", None)]), [{"count": 7}])
+
+            models, group, aggs = self.source.aggregate.call_args.args
+            self.assertEqual(models._action, "retrieve")
+            self.assertEqual((group, aggs), ([], [("count", None)]))
+
+    def test_distinct(self):
+
+        with self.app.test_request_context("/simple?distinct=name"):
+            self.assertEqual(SimpleResource.distinct(), "name")
+
+        with self.app.test_request_context("/simple", json={"distinct": "id"}):
+            self.assertEqual(SimpleResource.distinct(), "id")
+
+        with self.app.test_request_context("/simple"):
+            self.assertIsNone(SimpleResource.distinct())
+
+    def test_distinguished(self):
+
+        class Ticket(ResourceModel):
+            id = int
+            status = str, {"options": ["open", "done", "gone"]}
+            owner = str
+            stuff = list
+            note = str, {"none": True}
+            UNIQUE = False
+            CHUNK = 2
+
+        class TicketResource(relations_restx.Resource):
+            MODEL = Ticket
+
+        tickets = Ticket.bulk()
+
+        for status, owner in [("open", "b"), ("done", "a"), ("open", "c"), ("open", "a"), ("done", "b")]:
+            tickets.add(status=status, owner=owner)
+
+        tickets.create()
+
+        with self.app.test_request_context("/ticket"):
+
+            response = TicketResource().distinguished("status")
+
+            self.assertEqual(response[0], {"distinct": ["open", "done", "gone"], "overflow": False})
+            self.assertEqual(response[2], {"Cache-Control": "private, max-age=60"})
+
+            self.assertEqual(TicketResource().distinguished("owner")[0], {"distinct": ["a", "b", "c"], "overflow": False})
+
+            # A query per value, not per record
+
+            with unittest.mock.patch.object(self.source, "retrieve", wraps=self.source.retrieve) as retrieve:
+                TicketResource().distinguished("owner")
+                self.assertEqual(retrieve.call_count, 5)
+
+            Ticket.one(2).set(note="x").update()
+            self.assertEqual(TicketResource().distinguished("note")[0], {"distinct": [None, "x"], "overflow": False})
+
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot find field nope from distinct", TicketResource().distinguished, "nope")
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot distinct stuff", TicketResource().distinguished, "stuff")
+
+        with self.app.test_request_context("/ticket?status=done"):
+            self.assertEqual(TicketResource().distinguished("status")[0], {"distinct": ["done"], "overflow": False})
+
+        with self.app.test_request_context("/ticket?limit=2"):
+            self.assertEqual(TicketResource().distinguished("owner")[0], {"distinct": ["a", "b"], "overflow": True})
+            self.assertEqual(TicketResource().distinguished("status")[0], {"distinct": ["open", "done"], "overflow": True})
+
+        TicketResource.DISTINCT_LIMIT = 1
+
+        with self.app.test_request_context("/ticket?limit=5"):
+            self.assertEqual(TicketResource().distinguished("owner")[0], {"distinct": ["a"], "overflow": True})
+
+        # Sources that can find distinct values themselves get it pushed down
+
+        self.source.distinct = unittest.mock.MagicMock(return_value=["x"])
+
+        with self.app.test_request_context("/ticket?owner=a"):
+
+            self.assertEqual(TicketResource().distinguished("owner")[0], {"distinct": ["x"], "overflow": False})
+
+            models, name, limit = self.source.distinct.call_args.args
+            self.assertEqual(models._action, "retrieve")
+            self.assertEqual((name, limit), ("owner", 2))
+
+    def test_dry_run(self):
+
+        with self.app.test_request_context("/simple"):
+            self.assertFalse(SimpleResource.dry_run())
+
+        with self.app.test_request_context("/simple?dry_run=true"):
+            self.assertTrue(SimpleResource.dry_run())
+
+        with self.app.test_request_context("/simple?dry_run=yes", json={"dry_run": "no"}):
+            self.assertFalse(SimpleResource.dry_run())
 
-        InitResource.PLURAL = "initiease"
-        resource = InitResource.thy()
-        self.assertEqual(resource.SINGULAR, "initee")
-        self.assertEqual(resource.PLURAL, "initiease")
+        with self.app.test_request_context("/simple?explain=1"):
+            self.assertTrue(SimpleResource.dry_run())
 
-        InitResource.LIST = ["name"]
-        resource = InitResource.thy()
-        self.assertEqual(resource.SINGULAR, "initee")
-        self.assertEqual(resource.PLURAL, "initiease")
-        self.assertEqual(resource.LIST, ['name'])
+    def test_explain(self):
 
-        InitResource.LIST = ["nope"]
-        self.assertRaisesRegex(relations_restx.ResourceError, "cannot find field nope from list", InitResource.thy)
+        with self.app.test_request_context("/simple"):
+            self.assertFalse(SimpleResource.explain())
 
-    def test_endpoints(self):
+        with self.app.test_request_context("/simple?explain=true"):
+            self.assertTrue(SimpleResource.explain())
 
-        self.assertEqual(SimpleResource.thy().endpoints(), ["/simple", "/simple/<id>"])
-        self.assertEqual(PlainResource.thy().endpoints(), ["/plain"])
+        with self.app.test_request_context("/simple", json={"explain": "FALSE"}):
+            self.assertFalse(SimpleResource.explain())
 
-class TestResource(TestRestX):
+        with self.app.test_request_context("/simple", json={"explain": True}):
+            self.assertTrue(SimpleResource.explain())
 
-    def test___init__(self):
+    def test_explained(self):
 
-        class Init(ResourceModel):
+        simples = Simple.bulk()
+
+        for name in ["a", "b", "c"]:
+            simples.add(name)
+
+        simples.create()
+
+        with self.app.test_request_context("/simple?dry_run=true"):
+
+            self.assertEqual(SimpleResource().explained({"name__in": ["a", "c"]}, "delete"), {"matched": 2, "ids": [1, 3]})
+
+            SimpleResource.SAMPLE = 1
+            self.assertEqual(SimpleResource().explained({}, "update"), {"matched": 3, "ids": [1]})
+            SimpleResource.SAMPLE = 10
+
+            self.assertEqual(PlainResource().explained({}, "update"), {"matched": 0})
+
+        with self.app.test_request_context("/simple?explain=true"):
+
+            self.assertEqual(SimpleResource().explained({"name": "b"}, "delete"), {"matched": 1, "ids": [2], "plan": None})
+
+            with unittest.mock.patch.object(SimpleResource, "plan", return_value="DELETE") as plan:
+                self.assertEqual(SimpleResource().explained({"name": "b"}, "delete")["plan"], "DELETE")
+                plan.assert_called_once_with({"name": "b"}, "delete", None)
+
+    def test_plan(self):
+
+        class Query:
+
+            def __init__(self, model):
+                self.model = model
+
+            def bind(self, model):
+                return self
+
+            def __str__(self):
+                return f"DELETE FROM {self.model.NAME}"
+
+        class SQL(Query):
+
+            def generate(self):
+                self.sql = "UPDATE `simple` SET `name`=%s WHERE `name`=%s"
+                self.args = (self.model._record.name, "b")
+
+        with self.app.test_request_context("/simple?explain=true"):
+
+            # Queries that can't say what they are, or sources without queries, have no plan
+
+            self.assertIsNone(SimpleResource().plan({"name": "b"}, "delete"))
+
+            with unittest.mock.patch.object(self.source, "delete_query", return_value=None):
+                self.assertIsNone(SimpleResource().plan({"name": "b"}, "delete"))
+
+            # SQL sources give the SQL and args, with what's being set
+
+            with unittest.mock.patch.object(self.source, "update_query", SQL, create=True):
+                self.assertEqual(SimpleResource().plan({"name": "b"}, "update", {"name": "c"}), {
+                    "sql": "UPDATE `simple` SET `name`=%s WHERE `name`=%s",
+                    "args": ["c", "b"]
+                })
+
+            # Others what the query says it is
+
+            with unittest.mock.patch.object(self.source, "delete_query", Query, create=True):
+                self.assertEqual(SimpleResource().plan({"name": "b"}, "delete"), "DELETE FROM simple")
+
+    def test_capped(self):
+
+        simples = Simple.bulk()
+
+        for name in ["a", "b", "c"]:
+            simples.add(name)
+
+        simples.create()
+
+        with self.app.test_request_context("/simple"):
+
+            SimpleResource().capped({}, "delete")
+
+            SimpleResource.MAX_ROWS = 2
+            SimpleResource().capped({"name": "a"}, "delete")
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot delete 3 simples, more than 2, narrow the filter",
+                SimpleResource().capped, {}, "delete")
+            SimpleResource.MAX_ROWS = None
+
+    @unittest.mock.patch("time.sleep")
+    def test_batched(self, mock_sleep):
+
+        class Job(ResourceModel):
             id = int
             name = str
-            status = str,"good"
-            meta = dict
+            UNIQUE = False
 
-        class InitResource(relations_restx.Resource):
-            MODEL = Init
+        jobs = Job.bulk()
 
-        resource = InitResource()
-        self.assertEqual(resource.SINGULAR, "init")
-        self.assertEqual(resource.PLURAL, "inits")
-        self.assertEqual(resource.FIELDS, [])
-        self.assertEqual(resource._fields, [
-            {
-                "name": "id",
-                "kind": "int",
-                "readonly": True,
-            },
-            {
-                "name": "name",
-                "kind": "str",
-                "required": True
-            },
-            {
-                "name": "status",
-                "kind": "str",
-                "default": "good"
-            },
-            {
-                "name": "meta",
-                "kind": "dict",
-                "default": {}
-            }
-        ])
+        for name in ["a", "b", "c", "d", "e"]:
+            jobs.add(name)
 
-    def test_json(self):
+        jobs.create()
 
-        @relations_restx.exceptions
-        def json():
-            return {"json": relations_restx.Resource.json()}
+        class BatchResource(relations_restx.Resource):
+            MODEL = Job
+            BATCH = 2
+            PAUSE = 0.5
+            CHANGES = relations_restx.ChangeLog()
 
-        self.app.add_url_rule('/json', 'json', json)
+        with self.app.test_request_context("/job"):
 
-        response = self.api.get("/json")
-        self.assertStatusValue(response, 200, "json", {})
+            self.assertEqual(BatchResource().batched({"name__in": ["a", "c", "d"]}, "update", {"name": "x"}), {"updated": 3, "batches": 2})
+            self.assertEqual(Job.many().sort("id").name, ["x", "b", "x", "x", "e"])
+            self.assertEqual(mock_sleep.call_count, 1)
+            mock_sleep.assert_called_with(0.5)
 
-        response = self.api.get("/json", headers={"Content-Type": "application/json"})
-        self.assertStatusValue(response, 200, "json", {})
+            self.assertEqual(list(BatchResource.CHANGES.changes), [(1, "updated", 1), (2, "updated", 3), (3, "updated", 4)])
 
-        response = self.api.get("/json", json={"a": 1})
-        self.assertStatusValue(response, 200, "json", {"a": 1})
+            # Ranges keep to the filter, b's between a and c but not in it
 
-    def test_criteria(self):
+            self.assertEqual(BatchResource().batched({"name": "x"}, "delete"), {"deleted": 3, "batches": 2})
+            self.assertEqual(Job.many().sort("id").name, ["b", "e"])
 
-        verify = True
+            self.assertEqual(BatchResource().batched({"name": "nope"}, "delete"), {"deleted": 0, "batches": 0})
 
-        @relations_restx.exceptions
-        def criteria(method=None):
-            return {"criteria": relations_restx.Resource.criteria(verify)}
+            # Filters on the id don't collide with the ranges
 
-        self.app.add_url_rule('/criteria', 'criteria', criteria)
+            self.assertEqual(BatchResource().batched({"id__gte": 2}, "delete"), {"deleted": 2, "batches": 1})
 
-        response = self.api.get("/criteria")
-        self.assertStatusValue(response, 400, "message", "to confirm all, send a blank filter {}")
+            # Already in a transaction, no commits, pauses, or logging of its own
 
-        verify = False
-        response = self.api.get("/criteria")
-        self.assertStatusValue(response, 200, "criteria", {})
+            jobs = Job.bulk()
 
-        response = self.api.get("/criteria?a=1&sort=a&limit=2")
-        self.assertStatusValue(response, 200, "criteria", {"a": "1"})
+            for name in ["f", "g", "h"]:
+                jobs.add(name)
 
-        response = self.api.get("/criteria?a=1", json={"filter": {"a": 2}})
-        self.assertStatusValue(response, 200, "criteria", {"a": 2})
+            jobs.create()
 
-    def test_sort(self):
+            mock_sleep.reset_mock()
+            changes = len(BatchResource.CHANGES.changes)
 
-        @relations_restx.exceptions
-        def sort():
-            return {"sort": relations_restx.Resource.sort()}
+            with unittest.mock.patch("relations_restx.resource.transaction") as transaction:
+                self.assertEqual(BatchResource().batched({}, "delete", commit=False), {"deleted": 3, "batches": 2})
 
-        self.app.add_url_rule('/sort', 'sort', sort)
+            transaction.assert_not_called()
+            mock_sleep.assert_not_called()
+            self.assertEqual(len(BatchResource.CHANGES.changes), changes)
 
-        response = self.api.get("/sort")
-        self.assertStatusValue(response, 200, "sort", [])
+    def test_upserted(self):
 
-        response = self.api.get("/sort?sort=a,-b")
-        self.assertStatusValue(response, 200, "sort", ["a", "-b"])
+        simples = Simple.bulk()
 
-        response = self.api.get("/sort?sort=-a", json={"sort": ["b", "+c"]})
-        self.assertStatusValue(response, 200, "sort", ["-a", "b", "+c"])
+        for name in ["a", "b", "c"]:
+            simples.add(name)
 
-    def test_limit(self):
+        simples.create()
 
-        @relations_restx.exceptions
-        def limit():
-            return {"limit": relations_restx.Resource.limit()}
+        with self.app.test_request_context():
 
-        self.app.add_url_rule('/limit', 'limit', limit)
+            resource = SimpleResource()
+            resource.CHANGES = relations_restx.ChangeLog()
 
-        response = self.api.get("/limit")
-        self.assertStatusValue(response, 200, "limit", {})
+            self.assertEqual(resource.upserted([
+                {"id": 1, "name": "a"},
+                {"id": "2", "name": "bb"},
+                {"id": 3, "name": "cc"},
+                {"id": 3, "name": "ccc"},
+                {"name": "d"}
+            ]), {"created": 1, "updated": 2, "unchanged": 1})
 
-        response = self.api.get("/limit?limit__per_page=1&limit__page=2")
-        self.assertStatusValue(response, 200, "limit", {"per_page": 1, "page": 2})
+            self.assertEqual(Simple.many().sort("id").name, ["a", "bb", "ccc", "d"])
+            self.assertEqual(list(resource.CHANGES.changes), [(1, "updated", 2), (2, "updated", 3), (3, "created", 4)])
 
-        response = self.api.get("/limit?limit=1", json={"limit": {"per_page": "2", "page": 3}})
-        self.assertStatusValue(response, 200, "limit", {"limit": 1, "per_page": 2, "page": 3})
+            # Parents with children are updated without touching the id, which would cascade
 
-    def test_count(self):
+            Plain(simple_id=2, name="child").create()
 
-        @relations_restx.exceptions
-        def count():
-            return {"count": relations_restx.Resource.count()}
+            self.assertEqual(resource.upserted([
+                {"id": 1, "name": "aa"},
+                {"id": 2, "name": "bbb"}
+            ]), {"created": 0, "updated": 2, "unchanged": 0})
 
-        self.app.add_url_rule('/count', 'count', count)
+            self.assertEqual(Simple.many().sort("id").name, ["aa", "bbb", "ccc", "d"])
+            self.assertEqual(Plain.one().simple_id, 2)
 
-        response = self.api.get("/count")
-        self.assertStatusValue(response, 200, "count", False)
+            Simple.one(id=1).set(name="a").update()
+            Simple.one(id=2).set(name="bb").update()
 
-        response = self.api.get("/count?count=yes")
-        self.assertStatusValue(response, 200, "count", True)
+            class NameResource(relations_restx.Resource):
+                MODEL = Simple
+                UPSERT = ["name"]
 
-        response = self.api.get("/count", json={"count": False})
-        self.assertStatusValue(response, 200, "count", False)
+            self.assertEqual(NameResource().upserted([{"name": "a"}, {"name": "e"}]), {"created": 1, "updated": 0, "unchanged": 1})
+            self.assertEqual(Simple.many().sort("id").name, ["a", "bb", "ccc", "d", "e"])
 
-        response = self.api.get("/count", json={"count": "FALSE"})
-        self.assertStatusValue(response, 200, "count", False)
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "simples need name to upsert", NameResource().upserted, [{"id": 1}])
 
-        response = self.api.get("/count", json={"count": "0"})
-        self.assertStatusValue(response, 200, "count", False)
+            class IdlessResource(relations_restx.Resource):
+                MODEL = Plain
 
-        response = self.api.get("/count", json={"count": "no"})
-        self.assertStatusValue(response, 200, "count", False)
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot upsert plains without an id or upsert fields", IdlessResource().upserted, [{}])
+
+    def test_patched(self):
+
+        class Task(ResourceModel):
+            id = int
+            status = str
+            owner = str
+            UNIQUE = False
+            CHUNK = 2
+
+        class TaskResource(relations_restx.Resource):
+            MODEL = Task
+
+        tasks = Task.bulk()
+
+        for owner in ["a", "b", "c", "d"]:
+            tasks.add(status="open", owner=owner)
+
+        tasks.create()
+
+        with self.app.test_request_context():
+
+            resource = TaskResource()
+            resource.CHANGES = relations_restx.ChangeLog()
+
+            with unittest.mock.patch.object(self.source, "update", wraps=self.source.update) as update:
+
+                self.assertEqual(resource.patched([
+                    {"id": 1, "changes": {"status": "done"}},
+                    {"id": "2", "changes": {"status": "done"}},
+                    {"id": 3, "changes": {"status": "done"}},
+                    {"id": 4, "changes": {"owner": "e"}},
+                    {"id": 9, "changes": {"owner": "e"}}
+                ]), {
+                    "updated": 4,
+                    "tasks": [
+                        {"id": 1, "updated": 1},
+                        {"id": 2, "updated": 1},
+                        {"id": 3, "updated": 1},
+                        {"id": 4, "updated": 1},
+                        {"id": 9, "updated": 0}
+                    ]
+                })
+
+                # One update for each chunk of each set of changes
+
+                self.assertEqual(update.call_count, 3)
+
+            self.assertEqual(Task.many().sort("id").status, ["done", "done", "done", "open"])
+            self.assertEqual(Task.many().sort("id").owner, ["a", "b", "c", "e"])
+            self.assertEqual([change[2] for change in resource.CHANGES.changes], [1, 2, 3, 4])
+
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "tasks items need an id and changes", resource.patched, [{"id": 1}])
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "tasks has 1 more than once", resource.patched, [
+                {"id": 1, "changes": {}},
+                {"id": "1", "changes": {}}
+            ])
+            self.assertRaisesRegex(werkzeug.exceptions.BadRequest, "cannot patch plains by id without an id", PlainResource().patched, [])
+
+    def test_compacted(self):
+
+        records = [{"id": 1, "name": "ya"}, {"id": 2, "name": "sure"}]
+
+        self.assertEqual(SimpleResource().compacted(records, "rows"), {
+            "columns": ["id", "name"],
+            "simples": [[1, "ya"], [2, "sure"]]
+        })
+
+        self.assertEqual(SimpleResource().compacted(records, "columns"), {
+            "columns": ["id", "name"],
+            "simples": [[1, 2], ["ya", "sure"]]
+        })
 
     def test_fields(self):
 
@@ -685,6 +1942,58 @@ class TestResource(TestRestX):
             }
         ])
 
+    def test_titles(self):
+
+        simple = Simple("ya").create()
+        Simple("sure").create()
+
+        relation = Plain.thy()._ancestor("simple_id")
+
+        with self.app.test_request_context():
+            self.assertEqual(PlainResource().titles(relation, [simple.id]), {"titles": {simple.id: ["ya"]}, "format": [None]})
+
+        folder = tempfile.mkdtemp()
+
+        try:
+
+            class Stored(relations_restx.Resource):
+                MODEL = Plain
+                STORE = relations_restx.TitleStore(os.path.join(folder, "titles"))
+
+            class Titled(relations_restx.Resource):
+                MODEL = Simple
+                STORE = Stored.STORE
+
+            with self.app.test_request_context():
+
+                self.assertEqual(Stored().titles(relation, [1, 2, 3]), {"titles": {1: ["ya"], 2: ["sure"]}, "format": [None]})
+                self.assertEqual(Stored.STORE.get("simple")["titles"], {1: ["ya"], 2: ["sure"]})
+
+                # Changed behind its back, it's what's stored that comes back
+
+                Simple.one(2).set(name="surely").update()
+
+                self.assertEqual(Stored().titles(relation, 2), {"titles": {2: ["sure"]}, "format": [None]})
+
+            self.restx.add_resource(Titled, "/titled", "/titled/<id>")
+
+            self.api.patch("/titled/2", json={"simple": {"name": "surely"}})
+
+            self.assertIsNone(Stored.STORE.get("simple"))
+
+            with self.app.test_request_context():
+                self.assertEqual(Stored().titles(relation, [2]), {"titles": {2: ["surely"]}, "format": [None]})
+
+            self.api.post("/titled", json={"simple": {"name": "fine"}})
+            self.assertIsNotNone(Stored.STORE.get("simple"))
+
+            self.api.delete("/titled/3")
+            self.assertIsNone(Stored.STORE.get("simple"))
+
+        finally:
+
+            shutil.rmtree(folder)
+
     def test_formats(self):
 
         Simple("ya").create().plain.add("sure").create()
@@ -1051,6 +2360,16 @@ class TestResource(TestRestX):
         self.assertStatusModel(response, 200, "simples", [{"id": simple.id, "name": "ya"}])
         self.assertStatusValue(response, 200, "overflow", False)
 
+        response = self.api.get("/simple?group=name&agg=count,max:id")
+        self.assertStatusValue(response, 200, "simples", [{"name": "ya", "count": 1, "max:id": simple.id}])
+
+        response = self.api.get("/simple?agg=sum:name")
+        self.assertStatusValue(response, 400, "message", "cannot sum name")
+
+        response = self.api.get("/simple?distinct=name")
+        self.assertStatusValue(response, 200, "distinct", ["ya"])
+        self.assertEqual(response.headers["Cache-Control"], "private, max-age=60")
+
         response = self.api.get("/simple", json={"filter": {"name": "no"}})
         self.assertStatusModel(response, 200, "simples", [])
         self.assertStatusValue(response, 200, "overflow", False)
@@ -1081,6 +2400,57 @@ class TestResource(TestRestX):
         self.assertEqual(self.api.get("/simple?count=yes").json["simples"], 6)
         self.assertEqual(self.api.get("/simple", json={"count": True}).json["simples"], 6)
 
+        response = self.api.get("/plain?compact=rows")
+        self.assertStatusValue(response, 200, "columns", ["simple_id", "name"])
+        self.assertStatusValue(response, 200, "plains", [[simple.id, "whatevs"]])
+        self.assertStatusValue(response, 200, "formats", {
+            "simple_id": {
+                "titles": {'1': ["ya"]},
+                "format": [None]
+            }
+        })
+
+        response = self.api.post("/simple", json={"filter": {"name__in": ["ya", "sure"]}, "sort": ["name"], "compact": "columns"})
+        self.assertStatusValue(response, 200, "columns", ["id", "name"])
+        self.assertStatusValue(response, 200, "simples", [[2, 1], ["sure", "ya"]])
+
+        response = self.api.get(f"/simple/{simple.id}?expand=plain")
+        self.assertStatusModel(response, 200, "simple", {"name": "ya", "plain": [{"name": "whatevs"}]})
+        self.assertStatusValue(response, 200, "expanded", {"plain": {"overflow": False}})
+
+        response = self.api.post("/plain", json={"filter": {}, "expand": ["simple"]})
+        self.assertStatusValue(response, 200, "plains", [{"simple_id": simple.id, "name": "whatevs", "simple": {"id": simple.id, "name": "ya"}}])
+
+        response = self.api.get("/plain?expand=nope")
+        self.assertStatusValue(response, 400, "message", "cannot expand nope")
+
+        response = self.api.get("/plain?compact=rows&expand=simple")
+        self.assertStatusValue(response, 400, "message", "cannot compact and expand at once")
+
+        response = self.api.get("/simple?name=ya&dry_run=true")
+        self.assertStatusValue(response, 200, "ids", [1])
+
+        response = self.api.get("/simple?like=e&sort=name&export=csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b"id,name\r\n3,fine\r\n2,sure\r\n")
+
+        response = self.api.get("/plain", headers={"Accept": "text/csv"})
+        self.assertEqual(response.mimetype, "text/csv")
+        self.assertEqual(response.data, b"simple_id,name\r\nya,whatevs\r\n")
+
+        if relations_restx.representations.pyarrow is not None:
+
+            response = self.api.get("/simple?like=e&sort=name", headers={"Accept": "application/vnd.apache.arrow.stream"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, "application/vnd.apache.arrow.stream")
+            table = relations_restx.representations.pyarrow.ipc.open_stream(response.data).read_all()
+            self.assertEqual(table.to_pydict(), {"id": [3, 2], "name": ["fine", "sure"]})
+
+            response = self.api.post("/plain", json={"filter": {}, "export": "parquet"})
+            self.assertEqual(response.mimetype, "application/vnd.apache.parquet")
+            table = relations_restx.representations.pyarrow.parquet.read_table(io.BytesIO(response.data))
+            self.assertEqual(table.to_pydict(), {"simple_id": [simple.id], "name": ["whatevs"]})
+
     def test_patch(self):
 
         response = self.api.patch("/simple")
@@ -1102,6 +2472,62 @@ class TestResource(TestRestX):
         response = self.api.patch("/simple", json={"filter": {"name": "no"}, "simples": {}})
         self.assertStatusModel(response, 202, "updated", 0)
 
+        response = self.api.patch("/simple", json={"simples": [{"id": simple.id, "changes": {"name": "each"}}]})
+        self.assertStatusValue(response, 202, "simples", [{"id": simple.id, "updated": 1}])
+        self.assertEqual(Simple.one(simple.id).name, "each")
+
+        response = self.api.patch(f"/simple/{simple.id}?dry_run=true", json={"simple": {"name": "dry"}})
+        self.assertStatusValue(response, 200, "matched", 1)
+
+        response = self.api.patch("/simple?dry_run=true", json={"filter": {}, "simples": {"name": "dry"}})
+        self.assertStatusValue(response, 200, "ids", [simple.id])
+
+        with unittest.mock.patch.object(SimpleResource, "plan", return_value="UPDATE") as plan:
+            response = self.api.patch("/simple?dry_run=true&explain=true", json={"filter": {}, "simples": {"name": "dry"}})
+            self.assertStatusValue(response, 200, "plan", "UPDATE")
+            plan.assert_called_once_with({}, "update", {"name": "dry"})
+
+        response = self.api.patch("/simple?dry_run=true", json={"simples": [{"id": simple.id, "changes": {"name": "dry"}}, {"id": 9}]})
+        self.assertStatusValue(response, 200, "matched", 1)
+
+        response = self.api.patch("/plain?dry_run=true", json={"plains": [{"id": 1, "changes": {}}]})
+        self.assertStatusValue(response, 400, "message", "cannot patch plains by id without an id")
+
+        response = self.api.patch("/simple?dry_run=true", json={"simples": {"name": "dry"}})
+        self.assertStatusValue(response, 400, "message", "to confirm all, send a blank filter {}")
+
+        self.assertEqual(Simple.one(simple.id).name, "each")
+
+        SimpleResource.MAX_ROWS = 0
+
+        response = self.api.patch("/simple", json={"filter": {}, "simples": {"name": "capped"}})
+        self.assertStatusValue(response, 400, "message", "cannot update 1 simples, more than 0, narrow the filter")
+
+        SimpleResource.MAX_ROWS = None
+        SimpleResource.BATCH = 1
+
+        response = self.api.patch("/simple", json={"filter": {}, "simples": {"name": "batched"}})
+        self.assertStatusValue(response, 202, "updated", 1)
+        self.assertStatusValue(response, 202, "batches", 1)
+
+        SimpleResource.BATCH = None
+
+    def test_put(self):
+
+        Simple("ya").create()
+
+        response = self.api.put("/simple", json={"simples": [{"id": 1, "name": "sure"}, {"name": "fine"}]})
+        self.assertStatusValue(response, 200, "created", 1)
+        self.assertStatusValue(response, 200, "updated", 1)
+
+        self.assertEqual(Simple.many().sort("id").name, ["sure", "fine"])
+
+        response = self.api.put("/simple", json={"simple": {"name": "nope"}})
+        self.assertStatusValue(response, 400, "message", "simples required")
+
+        response = self.api.put("/simple/1", json={"simples": []})
+        self.assertStatusValue(response, 405, "message", "upsert simples on the collection, not one")
+
     def test_delete(self):
 
         response = self.api.delete(f"/simple")
@@ -1117,3 +2543,32 @@ class TestResource(TestRestX):
 
         response = self.api.delete("/simple", json={"filter": {"name": "no"}})
         self.assertStatusModel(response, 202, "deleted", 0)
+
+        simple = Simple("dry").create()
+
+        response = self.api.delete(f"/simple/{simple.id}?dry_run=true")
+        self.assertStatusValue(response, 200, "ids", [simple.id])
+
+        response = self.api.delete("/simple?explain=true", json={"filter": {}})
+        self.assertStatusValue(response, 200, "plan", None)
+
+        response = self.api.delete("/simple?dry_run=true")
+        self.assertStatusValue(response, 400, "message", "to confirm all, send a blank filter {}")
+
+        self.assertEqual(Simple.many().count(), 1)
+
+        SimpleResource.MAX_ROWS = 0
+
+        response = self.api.delete("/simple", json={"filter": {}})
+        self.assertStatusValue(response, 400, "message", "cannot delete 1 simples, more than 0, narrow the filter")
+
+        SimpleResource.MAX_ROWS = None
+        SimpleResource.BATCH = 1
+
+        Simple("more").create()
+
+        response = self.api.delete("/simple", json={"filter": {}})
+        self.assertStatusValue(response, 202, "deleted", 2)
+        self.assertStatusValue(response, 202, "batches", 2)
+
+        SimpleResource.BATCH = None
@@ -0,0 +1,171 @@
+import unittest
+
+import os
+import json
+import shutil
+import tempfile
+
+import relations_restx
+
+
+class TestTitleStore(unittest.TestCase):
+
+    maxDiff = None
+
+    def setUp(self):
+
+        self.folder = tempfile.mkdtemp()
+        self.path = os.path.join(self.folder, "titles")
+
+    def tearDown(self):
+
+        shutil.rmtree(self.folder)
+
+    def test___init__(self):
+
+        store = relations_restx.TitleStore(self.path)
+
+        self.assertEqual(store.path, self.path)
+        self.assertEqual(store.version, 0)
+        self.assertEqual(store.index, {})
+        self.assertEqual(store.cache, {})
+        self.assertIsNone(store.mapped)
+
+    def test_locked(self):
+
+        store = relations_restx.TitleStore(self.path)
+
+        with store.locked():
+            self.assertTrue(os.path.exists(f"{self.path}.lock"))
+
+    def test_load(self):
+
+        store = relations_restx.TitleStore(self.path)
+
+        store.load()
+        self.assertIsNone(store.stamp)
+        self.assertEqual(store.version, 0)
+
+        with open(self.path, "wb") as file:
+            file.write(b"")
+
+        store.load()
+        self.assertIsNotNone(store.stamp)
+        self.assertIsNone(store.mapped)
+
+        relations_restx.TitleStore(self.path).swap({"simple": {"titles": {1: ["ya"]}, "format": [None]}})
+
+        store.load()
+        self.assertEqual(store.version, 1)
+        self.assertEqual(list(store.index), ["simple"])
+
+        store.get("simple")
+        mapped = store.mapped
+
+        store.load()
+        self.assertIs(store.mapped, mapped)
+        self.assertIn("simple", store.cache)
+
+        os.remove(self.path)
+
+        store.load()
+        self.assertIsNone(store.mapped)
+        self.assertEqual(store.index, {})
+        self.assertEqual(store.cache, {})
+
+    def test_get(self):
+
+        store = relations_restx.TitleStore(self.path)
+
+        self.assertIsNone(store.get("simple"))
+
+        store.swap({
+            "simple": {"titles": {1: ["ya"], 2: ["sure"]}, "format": [None]},
+            "meta": {"titles": {"a": ["yes", 1]}, "format": [None, "count"]}
+        })
+
+        self.assertEqual(store.get("simple"), {"titles": {1: ["ya"], 2: ["sure"]}, "format": [None]})
+        self.assertEqual(store.get("meta"), {"titles": {"a": ["yes", 1]}, "format": [None, "count"]})
+        self.assertIsNone(store.get("plain"))
+
+        # Another worker sees what was swapped in
+
+        other = relations_restx.TitleStore(self.path)
+
+        self.assertEqual(other.get("simple")["titles"][2], ["sure"])
+
+    def test_raw(self):
+
+        store = relations_restx.TitleStore(self.path)
+
+        store.swap({"simple": {"titles": {1: ["ya"]}, "format": [None]}})
+
+        self.assertEqual(json.loads(store.raw("simple")), {"titles": [[1, ["ya"]]], "format": [None]})
+
+    def test_swap(self):
+
+        store = relations_restx.TitleStore(self.path)
+
+        store.swap({"simple": {"titles": {1: ["ya"]}, "format": [None]}})
+
+        with open(self.path, "rb") as file:
+            header, body = file.read().split(b"\n", 1)
+
+        self.assertEqual(json.loads(header), {"version": 1, "index": {"simple": [0, len(body)]}})
+        self.assertEqual(json.loads(body), {"titles": [[1, ["ya"]]], "format": [None]})
+        self.assertEqual(os.listdir(self.folder), ["titles"])
+
+        store.swap({"meta": store.raw("simple")})
+
+        self.assertEqual(store.version, 2)
+        self.assertEqual(store.get("meta"), {"titles": {1: ["ya"]}, "format": [None]})
+
+        store.swap({})
+
+        self.assertEqual(store.version, 3)
+        self.assertEqual(store.index, {})
+
+    def test_update(self):
+
+        store = relations_restx.TitleStore(self.path)
+
+        store.update("simple", {1: ["ya"]}, [None])
+        store.update("simple", {2: ["sure"]}, [None])
+        store.update("meta", {3: ["yes"]}, ["count"])
+
+        other = relations_restx.TitleStore(self.path)
+
+        self.assertEqual(other.version, 0)
+        self.assertEqual(other.get("simple"), {"titles": {1: ["ya"], 2: ["sure"]}, "format": [None]})
+        self.assertEqual(other.get("meta"), {"titles": {3: ["yes"]}, "format": ["count"]})
+        self.assertEqual(other.version, 3)
+
+        # Others' entries are copied as they were
+
+        meta = store.raw("meta")
+        store.update("simple", {4: ["fine"]}, [None])
+
+        self.assertEqual(store.raw("meta"), meta)
+        self.assertEqual(store.version, 4)
+
+        # What another worker already added isn't written again
+
+        other.update("simple", {2: ["sure"], 4: ["fine"]}, [None])
+
+        self.assertEqual(other.version, 4)
+
+    def test_invalidate(self):
+
+        store = relations_restx.TitleStore(self.path)
+
+        store.invalidate("simple")
+        self.assertEqual(store.version, 0)
+
+        store.update("simple", {1: ["ya"]}, [None])
+        store.update("meta", {3: ["yes"]}, ["count"])
+
+        store.invalidate("simple")
+
+        self.assertEqual(store.version, 3)
+        self.assertIsNone(store.get("simple"))
+        self.assertEqual(store.get("meta"), {"titles": {3: ["yes"]}, "format": ["count"]})